@@ -0,0 +1,549 @@
+"""
+Module for scraping court websites with asyncio over plain HTTP.
+
+Use a scraper as an async context manager so its connection pool gets closed, e.g.
+
+    async with AsyncTravisScraper() as scraper:
+        settings = await scraper.make_setting_list(days_to_pull)
+
+Pages are parsed in the event loop's default executor, so parsing one page doesn't hold up
+the requests for the others.
+"""
+
+import asyncio
+import datetime
+from functools import partial
+import logging
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+import calendars
+from cases import CaseRecord, EvictionCase
+import config
+import filing_planner
+import hearing
+from html_backend import make_soup
+import odyssey
+import page_cache
+import retries
+import scrapers
+
+logger = logging.getLogger()
+logging.basicConfig(stream=sys.stdout)
+
+
+class TokenBucket:
+    """
+    Lets through `rate` requests per second on average, in bursts of up to `capacity`.
+    A `rate` of 0 or less lets everything through.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Waits until a request may be sent."""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# one bucket per court website, shared by every async scraper in the process
+rate_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(url: str) -> TokenBucket:
+    """Returns the token bucket for the host serving `url`."""
+    host = urlparse(url).netloc or url
+    if host not in rate_limiters:
+        rate_limiters[host] = TokenBucket(config.requests_per_second)
+    return rate_limiters[host]
+
+
+class AsyncTravisScraper:
+    """
+    Asyncio counterpart of scrapers.TravisHTTPScraper.
+
+    Each query gets its own portal session (cookies and viewstate), so queries can run
+    side by side, while all of them share one connection pool and the token bucket
+    of the court website.
+    """
+
+    parser_class = hearing.BaseParser
+    county = "travis"
+
+    def __init__(self) -> None:
+        self.homepage = (
+            "https://odysseypa.traviscountytx.gov/JPPublicAccess/default.aspx"
+        )
+        self.case_records_link_name = "Civil, Family & Probate Case Records"
+        self.calendar_link_names = ["Court Calendar"]
+        self.date_range_button_id = "DateRange"
+        self.timeout = aiohttp.ClientTimeout(total=30)
+        self.connector: Optional[aiohttp.TCPConnector] = None
+        self.page_cache = page_cache.get_page_cache()
+        self.filing_planner = filing_planner.get_filing_planner()
+        self.retry_policy = retries.RetryPolicy.from_config()
+        # search results of cases found by filing searches, so they can be loaded without searching again
+        self.search_results: Dict[str, calendars.Filing] = {}
+
+    async def __aenter__(self) -> "AsyncTravisScraper":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self.connector is not None:
+            await self.connector.close()
+            self.connector = None
+
+    async def retry(
+        self, description: str, function: Callable[..., Awaitable[Any]], *args
+    ) -> Any:
+        """
+        Awaits `function` with `args`, retrying it if it fails in a way that could pass,
+        and waiting while the county's portal seems to be down.
+        """
+        return await self.retry_policy.call_async(
+            function,
+            *args,
+            breaker=retries.get_circuit_breaker(self.county),
+            description=description,
+        )
+
+    async def parse(self, function: Callable[..., Any], *args) -> Any:
+        """Calls `function` with `args` in the default executor, instead of on the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(function, *args)
+        )
+
+    def get_connector(self) -> aiohttp.TCPConnector:
+        """Returns the connection pool shared by all of this scraper's sessions."""
+        if self.connector is None or self.connector.closed:
+            self.connector = aiohttp.TCPConnector(
+                limit_per_host=config.max_sessions_per_host
+            )
+        return self.connector
+
+    def new_session(self) -> aiohttp.ClientSession:
+        """Starts a portal session with its own cookies on the shared connection pool."""
+        return aiohttp.ClientSession(
+            connector=self.get_connector(),
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=self.timeout,
+            headers={"User-Agent": "Mozilla/5.0 (eviction-hearing-parser)"},
+        )
+
+    async def request_page(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        data: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, str]:
+        """GETs `url`, or POSTs `data` to it, and returns the final URL and page content."""
+        await get_rate_limiter(url).acquire()
+        method = "GET" if data is None else "POST"
+        async with session.request(method, url, data=data) as response:
+            response.raise_for_status()
+            return str(response.url), await response.text()
+
+    async def load_page(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        data: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, BeautifulSoup]:
+        """Returns the final URL and soup of the page at `url`."""
+        page_url, content = await self.request_page(session, url, data=data)
+        return page_url, await self.parse(make_soup, content)
+
+    async def load_linked_page(
+        self, session: aiohttp.ClientSession, link_name: str
+    ) -> Tuple[str, BeautifulSoup]:
+        """Loads the homepage and follows the link named `link_name`."""
+        start_url, start_page = await self.load_page(session, self.homepage)
+        link_url = odyssey.get_link_url(start_page, start_url, link_name)
+        if link_url is None:
+            raise ValueError(f"Could not find link '{link_name}' on {start_url}")
+        return await self.load_page(session, link_url)
+
+    async def query_case_id(self, case_id: str) -> Optional[scrapers.CasePages]:
+        try:
+            async with self.new_session() as session:
+                search_url, search_page = await self.load_linked_page(
+                    session, self.case_records_link_name
+                )
+                form = odyssey.get_form(search_page)
+                results_url, results_page = await self.request_page(
+                    session,
+                    odyssey.get_form_action(form, search_url),
+                    data=odyssey.case_search_payload(form, case_id),
+                )
+                register_url = odyssey.get_link_url(
+                    await self.parse(make_soup, results_page), results_url, case_id
+                )
+                if register_url is None:
+                    return None
+                _, register_page = await self.request_page(session, register_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+            # leave errors another attempt could get past to the retry policy
+            if retries.is_retryable(error):
+                raise
+            return None
+
+        return results_page, register_page
+
+    async def query_found_case(self, case_id: str) -> Optional[scrapers.CasePages]:
+        """
+        Loads the register of actions of a case found by a filing search straight from its link,
+        instead of searching for the case. Returns None if the case wasn't found that way,
+        or its register couldn't be loaded.
+        """
+        search_result = self.search_results.pop(case_id, None)
+        if search_result is None:
+            return None
+        try:
+            async with self.new_session() as session:
+                # the portal only serves pages to sessions started on its homepage
+                await self.request_page(session, self.homepage)
+                _, register_page = await self.request_page(
+                    session, urljoin(self.homepage, search_result.register_link)
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        if not odyssey.is_register_page(register_page):
+            return None
+        return search_result.search_result, register_page
+
+    async def query_case(self, case_id: str) -> Optional[scrapers.CasePages]:
+        return await self.query_found_case(case_id) or await self.query_case_id(case_id)
+
+    async def fetch_case_pages(self, case_id: str) -> Optional[scrapers.CasePages]:
+        """Same as `scrapers.FakeScraper.fetch_case_pages`."""
+        cached_pages = scrapers.get_cached_case_pages(self.page_cache, self.county, case_id)
+        if cached_pages:
+            return cached_pages
+
+        pages = await self.retry(f"Loading case {case_id}", self.query_case, case_id)
+        if pages is not None:
+            scrapers.cache_case_pages(self.page_cache, self.county, case_id, pages)
+        return pages
+
+    async def fetch_parsed_case(self, case_id: str) -> Optional[EvictionCase]:
+        pages = await self.fetch_case_pages(case_id)
+        if pages is None:
+            return None
+        return await self.parse(
+            scrapers.parse_case_pages, case_id, pages, self.parser_class()
+        )
+
+    async def try_to_fetch_parsed_case(self, case_id: str) -> Optional[EvictionCase]:
+        """Same as `fetch_parsed_case`, but returns None if the case couldn't be scraped or parsed."""
+        try:
+            return await self.fetch_parsed_case(case_id)
+        except Exception as error:
+            logger.error(f"Failed to scrape case {case_id}: {error}")
+            return None
+
+    async def make_case_list(self, ids_to_parse: List[str]) -> List[CaseRecord]:
+        """
+        Gets case details for each case number in `ids_to_parse`, with up to
+        MAX_SESSIONS_PER_HOST cases loading at once.
+        """
+        loading = asyncio.Semaphore(config.max_sessions_per_host)
+
+        async def fetch(id_to_parse: str) -> Optional[EvictionCase]:
+            async with loading:
+                return await self.try_to_fetch_parsed_case(id_to_parse)
+
+        fetched_cases = await asyncio.gather(
+            *[fetch(id_to_parse) for id_to_parse in ids_to_parse]
+        )
+        return scrapers.collect_case_list(ids_to_parse, list(fetched_cases))
+
+    async def query_filings(
+        self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
+    ) -> str:
+        """Executes search for case filings between beforedate and afterdate for case_num_prefix, returns content of resulting page"""
+        async with self.new_session() as session:
+            search_url, court_records = await self.load_linked_page(
+                session, self.case_records_link_name
+            )
+            form = odyssey.get_form(court_records)
+            _, content = await self.request_page(
+                session,
+                odyssey.get_form_action(form, search_url),
+                data=odyssey.filings_search_payload(
+                    form, afterdate, beforedate, case_num_prefix
+                ),
+            )
+        return content
+
+    async def search_filings(
+        self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
+    ) -> Tuple[List[calendars.Filing], bool]:
+        """Searches for filings and reads them, so that a page that can't be read is retried too."""
+        filings_page = await self.query_filings(afterdate, beforedate, case_num_prefix)
+        return await self.parse(retries.read_page, calendars.get_filings, filings_page)
+
+    async def fetch_filings(
+        self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
+    ) -> List[str]:
+        """
+        Get filing case numbers between afterdate and beforedate and starting with case_num_prefix.
+
+        When a search hits the portal's result cap, both halves of the date range are searched at once.
+        """
+
+        try:
+            filings, query_needs_splitting = await self.retry(
+                f"Filing search for {case_num_prefix} between {afterdate} and {beforedate}",
+                self.search_filings,
+                afterdate,
+                beforedate,
+                case_num_prefix,
+            )
+        except Exception as error:
+            scrapers.log_missing_filings(case_num_prefix, afterdate, beforedate, error)
+            return []
+
+        filings_case_nums_list = scrapers.record_filings(
+            self, case_num_prefix, afterdate, beforedate, filings, query_needs_splitting
+        )
+        split = query_needs_splitting and scrapers.split_filing_search(
+            afterdate, beforedate, len(filings_case_nums_list)
+        )
+        if not split:
+            return filings_case_nums_list
+
+        end_of_first_range, start_of_second_range = split
+        first_range, second_range = await asyncio.gather(
+            self.fetch_filings(afterdate, end_of_first_range, case_num_prefix),
+            self.fetch_filings(start_of_second_range, beforedate, case_num_prefix),
+        )
+        return first_range + second_range
+
+    async def get_all_case_nums(
+        self, afterdate: datetime.date, beforedate: datetime.date
+    ) -> List[str]:
+        """Get list of all case numbers between `afterdate` and `beforedate`."""
+        responses = await asyncio.gather(
+            *[
+                self.fetch_filings(window_afterdate, window_beforedate, query.prefix)
+                for query in scrapers.calendar_queries(afterdate, beforedate)
+                for window_afterdate, window_beforedate in self.filing_planner.plan(
+                    query.prefix, query.afterdate, query.beforedate
+                )
+            ]
+        )
+        all_case_nums = [case_num for response in responses for case_num in response]
+
+        logger.info(
+            f"Scraped case numbers between {afterdate} and {beforedate} "
+            f"- found {len(all_case_nums)} of them."
+        )
+        logger.info(self.filing_planner.summary())
+        self.filing_planner.save()
+        return all_case_nums
+
+    async def query_settings(
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> str:
+        """Search for case settings between beforedate and afterdate, returns content of resulting page"""
+        async with self.new_session() as session:
+            calendar_url, court_calendar = await self.load_linked_page(
+                session, calendar_link
+            )
+            form = odyssey.get_form(court_calendar)
+            _, content = await self.request_page(
+                session,
+                odyssey.get_form_action(form, calendar_url),
+                data=odyssey.settings_search_payload(
+                    form, afterdate, beforedate, self.date_range_button_id
+                ),
+            )
+        return content
+
+    async def fetch_settings_from_calendar(
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> List[Optional[Dict[str, str]]]:
+        """fetch all settings as a list of dicts"""
+        settings, _ = await self.fetch_calendar_settings(
+            afterdate, beforedate, calendar_link
+        )
+        return settings
+
+    async def search_calendar(
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> Tuple[str, List[Dict[str, str]], bool]:
+        """Queries a calendar and reads its settings, so that a page that can't be read is retried too."""
+        calendar_page = await self.query_settings(afterdate, beforedate, calendar_link)
+        settings, capped = await self.parse(
+            retries.read_page, calendars.get_settings, calendar_page
+        )
+        return calendar_page, settings, capped
+
+    async def fetch_calendar_settings(
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> Tuple[List[Dict[str, str]], bool]:
+        """Fetches all settings as a list of dicts, and whether the calendar hit the result cap."""
+        cached_settings = scrapers.get_cached_calendar_settings(
+            self.page_cache, self.county, calendar_link, afterdate, beforedate
+        )
+        if cached_settings:
+            return cached_settings
+
+        try:
+            calendar_page, settings, capped = await self.retry(
+                f"Calendar query between {afterdate} and {beforedate}",
+                self.search_calendar,
+                afterdate,
+                beforedate,
+                calendar_link,
+            )
+        except Exception as error:
+            scrapers.log_missing_settings(calendar_link, afterdate, beforedate, error)
+            return [], False
+
+        scrapers.cache_calendar_page(
+            self.page_cache, self.county, calendar_link, afterdate, beforedate, calendar_page
+        )
+        return settings, capped
+
+    async def fetch_settings(
+        self, afterdate: datetime.date, beforedate: datetime.date
+    ) -> List[Optional[Dict[str, str]]]:
+        calendar_settings = await asyncio.gather(
+            *[
+                self.fetch_settings_from_calendar(
+                    afterdate=afterdate,
+                    beforedate=beforedate,
+                    calendar_link=calendar_link,
+                )
+                for calendar_link in self.calendar_link_names
+            ]
+        )
+        return [setting for settings in calendar_settings for setting in settings]
+
+    async def make_setting_list(
+        self,
+        days_to_pull: List[datetime.date],
+        on_settings: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pulls all settings, with every calendar queried at once. Each calendar is asked for
+        up to CALENDAR_QUERY_DAYS days at a time, as in `scrapers.FakeScraper.make_setting_list`,
+        or with CALENDAR_QUERY_DAYS set to 1, for every day at once.
+        Passes the settings from each query to `on_settings` as soon as they're pulled,
+        leaving out repeats of settings already passed when querying ranges of days.
+        """
+        pulled_settings: List[Dict[str, Any]] = []
+        seen: set = set()
+
+        def add_settings(settings: List[Dict[str, Any]], dedupe: bool = True) -> None:
+            new_settings = calendars.unique_settings(settings, seen) if dedupe else settings
+            pulled_settings.extend(new_settings)
+            if on_settings is not None:
+                on_settings(new_settings)
+
+        async def fetch_day(setting_day: datetime.date) -> None:
+            add_settings(
+                await self.fetch_settings(afterdate=setting_day, beforedate=setting_day),
+                dedupe=False,
+            )
+
+        if config.calendar_query_days == 1:
+            await asyncio.gather(*[fetch_day(setting_day) for setting_day in days_to_pull])
+            return pulled_settings
+
+        await asyncio.gather(
+            *[
+                self.fetch_settings_in_windows(days_to_pull, calendar_link, add_settings)
+                for calendar_link in self.calendar_link_names
+            ]
+        )
+        return pulled_settings
+
+    async def fetch_settings_in_windows(
+        self,
+        days_to_pull: List[datetime.date],
+        calendar_link: str,
+        on_settings: Optional[Callable[[List[Dict[str, str]]], Any]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Pulls the settings on `days_to_pull` from one calendar, a range of days at a time,
+        as chosen by `calendars.settings_windows`. Passes each range's settings to
+        `on_settings` as soon as they're pulled.
+        """
+        windows = calendars.settings_windows(
+            days_to_pull,
+            config.calendar_query_days,
+            calendar_link=calendar_link,
+            on_settings=on_settings,
+        )
+        try:
+            afterdate, beforedate = next(windows)
+            while True:
+                afterdate, beforedate = windows.send(
+                    await self.fetch_calendar_settings(afterdate, beforedate, calendar_link)
+                )
+        except StopIteration as done:
+            return done.value
+
+
+class AsyncHaysScraper(AsyncTravisScraper):
+    county = "hays"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.homepage = "http://public.co.hays.tx.us/default.aspx"
+
+
+class AsyncWilliamsonScraper(AsyncTravisScraper):
+    parser_class = hearing.WilliamsonParser
+    county = "williamson"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.homepage = "https://judicialrecords.wilco.org/PublicAccess/default.aspx"
+        self.calendar_link_names = ["Jp1 Court Calendar", "Jp3 Court Calendar"]
+
+
+ASYNC_SCRAPER_NAMES = {
+    "travis": AsyncTravisScraper,
+    "williamson": AsyncWilliamsonScraper,
+    "wilco": AsyncWilliamsonScraper,
+}
+
+
+def make_setting_list(
+    county: str,
+    days_to_pull: List[datetime.date],
+    on_settings: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Pulls settings with the async scraper for `county`, for callers that aren't async."""
+
+    async def pull_settings() -> List[Dict[str, Any]]:
+        async with ASYNC_SCRAPER_NAMES[county.lower()]() as scraper:
+            return await scraper.make_setting_list(days_to_pull, on_settings=on_settings)
+
+    return asyncio.run(pull_settings())
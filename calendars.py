@@ -1,10 +1,44 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import logging
-
-from typing import Dict, List, Optional, Tuple
+import re
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from bs4 import SoupStrainer
+from bs4.element import Tag
+
+from html_backend import make_soup
 
 logger = logging.getLogger()
 
+# results tables are top-level tables, so only those (and everything in them) are parsed
+RESULT_TABLES = SoupStrainer("table")
+
+# a comment, a script or style block, or a tag (whose quoted attribute values may hold ">");
+# only tags have a name, so table tags in comments, scripts and attribute values are skipped
+MARKUP = re.compile(
+    r"<!--.*?(?:-->|\Z)|<(script|style)\b.*?</\1\s*>"
+    r"|<(/?)([a-z][a-z0-9]*)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+TABLE_TAGS = ("table", "tr", "thead", "tbody", "tfoot")
+
+# most rows a search results page lists; searches matching more say "too many matches to display"
+RESULT_CAP = 200
+
 
 def get_setting(soup) -> Optional[Dict[str, str]]:
     "get setting as a dict from a row of the table"
@@ -61,48 +95,226 @@ def get_setting(soup) -> Optional[Dict[str, str]]:
     return setting_details
 
 
-def get_setting_list(calendar_soup) -> List[Optional[Dict[str, str]]]:
-    "gets all settings from calendar soup table, as a list of dicts"
-    # get all tables
-    table_list = calendar_soup.find_all("table")
+def top_level_tables(page: str) -> Optional[List[List[Tuple[int, int]]]]:
+    """
+    Finds where the direct rows of each top-level table in `page` start and end, by scanning
+    for table and row tags (outside comments and scripts) without parsing anything else.
+    Returns None if those tags aren't nested the simple way our results tables nest them.
+    """
+    tables: List[List[Tuple[int, int]]] = []
+    open_tags: List[str] = []
+    row_start = 0
+    for tag in MARKUP.finditer(page):
+        if tag.group(3) is None or tag.group(3).lower() not in TABLE_TAGS:
+            continue
+        closing, name = tag.group(2) == "/", tag.group(3).lower()
+        if name not in ("table", "tr"):
+            return None
+        if not closing:
+            if not open_tags and name == "tr":
+                return None
+            if not open_tags:
+                tables.append([])
+            elif open_tags == ["table"] and name == "tr":
+                row_start = tag.start()
+            open_tags.append(name)
+            continue
+
+        if not open_tags or open_tags[-1] != name:
+            return None
+        open_tags.pop()
+        if open_tags == ["table"] and name == "tr":
+            tables[-1].append((row_start, tag.end()))
+    return None if open_tags else tables
+
+
+def parse_row(row_markup: str) -> Tag:
+    return make_soup(f"<table>{row_markup}</table>").find("tr")
+
+
+def results_table_rows(page, header_tag: str, header_text: str) -> Iterator[Tag]:
+    """
+    Yields the rows after the header row of the first table in `page` with a `header_tag` cell
+    reading `header_text`.
+
+    `page` is the content of a search results page, or a soup of one. Content is read one row
+    at a time when its tables are simple enough to split into rows, and otherwise parsed only
+    as far as the page's tables, leaving out the forms and scripts around them.
+    """
+    if isinstance(page, str):
+        tables = top_level_tables(page)
+        if tables is not None:
+            for rows in tables:
+                if not rows or header_text not in page[rows[0][0] : rows[-1][1]]:
+                    continue
+                header_row = parse_row(page[rows[0][0] : rows[0][1]])
+                if header_row.find(header_tag, text=header_text) is None:
+                    # the header is somewhere other than the first row
+                    break
+                for start, end in rows[1:]:
+                    yield parse_row(page[start:end])
+                return
+
+    soup = make_soup(page, parse_only=RESULT_TABLES) if isinstance(page, str) else page
+
+    header_cell = soup.find(header_tag, text=header_text)
+    if header_cell is None:
+        raise ValueError(f"No results table with a '{header_text}' header")
+    # the outermost table holding the header is the first table in the page containing one
+    results_table = [parent for parent in header_cell.parents if parent.name == "table"][-1]
+
+    header_row = results_table.find("tr")
+    for row in header_row.next_siblings:
+        if isinstance(row, Tag) and row.name == "tr":
+            yield row
+
+
+def iter_settings(calendar_page) -> Iterator[Dict[str, str]]:
+    "yields each setting from the table of a court calendar page (or soup), as a dict"
+    for tablerow in results_table_rows(calendar_page, "td", "Judicial Officer"):
+        setting = get_setting(tablerow)
+        if setting is not None:
+            yield setting
+
+
+def get_setting_list(calendar_page) -> List[Optional[Dict[str, str]]]:
+    "gets all settings from a court calendar page (or soup), as a list of dicts"
+    return list(iter_settings(calendar_page))
+
+
+def get_settings(calendar_page) -> Tuple[List[Dict[str, str]], bool]:
+    "gets all settings from a court calendar page (or soup), and whether the calendar hit the result cap"
+    settings = []
+    for tablerow in results_table_rows(calendar_page, "td", "Judicial Officer"):
+        if "too many matches to display" in tablerow.text:
+            logger.warning("Calendar query had too many matches, will be split")
+            return settings, True
+        setting = get_setting(tablerow)
+        if setting is not None:
+            settings.append(setting)
+    return settings, len(settings) >= RESULT_CAP
 
-    # return first table containing string "Judicial Officer" (there may be a better way to do this)
-    officer_table_list = [
-        table
-        for table in table_list
-        if table.find("td", text="Judicial Officer") is not None
-    ]
-    settings_table = officer_table_list[0]
 
-    # get the header row, and all next siblings as a list
-    header_row = settings_table.find_all("tr")[0]
-    tablerow_list = header_row.find_next_siblings("tr")
+def consecutive_runs(days: Iterable[date]) -> Iterator[Tuple[date, date]]:
+    "yields the first and last day of each run of consecutive `days`"
+    days = sorted(set(days))
+    run_start = 0
+    for index, day in enumerate(days):
+        if index + 1 == len(days) or days[index + 1] != day + timedelta(days=1):
+            yield days[run_start], day
+            run_start = index + 1
 
-    setting_list = [get_setting(tablerow) for tablerow in tablerow_list]
-    return [setting for setting in setting_list if setting is not None]
 
+def resize_window(window_days: int, settings_count: int, capped: bool, max_days: int) -> int:
+    """
+    How many days to ask a calendar for next: fewer when the last page came close to the
+    result cap, and more (up to `max_days`) when it was far from it.
+    """
+    if capped or settings_count >= RESULT_CAP * 3 // 4:
+        return max(window_days // 2, 1)
+    if settings_count < RESULT_CAP // 4:
+        return min(window_days * 2, max_days)
+    return window_days
 
-def get_filing_case_nums(filing_soup) -> Tuple[List[str], bool]:
-    "returns list of case numbers given soup of search results"
-    # get all tables
-    table_list = filing_soup.find_all("table")
 
-    # get first table containing string "Filed/Location" in a header (get the main table of the page)
-    filings_table = [
-        table
-        for table in table_list
-        if table.find("th", text="Filed/Location") is not None
-    ][0]
+# what's found by asking a calendar for a range of days: its settings, and whether it hit the cap
+CalendarResult = Tuple[List[Dict[str, str]], bool]
 
-    query_needs_splitting = False
 
-    # get the header row, and all next siblings as a list
-    header_row = filings_table.find_all("tr")[0]
-    tablerow_list = header_row.find_next_siblings("tr")
+def settings_windows(
+    days: Iterable[date],
+    max_days: int,
+    calendar_link: str = "The calendar",
+    on_settings: Optional[Callable[[List[Dict[str, str]]], Any]] = None,
+) -> Generator[Tuple[date, date], CalendarResult, List[Dict[str, str]]]:
+    """
+    Yields the ranges of `days` to ask a calendar for, up to `max_days` days at a time, each of
+    which should be sent back what the calendar answered. Asks for fewer days after a page comes
+    close to the result cap, and for more again once pages are small. A page that hit the cap is
+    asked for again over fewer days. Passes each range's settings to `on_settings` once they're
+    kept, and returns all of them.
+    """
+    kept_settings: List[Dict[str, str]] = []
+    window_days = max_days
+    for first_day, last_day in consecutive_runs(days):
+        afterdate = first_day
+        while afterdate <= last_day:
+            beforedate = min(afterdate + timedelta(days=window_days - 1), last_day)
+            settings, capped = yield afterdate, beforedate
+            next_window_days = resize_window(window_days, len(settings), capped, max_days)
+            if capped and beforedate > afterdate:
+                window_days = min(next_window_days, (beforedate - afterdate).days)
+                continue
+            if capped:
+                logger.error(
+                    f"{calendar_link} has too many settings on {afterdate} to list them all."
+                )
+            kept_settings.extend(settings)
+            if on_settings is not None:
+                on_settings(settings)
+            afterdate = beforedate + timedelta(days=1)
+            window_days = next_window_days
+    return kept_settings
+
+
+def fetch_settings_in_windows(
+    days: Iterable[date],
+    fetch: Callable[[date, date], CalendarResult],
+    max_days: int,
+    calendar_link: str = "The calendar",
+    on_settings: Optional[Callable[[List[Dict[str, str]]], Any]] = None,
+) -> List[Dict[str, str]]:
+    """Asks `fetch` for the settings on `days` in the ranges chosen by `settings_windows`."""
+    windows = settings_windows(days, max_days, calendar_link, on_settings)
+    try:
+        window = next(windows)
+        while True:
+            window = windows.send(fetch(*window))
+    except StopIteration as done:
+        return done.value
+
+
+def unique_settings(
+    settings: Iterable[Dict[str, str]], seen: Optional[Set[Tuple]] = None
+) -> List[Dict[str, str]]:
+    """
+    drops settings that are exact repeats of earlier ones, e.g. from overlapping calendar queries.
+    Pass the same `seen` set with each batch to also drop repeats of settings in earlier batches.
+    """
+    if seen is None:
+        seen = set()
+    unique = []
+    for setting in settings:
+        row = tuple(setting.items())
+        if row not in seen:
+            seen.add(row)
+            unique.append(setting)
+    return unique
+
+
+class Filing(NamedTuple):
+    case_number: str
+    filed_date: Optional[date]
+    # the link to the case's register of actions, and its row of the results as a page of its own
+    register_link: str = ""
+    search_result: str = ""
+
+
+def get_filed_date(td_list) -> Optional[date]:
+    "reads the date a case was filed from the Filed/Location cell of its row"
+    try:
+        return datetime.strptime(td_list[2].text.split()[0], "%m/%d/%Y").date()
+    except (IndexError, ValueError):
+        return None
 
-    # go row by row, get case number
-    case_nums = []
-    for tablerow in tablerow_list:
+
+def get_filings(filing_page) -> Tuple[List[Filing], bool]:
+    "returns the case numbers and filing dates on a search results page (or soup), and whether it hit the cap"
+    query_needs_splitting = False
+
+    # go row by row through the main table of the page, get case number
+    filings = []
+    for tablerow in results_table_rows(filing_page, "th", "Filed/Location"):
         if "too many matches to display" in tablerow.text:
             logger.warning("Case number query had too many matches, will be split")
             query_needs_splitting = True
@@ -113,15 +325,29 @@ def get_filing_case_nums(filing_soup) -> Tuple[List[str], bool]:
             # if "Eviction" in td_list[3].text:
             case_num = td_list[0].text
             if case_num is not None:
-                case_nums.append(case_num)
+                link = td_list[0].find("a", href=True)
+                filings.append(
+                    Filing(
+                        case_num,
+                        get_filed_date(td_list),
+                        link["href"] if link else "",
+                        f"<table>{tablerow}</table>" if link else "",
+                    )
+                )
         except:
             logger.error(f"Couldn't get case number for row {tablerow}")
 
     # handle case of no results
-    if (len(case_nums) == 1) and ("No cases matched" in case_nums[0]):
-        case_nums = []
+    if (len(filings) == 1) and ("No cases matched" in filings[0].case_number):
+        filings = []
+
+    return filings, query_needs_splitting
+
 
-    return case_nums, query_needs_splitting
+def get_filing_case_nums(filing_page) -> Tuple[List[str], bool]:
+    "returns list of case numbers given a search results page (or soup)"
+    filings, query_needs_splitting = get_filings(filing_page)
+    return [filing.case_number for filing in filings], query_needs_splitting
 
 
 def split_date_range(
@@ -0,0 +1,272 @@
+"""
+Module for scraping, parsing and saving cases in stages that run at the same time, so that the
+database isn't idle while cases are scraped and the scrapers aren't idle while cases are saved.
+
+    case numbers -> fetchers -> pages -> parser -> cases -> saver
+
+Each of `workers` fetcher threads has its own scraper session, and loads the search result and
+register of actions of one case at a time, passing on the pages as they came from the court
+website. A parser thread does all the HTML parsing, turning the pages into cases, and the
+calling thread saves them in batches of PERSIST_BATCH_SIZE. The stages are connected by queues
+holding at most PIPELINE_QUEUE_SIZE items, so a fast stage waits for a slow one instead of
+piling up pages, and unless the cases are kept for the caller, memory use doesn't grow with
+the number of cases. If a stage stops early, the stages feeding it stop too instead of waiting
+for room on its queue forever.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+import threading
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+import config
+from cases import CaseRecord
+from emailing import log_and_email
+import scrapers
+
+logger = logging.getLogger()
+logging.basicConfig(stream=sys.stdout)
+
+# put on a queue by a stage that has nothing more to send
+DONE = None
+
+# how often a stage waiting on a queue checks whether the pipeline has stopped
+WAIT_CHECK_SECONDS = 0.1
+
+
+class PipelineResult(NamedTuple):
+    # the parsed cases, in the order they finished parsing, if they were kept
+    cases: List[CaseRecord]
+    parsed: int
+    failed_case_nums: List[str]
+    unsaved_case_nums: List[str]
+
+
+def batches(
+    items: "queue.Queue",
+    batch_size: int,
+    on_item: Optional[Callable[[Any], Any]] = None,
+) -> Iterable[list]:
+    """
+    Takes items off `items` until DONE, in lists of at most `batch_size`.
+    Calls `on_item` with each item as soon as it's taken.
+    """
+    batch = []
+    while True:
+        item = items.get()
+        if item is DONE:
+            break
+        if on_item is not None:
+            on_item(item)
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CasePipeline:
+    def __init__(
+        self,
+        scraper: scrapers.FakeScraper,
+        save: Optional[Callable[[List[CaseRecord]], Optional[List[str]]]] = None,
+        workers: int = 1,
+        batch_size: int = 500,
+        queue_size: int = 100,
+        keep_cases: bool = True,
+        on_case: Optional[Callable[[CaseRecord], Any]] = None,
+    ) -> None:
+        self.scraper = scraper
+        self.save = save
+        self.on_case = on_case
+        self.workers = workers
+        self.batch_size = batch_size
+        self.keep_cases = keep_cases
+        self.to_fetch: queue.Queue = queue.Queue()
+        self.fetched: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.parsed: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.failed_case_nums: List[str] = []
+
+    def fail(self, case_num: str, error: str) -> None:
+        logger.error(f"Failed to scrape case {case_num}: {error}")
+        with self.lock:
+            self.failed_case_nums.append(case_num)
+
+    def put(self, items: "queue.Queue", item: Any) -> bool:
+        """
+        Puts `item` on `items` once there's room for it, unless the pipeline stops first.
+        Returns whether it was put.
+        """
+        while not self.stopping.is_set():
+            try:
+                items.put(item, timeout=WAIT_CHECK_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(self, scraper: scrapers.FakeScraper) -> None:
+        host_limit = scrapers.get_host_limit(scraper.homepage)
+        try:
+            while not self.stopping.is_set():
+                try:
+                    case_num = self.to_fetch.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    with host_limit:
+                        pages = scraper.fetch_case_pages(case_num)
+                except Exception as error:
+                    self.fail(case_num, str(error))
+                    continue
+                if pages is None:
+                    self.fail(case_num, "case not found")
+                    continue
+                if not self.put(self.fetched, (case_num, pages)):
+                    self.fail(case_num, "the pipeline stopped before it was parsed")
+                    return
+        finally:
+            self.put(self.fetched, DONE)
+
+    def parse(self) -> None:
+        fetchers_left = self.workers
+        try:
+            while fetchers_left:
+                try:
+                    item = self.fetched.get(timeout=WAIT_CHECK_SECONDS)
+                except queue.Empty:
+                    if self.stopping.is_set():
+                        return
+                    continue
+                if item is DONE:
+                    fetchers_left -= 1
+                    continue
+                case_num, pages = item
+                try:
+                    case = CaseRecord.from_model(
+                        scrapers.parse_case_pages(
+                            case_num, pages, self.scraper.parser_class()
+                        )
+                    )
+                except Exception as error:
+                    self.fail(case_num, f"could not parse pages: {error}")
+                    continue
+                if not self.put(self.parsed, case):
+                    return
+        except BaseException as error:
+            logger.error(f"Stopped parsing cases: {error!r}")
+            self.stopping.set()
+        finally:
+            self.parsed.put(DONE)
+
+    def persist(self, batch: List[CaseRecord]) -> List[str]:
+        """
+        Saves `batch` and returns the case numbers that couldn't be saved:
+        the ones `save` returned, or the whole batch if it raised.
+        """
+        if self.save is None:
+            return []
+        try:
+            return list(self.save(batch) or [])
+        except Exception as error:
+            logger.error(f"Could not save a batch of {len(batch)} cases: {error}")
+            return [case.case_number for case in batch]
+
+    def stop(self) -> None:
+        """Stops the fetchers and the parser, and drops whatever is still on its way."""
+        self.stopping.set()
+        for _ in batches(self.parsed, self.batch_size):
+            pass
+
+    def unfinished_case_nums(self) -> List[str]:
+        """Takes the case numbers left on the way once the stages have stopped."""
+        case_nums = []
+        for items in (self.to_fetch, self.fetched):
+            while True:
+                try:
+                    item = items.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    case_nums.append(item[0])
+                elif item is not DONE:
+                    case_nums.append(item)
+        return case_nums
+
+    def run(self, case_nums: List[str]) -> PipelineResult:
+        for case_num in case_nums:
+            self.to_fetch.put(case_num)
+        self.workers = max(min(self.workers, len(case_nums)), 1)
+        sessions = [self.scraper] + [
+            self.scraper.new_session() for _ in range(self.workers - 1)
+        ]
+        threads = [
+            threading.Thread(target=self.fetch, args=(session,), daemon=True)
+            for session in sessions
+        ] + [threading.Thread(target=self.parse, daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        cases: List[CaseRecord] = []
+        parsed = 0
+        unsaved_case_nums: List[str] = []
+        try:
+            for batch in batches(self.parsed, self.batch_size, self.on_case):
+                parsed += len(batch)
+                unsaved_case_nums += self.persist(batch)
+                if self.keep_cases:
+                    cases += batch
+                logger.info(f"Parsed {parsed} of {len(case_nums)} cases.")
+        except BaseException:
+            self.stop()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            for session in sessions[1:]:
+                atexit.unregister(session.close_driver)
+                session.close_driver()
+
+        # left behind if the parser stopped early
+        self.failed_case_nums += self.unfinished_case_nums()
+        if self.failed_case_nums:
+            error_message = f"Failed to scrape data for {len(self.failed_case_nums)} case numbers. Here they are:\n{', '.join(self.failed_case_nums)}"
+            log_and_email(error_message, "Failed Case Numbers", error=True)
+
+        return PipelineResult(
+            cases=cases,
+            parsed=parsed,
+            failed_case_nums=self.failed_case_nums,
+            unsaved_case_nums=unsaved_case_nums,
+        )
+
+
+def run_case_pipeline(
+    case_nums: List[str],
+    scraper: scrapers.FakeScraper,
+    save: Optional[Callable[[List[CaseRecord]], Optional[List[str]]]] = None,
+    workers: int = 1,
+    keep_cases: bool = True,
+    on_case: Optional[Callable[[CaseRecord], Any]] = None,
+) -> PipelineResult:
+    """
+    Scrapes and parses each case in `case_nums` with `workers` scraper sessions, and passes
+    the parsed cases to `save` in batches while the rest are still being scraped. `save`
+    returns the case numbers it couldn't save, which end up in `unsaved_case_nums`.
+    Passes each case to `on_case` as soon as it's parsed.
+    """
+    pipeline = CasePipeline(
+        scraper,
+        save=save,
+        workers=workers,
+        batch_size=config.persist_batch_size,
+        queue_size=config.pipeline_queue_size,
+        keep_cases=keep_cases,
+        on_case=on_case,
+    )
+    return pipeline.run(case_nums)
@@ -1,8 +1,10 @@
 from datetime import date
 from decimal import Decimal
-from typing import Any, List, Optional
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple, Union
 
 from pydantic import BaseModel, HttpUrl
+from pydantic.json import pydantic_encoder
 
 
 class EvictionHearing(BaseModel):
@@ -62,3 +64,143 @@ class EvictionCase(BaseModel):
     defendant_address: str = ""
     defendant_race: str = ""
     defendant_gender: str = ""
+
+
+# Compact versions of the models above, for holding and writing out many cases at once.
+#
+# Records are plain tuples, so they take a fraction of the memory of the models and skip
+# validation. They're made from models that were already validated, and turn back into
+# models (validating again) with `to_model()`. `json()` gives the same JSON as the model's
+# `json()`, without building a dict for each case first.
+
+
+def value_json(value, sort_keys: bool = False) -> str:
+    if isinstance(value, (HearingRecord, CaseEventRecord, CaseRecord)):
+        return value.json(sort_keys=sort_keys)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(value_json(item, sort_keys) for item in value) + "]"
+    return json.dumps(value, default=pydantic_encoder)
+
+
+def record_json(record, sort_keys: bool = False) -> str:
+    names = sorted(record._fields) if sort_keys else record._fields
+    return (
+        "{"
+        + ", ".join(
+            f"{json.dumps(name)}: {value_json(getattr(record, name), sort_keys)}"
+            for name in names
+        )
+        + "}"
+    )
+
+
+class HearingRecord(NamedTuple):
+    hearing_date: str = ""
+    hearing_time: str = ""
+    hearing_officer: str = ""
+    appeared: Optional[bool] = None
+    hearing_type: str = ""
+    all_text: str = ""
+
+    @classmethod
+    def from_model(cls, hearing: EvictionHearing) -> "HearingRecord":
+        return cls(*(getattr(hearing, name) for name in cls._fields))
+
+    def to_model(self) -> EvictionHearing:
+        return EvictionHearing(**self._asdict())
+
+    def json(self, sort_keys: bool = False) -> str:
+        return record_json(self, sort_keys)
+
+
+class CaseEventRecord(NamedTuple):
+    case_event_date: Optional[date] = None
+    served_date: str = ""
+    served_subject: str = ""
+    returned: str = ""
+
+    @classmethod
+    def from_model(cls, event: Optional[CaseEvent]) -> Optional["CaseEventRecord"]:
+        if event is None:
+            return None
+        return cls(*(getattr(event, name) for name in cls._fields))
+
+    def to_model(self) -> CaseEvent:
+        return CaseEvent(**self._asdict())
+
+    def json(self, sort_keys: bool = False) -> str:
+        return record_json(self, sort_keys)
+
+
+class CaseRecord(NamedTuple):
+    """An EvictionCase as a tuple, with its fields in the same order."""
+
+    precinct_number: int
+    style: str
+    plaintiff: str
+    active_or_inactive: str
+    judgment_after_moratorium: str
+    defendants: str
+    attorneys_for_plaintiffs: str
+    attorneys_for_defendants: str
+    case_number: str
+    defendant_zip: str
+    plaintiff_zip: str
+    hearings: Tuple[HearingRecord, ...]
+    status: str
+    type: str
+    register_url: Optional[str]
+    disposition_type: str
+    disposition_amount: Optional[Decimal]
+    disposition_date: str
+    disposition_awarded_to: str
+    disposition_awarded_against: str
+    comments: str
+    writ: Optional[CaseEventRecord]
+    writ_of_possession_service: Optional[CaseEventRecord]
+    writ_of_possession_requested: Optional[CaseEventRecord]
+    writ_of_possession_sent_to_constable_office: Optional[CaseEventRecord]
+    writ_returned_to_court: Optional[CaseEventRecord]
+    judgement_for: str
+    match_score: str
+    date_filed: str
+    defendant_address: str = ""
+    defendant_race: str = ""
+    defendant_gender: str = ""
+
+    @classmethod
+    def from_model(cls, case: EvictionCase) -> "CaseRecord":
+        values = []
+        for name in cls._fields:
+            value = getattr(case, name)
+            if name == "hearings":
+                value = tuple(HearingRecord.from_model(hearing) for hearing in value)
+            elif name == "register_url" and value is not None:
+                value = str(value)
+            elif isinstance(value, CaseEvent):
+                value = CaseEventRecord.from_model(value)
+            values.append(value)
+        return cls(*values)
+
+    def to_model(self) -> EvictionCase:
+        """Returns this case as a validated EvictionCase."""
+        fields = self._asdict()
+        fields["hearings"] = [hearing.to_model() for hearing in self.hearings]
+        for name, value in fields.items():
+            if isinstance(value, CaseEventRecord):
+                fields[name] = value.to_model()
+        return EvictionCase(**fields)
+
+    def json(self, sort_keys: bool = False) -> str:
+        return record_json(self, sort_keys)
+
+
+# anything the persistence and output code can read a case from
+CaseLike = Union[EvictionCase, CaseRecord]
+
+
+class CaseCheck(NamedTuple):
+    """The hash of a case when it was last checked for changes, and when that hash last changed."""
+
+    content_hash: str
+    last_changed: date
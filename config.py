@@ -8,3 +8,81 @@ local_dev = os.getenv("LOCAL_DEV") == "true"
 county = os.getenv("COUNTY")
 if county:
     county = county.lower()
+
+# supported values for scraper backend: selenium, http, async
+# (async pulls settings with asyncio, and uses the http scrapers for everything else)
+scraper_backend = (os.getenv("SCRAPER_BACKEND") or "selenium").lower()
+
+# how many scraper sessions may query the same court website at once
+max_sessions_per_host = int(os.getenv("MAX_SESSIONS_PER_HOST") or 4)
+
+# average number of requests per second the async scrapers send to one court website (0 for no limit)
+requests_per_second = float(os.getenv("REQUESTS_PER_SECOND") or 2)
+
+# pooled Chrome drivers are restarted after this many page loads or megabytes of memory (0 to never restart)
+driver_max_pages = int(os.getenv("DRIVER_MAX_PAGES") or 500)
+driver_max_memory_mb = float(os.getenv("DRIVER_MAX_MEMORY_MB") or 350)
+
+# directory for keeping downloaded case and calendar pages (leave unset to always scrape)
+page_cache_dir = os.getenv("PAGE_CACHE_DIR") or ""
+
+# how long cached pages stay fresh for active cases and upcoming calendars,
+# and for inactive cases and calendars of days that have passed
+page_cache_active_ttl_hours = float(os.getenv("PAGE_CACHE_ACTIVE_TTL_HOURS") or 12)
+page_cache_inactive_ttl_days = float(os.getenv("PAGE_CACHE_INACTIVE_TTL_DAYS") or 90)
+
+# whether daily runs only re-scrape old active cases that are due for a check,
+# and only save the ones that changed (needs the CASE_CHECK table)
+incremental_rescrape = os.getenv("INCREMENTAL_RESCRAPE") == "true"
+
+# fewest and most days to wait before checking an unchanged active case again
+rescrape_min_days = int(os.getenv("RESCRAPE_MIN_DAYS") or 1)
+rescrape_max_days = int(os.getenv("RESCRAPE_MAX_DAYS") or 30)
+
+# most database connections a process keeps open at once
+database_pool_size = int(os.getenv("DATABASE_POOL_SIZE") or 4)
+
+# which parser BeautifulSoup uses for court website pages: html.parser, or lxml (faster, needs the lxml package)
+html_parser = os.getenv("HTML_PARSER") or "html.parser"
+
+# how judgment names are fuzzy matched against parties: fuzzywuzzy, or levenshtein (same scores, faster)
+name_match_scorer = os.getenv("NAME_MATCH_SCORER") or "fuzzywuzzy"
+
+# most word pairs whose match scores are remembered
+name_match_cache_size = int(os.getenv("NAME_MATCH_CACHE_SIZE") or 100000)
+
+# file where the filings seen per day are kept, to plan filing searches that stay under
+# the result cap (leave unset to only learn within a run)
+filing_density_file = os.getenv("FILING_DENSITY_FILE") or ""
+
+# most cases a planned filing search is expected to match (the court website lists at most 200)
+filing_query_target = int(os.getenv("FILING_QUERY_TARGET") or 150)
+
+# most days one court calendar query asks for (1 to query one day at a time)
+calendar_query_days = int(os.getenv("CALENDAR_QUERY_DAYS") or 31)
+
+# SQLite file where get_all_filings_settings_between_dates.py records which weeks it has finished,
+# so running it again only does the rest (empty by default, so every week is always done)
+job_ledger_path = os.getenv("JOB_LEDGER_PATH", "")
+
+# how many parsed cases are saved to the database at once while a scraper run goes on
+persist_batch_size = int(os.getenv("PERSIST_BATCH_SIZE") or 500)
+
+# most scraped pages or parsed cases waiting between the stages of a scraper run
+pipeline_queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE") or 100)
+
+# how many times in all a request to a court website is attempted, and the longest random wait
+# before the first retry (doubled before each later retry, up to the max)
+retry_attempts = int(os.getenv("RETRY_ATTEMPTS") or 4)
+retry_base_delay = float(os.getenv("RETRY_BASE_DELAY") or 2)
+retry_max_delay = float(os.getenv("RETRY_MAX_DELAY") or 60)
+
+# how many requests in a row to a county's portal have to fail before its requests are paused,
+# for how long, and after how long down requests stop waiting for it
+circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD") or 5)
+circuit_pause_seconds = float(os.getenv("CIRCUIT_PAUSE_SECONDS") or 60)
+circuit_give_up_minutes = float(os.getenv("CIRCUIT_GIVE_UP_MINUTES") or 30)
+
+# how many lines of JSON output, or how many seconds of it, are written before it's flushed to the file
+jsonl_flush_lines = int(os.getenv("JSONL_FLUSH_LINES") or 100)
+jsonl_flush_seconds = float(os.getenv("JSONL_FLUSH_SECONDS") or 5)
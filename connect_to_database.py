@@ -1,6 +1,10 @@
 """Module for connecting to PostgreSQL database"""
 
+from contextlib import contextmanager
 import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
 import psycopg2
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,3 +18,138 @@ def get_database_connection(local_dev=True):
         conn = psycopg2.connect(os.getenv("DATABASE_URL"))
 
     return conn
+
+
+class ConnectionPool:
+    """
+    Keeps database connections open between uses, so they can be shared by everything in a process.
+
+    At most `max_size` connections are lent out at once; anyone asking for another waits.
+    A connection that has sat unused for `check_after` seconds is checked with a query
+    before it's lent out again, and replaced if the check fails.
+    """
+
+    def __init__(
+        self, connect: Callable, max_size: int = 4, check_after: float = 30
+    ) -> None:
+        self.connect = connect
+        self.check_after = check_after
+        self.idle: List[Tuple[object, float]] = []
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            curs = conn.cursor()
+            curs.execute("SELECT 1")
+            curs.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def close_connection(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def get(self):
+        """Lends out a healthy connection, opening one if none are idle."""
+        self.slots.acquire()
+        try:
+            while True:
+                with self.lock:
+                    conn, idle_since = self.idle.pop() if self.idle else (None, 0.0)
+                if conn is None:
+                    return self.connect()
+                if self.is_healthy(conn, idle_since):
+                    return conn
+                self.close_connection(conn)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def put(self, conn, broken: bool = False) -> None:
+        """Takes back a lent connection, closing it instead if it's `broken`."""
+        try:
+            if broken or conn.closed:
+                self.close_connection(conn)
+            else:
+                with self.lock:
+                    self.idle.append((conn, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator:
+        """
+        Lends out a connection, committing when the block ends or rolling back if it raises.
+        The connection always goes back to the pool, but is closed if it can't be rolled back,
+        or if the block was interrupted (e.g. by KeyboardInterrupt) part way through.
+        """
+        conn = self.get()
+        broken = True
+        try:
+            yield conn
+            conn.commit()
+            broken = False
+        except Exception:
+            try:
+                conn.rollback()
+                broken = False
+            except Exception:
+                pass
+            raise
+        finally:
+            self.put(conn, broken=broken)
+
+    def close(self) -> None:
+        """Closes every idle connection."""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            self.close_connection(conn)
+
+
+connection_pools: Dict[bool, ConnectionPool] = {}
+connection_pools_lock = threading.Lock()
+
+
+def get_connection_pool(local_dev=True) -> ConnectionPool:
+    """Returns the pool shared by this process for the local or production database."""
+    import config
+
+    with connection_pools_lock:
+        pool = connection_pools.get(local_dev)
+        # connections can't be shared with a parent process, so a forked process starts its own pool
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(
+                lambda: get_database_connection(local_dev=local_dev),
+                max_size=config.database_pool_size,
+            )
+            connection_pools[local_dev] = pool
+        return pool
+
+
+def database_connection(local_dev=True):
+    """
+    Context manager lending out a pooled psycopg2 connection, e.g.
+
+        with database_connection(local_dev=config.local_dev) as conn:
+            ...
+    """
+    return get_connection_pool(local_dev=local_dev).connection()
+
+
+def close_connection_pools() -> None:
+    """Closes the idle connections of every pool, e.g. before the process sits idle for a while."""
+    with connection_pools_lock:
+        pools = list(connection_pools.values())
+    for pool in pools:
+        pool.close()
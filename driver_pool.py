@@ -0,0 +1,251 @@
+"""Module for sharing Chrome drivers between scrapers, so a run only pays for starting Chrome once"""
+
+import logging
+import os
+import queue
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import config
+
+logger = logging.getLogger()
+logging.basicConfig(stream=sys.stdout)
+
+
+def make_chrome_driver(headless: bool = True):
+    """Starts a new Chrome driver, using the local chromedriver in local dev."""
+    options = Options()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--headless")
+    options.add_argument("window-size=1920,1080")
+    options.headless = headless
+
+    if config.local_dev:
+        return webdriver.Chrome("./chromedriver", options=options)
+
+    driver_path, chrome_bin = (
+        os.getenv("CHROMEDRIVER_PATH"),
+        os.getenv("GOOGLE_CHROME_BIN"),
+    )
+    options.binary_location = chrome_bin
+    return webdriver.Chrome(executable_path=driver_path, options=options)
+
+
+def get_process_tree_memory_mb(pid: int) -> Optional[float]:
+    """
+    Returns the resident memory, in MB, of process `pid` and all of its descendants
+    (for chromedriver, that's every Chrome process it started).
+    Returns None where /proc isn't available.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+
+    children: dict = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat_file:
+                # the process name is in parentheses and may contain spaces
+                parent_pid = int(stat_file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent_pid, []).append(int(entry))
+
+    total_kb = 0
+    to_visit = [pid]
+    while to_visit:
+        current = to_visit.pop()
+        to_visit.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class PooledDriver:
+    """
+    Wraps a webdriver so the pool can tell how many pages it has loaded.
+    Everything else is passed through to the wrapped driver.
+    """
+
+    def __init__(self, driver) -> None:
+        self.driver = driver
+        self.pages_loaded = 0
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def get(self, url: str) -> None:
+        self.pages_loaded += 1
+        self.driver.get(url)
+
+    def memory_mb(self) -> Optional[float]:
+        try:
+            pid = self.driver.service.process.pid
+        except AttributeError:
+            return None
+        return get_process_tree_memory_mb(pid)
+
+    def is_healthy(self) -> bool:
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+
+class DriverPool:
+    """
+    Lends Chrome drivers to scrapers and takes them back when the scrapers close.
+
+    Keeps at most `size` drivers alive, so it needs to be at least as big as the number of
+    scraper sessions sharing it at once (e.g. the `workers` of a run). Drivers that fail a
+    health check, have loaded `max_pages` pages, or use more than `max_memory_mb` of memory
+    are quit and replaced. Set `max_pages` or `max_memory_mb` to 0 to never recycle for that reason.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        headless: bool = True,
+        make_driver: Optional[Callable] = None,
+        max_pages: Optional[int] = None,
+        max_memory_mb: Optional[float] = None,
+    ) -> None:
+        self.size = size
+        self.make_driver = make_driver or (lambda: make_chrome_driver(headless))
+        self.max_pages = config.driver_max_pages if max_pages is None else max_pages
+        self.max_memory_mb = (
+            config.driver_max_memory_mb if max_memory_mb is None else max_memory_mb
+        )
+        # holds returned drivers, and None for each slot freed by recycling a driver
+        self.idle: queue.Queue = queue.Queue()
+        self.lent: List[PooledDriver] = []
+        # the thread each lent driver was lent to
+        self.borrowers: Dict[int, int] = {}
+        self.started = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start_driver(self) -> PooledDriver:
+        logger.info("Starting a new Chrome driver for the pool.")
+        return PooledDriver(self.make_driver())
+
+    def warm_up(self) -> None:
+        """Starts every driver the pool may hold, so the first scrapers don't wait on Chrome."""
+        while True:
+            with self.lock:
+                if self.started >= self.size:
+                    return
+                self.started += 1
+            self.idle.put(self.start_driver())
+
+    def needs_recycling(self, driver: PooledDriver) -> bool:
+        if self.max_pages and driver.pages_loaded >= self.max_pages:
+            logger.info(f"Recycling driver after {driver.pages_loaded} pages.")
+            return True
+        if self.max_memory_mb:
+            memory_mb = driver.memory_mb()
+            if memory_mb is not None and memory_mb > self.max_memory_mb:
+                logger.info(f"Recycling driver using {round(memory_mb)} MB.")
+                return True
+        return False
+
+    def quit_driver(self, driver: PooledDriver) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.error(f"Could not quit driver: {e}")
+
+    def borrow(self, timeout: Optional[float] = None) -> PooledDriver:
+        """
+        Lends out a healthy driver, starting one if fewer than `size` are alive.
+        Waits up to `timeout` seconds for one to be returned otherwise, unless the calling
+        thread has borrowed all of them, in which case none would ever be returned, so it
+        raises RuntimeError instead.
+        """
+        if self.closed:
+            raise RuntimeError("Cannot borrow a driver from a closed pool")
+
+        try:
+            driver = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_start = self.started < self.size
+                if can_start:
+                    self.started += 1
+                elif self.held_by_current_thread() >= self.size:
+                    raise RuntimeError(
+                        f"This thread already has all {self.size} of the pool's drivers, so "
+                        "borrowing another would wait forever. Make the pool as big as the "
+                        "number of scraper sessions using it."
+                    )
+            driver = self.start_driver() if can_start else self.idle.get(timeout=timeout)
+
+        if driver is None:
+            driver = self.start_driver()
+        elif not driver.is_healthy():
+            logger.warning("Replacing a driver that failed its health check.")
+            self.quit_driver(driver)
+            driver = self.start_driver()
+
+        with self.lock:
+            self.lent.append(driver)
+            self.borrowers[id(driver)] = threading.get_ident()
+        return driver
+
+    def held_by_current_thread(self) -> int:
+        """How many drivers the calling thread has borrowed. Call with the lock held."""
+        current_thread = threading.get_ident()
+        return sum(
+            self.borrowers.get(id(driver)) == current_thread for driver in self.lent
+        )
+
+    def give_back(self, driver: PooledDriver) -> None:
+        """Takes back a lent driver. Giving back a driver twice does nothing."""
+        with self.lock:
+            if driver not in self.lent:
+                return
+            self.lent.remove(driver)
+            self.borrowers.pop(id(driver), None)
+
+        if self.closed:
+            self.quit_driver(driver)
+        elif self.needs_recycling(driver):
+            # leave an empty slot, so the replacement is started the next time a driver is needed
+            self.quit_driver(driver)
+            self.idle.put(None)
+        else:
+            self.idle.put(driver)
+
+    def close(self) -> None:
+        """Quits every driver, including ones still lent out."""
+        self.closed = True
+        with self.lock:
+            drivers, self.lent = self.lent, []
+            self.borrowers = {}
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if driver is not None:
+                drivers.append(driver)
+        for driver in drivers:
+            self.quit_driver(driver)
@@ -0,0 +1,230 @@
+"""
+Module for planning filing searches so that they don't hit the court website's result cap.
+
+A filing search for a case number prefix lists at most FILING_SEARCH_CAP cases. A search that
+matches more comes back with "too many matches to display", and the scraper has to split its
+date range in half and search both halves, so the capped search was a wasted round trip.
+
+The planner remembers how many cases were filed each day for each prefix (read from the filing
+dates on the search results), and splits a date range ahead of time into windows that are each
+predicted to list at most FILING_QUERY_TARGET cases. A day it hasn't seen yet is predicted from
+the recent days it has seen on the same weekday. If a window still hits the cap, the scraper
+splits it in half as before.
+
+Set FILING_DENSITY_FILE to keep what the planner learns between runs.
+"""
+
+from collections import Counter
+import datetime
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import calendars
+import config
+
+# most cases a filing search lists before it has to be split
+FILING_SEARCH_CAP = 200
+
+# how many of the most recent days seen are used to predict days that haven't been seen
+RECENT_DAYS = 91
+
+PREFIX_PATTERN = re.compile(r"^(?P<base>.+?)-(?P<year>\d{2}|\d{4})\*?$")
+
+DateRange = Tuple[datetime.date, datetime.date]
+
+
+def split_prefix(prefix: str) -> Tuple[str, Optional[int]]:
+    """Splits a case number prefix like "J1-CV-2021*" into "J1-CV" and the year 2021."""
+    match = PREFIX_PATTERN.match(prefix)
+    if match is None:
+        return prefix.rstrip("*"), None
+    year = int(match.group("year"))
+    return match.group("base"), year + 2000 if year < 100 else year
+
+
+def days_between(
+    afterdate: datetime.date, beforedate: datetime.date
+) -> Iterator[datetime.date]:
+    for offset in range((beforedate - afterdate).days + 1):
+        yield afterdate + datetime.timedelta(days=offset)
+
+
+class FilingPlanner:
+    """
+    Plans filing searches from the filings seen on earlier searches, and counts how many
+    searches hit the cap. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = "", target: int = 150) -> None:
+        self.path = path
+        self.target = target
+        self.counts: Dict[str, Dict[datetime.date, int]] = {}
+        self.lock = threading.Lock()
+        self.planned: List[Tuple[str, datetime.date, datetime.date]] = []
+        self.queries = 0
+        self.capped_queries = 0
+        if path:
+            self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as density_file:
+                saved = json.load(density_file)
+        except (OSError, ValueError):
+            return
+        self.counts = {
+            base: {
+                datetime.date.fromisoformat(day): count for day, count in days.items()
+            }
+            for base, days in saved.items()
+        }
+
+    def save(self) -> None:
+        """Writes the filings seen so far to FILING_DENSITY_FILE all at once."""
+        if not self.path:
+            return
+        with self.lock:
+            saved = {
+                base: {day.isoformat(): count for day, count in sorted(days.items())}
+                for base, days in self.counts.items()
+            }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(file_descriptor, "w") as temp_file:
+            json.dump(saved, temp_file)
+        os.replace(temp_path, self.path)
+
+    def record(
+        self,
+        prefix: str,
+        afterdate: datetime.date,
+        beforedate: datetime.date,
+        filings: Iterable[calendars.Filing],
+        capped: bool,
+    ) -> None:
+        """
+        Counts a search, and if it listed every matching case, remembers how many were filed each day.
+        Days in another year than the prefix's can't match it, so they aren't remembered.
+        """
+        base, year = split_prefix(prefix)
+        filed_per_day = Counter(filing.filed_date for filing in filings)
+        with self.lock:
+            self.queries += 1
+            if capped:
+                self.capped_queries += 1
+                return
+            days = self.counts.setdefault(base, {})
+            for day in days_between(afterdate, beforedate):
+                if year is None or day.year == year:
+                    days[day] = filed_per_day[day]
+
+    def weekday_averages(self, base: str) -> Dict[int, float]:
+        """Average filings on each weekday, over the RECENT_DAYS most recent days seen."""
+        recent_days = sorted(self.counts.get(base, {}).items())[-RECENT_DAYS:]
+        totals: Counter = Counter()
+        day_counts: Counter = Counter()
+        for day, count in recent_days:
+            totals[day.weekday()] += count
+            day_counts[day.weekday()] += 1
+        averages = {weekday: totals[weekday] / day_counts[weekday] for weekday in day_counts}
+        if averages:
+            overall = sum(totals.values()) / sum(day_counts.values())
+            for weekday in range(7):
+                averages.setdefault(weekday, overall)
+        return averages
+
+    def predicted_filings(
+        self, prefix: str, afterdate: datetime.date, beforedate: datetime.date
+    ) -> Optional[List[float]]:
+        """Predicts how many cases matching `prefix` were filed each day, or None with nothing to go on."""
+        base, year = split_prefix(prefix)
+        with self.lock:
+            seen = dict(self.counts.get(base, {}))
+            averages = self.weekday_averages(base)
+        if not averages:
+            return None
+        return [
+            0
+            if year is not None and day.year != year
+            else seen.get(day, averages[day.weekday()])
+            for day in days_between(afterdate, beforedate)
+        ]
+
+    def plan(
+        self, prefix: str, afterdate: datetime.date, beforedate: datetime.date
+    ) -> List[DateRange]:
+        """
+        Splits the range from `afterdate` to `beforedate` into windows that are each predicted
+        to match at most `target` cases, or doesn't split it if nothing has been seen for `prefix`.
+        """
+        with self.lock:
+            self.planned.append((prefix, afterdate, beforedate))
+        predictions = self.predicted_filings(prefix, afterdate, beforedate)
+        if predictions is None:
+            return [(afterdate, beforedate)]
+
+        windows = []
+        window_start = afterdate
+        window_total = 0.0
+        for day, predicted in zip(days_between(afterdate, beforedate), predictions):
+            if day != window_start and window_total + predicted > self.target:
+                windows.append((window_start, day - datetime.timedelta(days=1)))
+                window_start = day
+                window_total = 0.0
+            window_total += predicted
+        windows.append((window_start, beforedate))
+        return windows
+
+    def searches_without_plan(
+        self, prefix: str, afterdate: datetime.date, beforedate: datetime.date
+    ) -> Tuple[int, int]:
+        """
+        How many searches, and how many capped ones, splitting the range in half whenever
+        a search hits the cap would have sent, going by the filings seen so far.
+        """
+        base, year = split_prefix(prefix)
+        with self.lock:
+            seen = dict(self.counts.get(base, {}))
+        matching = sum(
+            seen.get(day, 0)
+            for day in days_between(afterdate, beforedate)
+            if year is None or day.year == year
+        )
+        if matching <= FILING_SEARCH_CAP or afterdate == beforedate:
+            return 1, 0
+        end_of_first_range, start_of_second_range = calendars.split_date_range(
+            afterdate, beforedate
+        )
+        first_searches, first_capped = self.searches_without_plan(
+            prefix, afterdate, end_of_first_range
+        )
+        second_searches, second_capped = self.searches_without_plan(
+            prefix, start_of_second_range, beforedate
+        )
+        return 1 + first_searches + second_searches, 1 + first_capped + second_capped
+
+    def summary(self) -> str:
+        """Compares the searches sent with the ones halving alone would have sent for the same ranges."""
+        with self.lock:
+            planned = list(self.planned)
+        searches_by_halving = capped_by_halving = 0
+        for prefix, afterdate, beforedate in planned:
+            searches, capped = self.searches_without_plan(prefix, afterdate, beforedate)
+            searches_by_halving += searches
+            capped_by_halving += capped
+        return (
+            f"Sent {self.queries} filing searches, {self.capped_queries} of which hit the cap. "
+            f"Halving alone would have sent about {searches_by_halving}, {capped_by_halving} of which "
+            f"hit the cap, so planning avoided about "
+            f"{max(capped_by_halving - self.capped_queries, 0)} wasted searches."
+        )
+
+
+def get_filing_planner() -> FilingPlanner:
+    """Returns a planner that remembers filings in FILING_DENSITY_FILE, if it's set."""
+    return FilingPlanner(config.filing_density_file, target=config.filing_query_target)
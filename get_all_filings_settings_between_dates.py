@@ -3,16 +3,23 @@ Script to get all filings and settings between two dates.
 
 To use:
 python get_all_filings_settings_between_dates.py mm-dd-yyy mm-dd-yyyy
+
+With --ledger, weeks already parsed are recorded in a ledger (see job_ledger.py), so if a run
+stops part way through, running the same command again only parses the weeks that didn't finish.
 """
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, timedelta
 import logging
+from multiprocessing.util import Finalize
 import sys
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import click
 from colorama import Fore, Style
 
+import config
 from emailing import send_email
+from job_ledger import JobLedger, JobUnit
 import parse_filings
 import parse_settings
 import scrapers
@@ -21,6 +28,9 @@ logger = logging.getLogger()
 logging.basicConfig(stream=sys.stdout)
 logger.setLevel(logging.INFO)
 
+# each week is parsed in these stages, which are recorded in the ledger separately
+STAGES = ["filings", "settings"]
+
 
 def split_into_weeks(start: date, end: date) -> List[Tuple[date, date]]:
     """Get start and end dates for all weeks between specified start and end dates."""
@@ -37,66 +47,171 @@ def split_into_weeks(start: date, end: date) -> List[Tuple[date, date]]:
         return [(start, end)]
 
 
+def parse_stage(
+    stage: str, start: date, end: date, scraper: scrapers.FakeScraper
+) -> List[str]:
+    """Parses one stage of a week, and returns the case numbers that failed to scrape or save."""
+    if stage == "filings":
+        result = parse_filings.run_filings_pipeline(
+            afterdate=start,
+            beforedate=end,
+            get_old_active=False,
+            scraper=scraper,
+            keep_cases=False,
+        )
+        return result.failed_case_nums + result.unsaved_case_nums
+    parse_settings.parse_settings_on_cloud(
+        afterdate=start, beforedate=end, write_to_sheets=False, scraper=scraper
+    )
+    return []
+
+
 def try_to_parse(
-    start: str, end: str, tries: int, scraper: scrapers.FakeScraper
+    start: date,
+    end: date,
+    tries: int,
+    scraper: scrapers.FakeScraper,
+    ledger: Optional[JobLedger] = None,
+    county: str = "travis",
 ) -> str:
     """
     Parses filings and settings between start and end dates.
 
-    Tries `tries` times before giving up.
-    If all attempts fail, returns the start and end date, otherwise returns 'success'.
+    Tries each stage `tries` times before giving up, and skips stages the `ledger` says are done.
+    A stage where some cases failed to scrape or save isn't marked done.
+    If a stage fails, returns the start and end date, otherwise returns 'success'.
     """
 
-    for attempt in range(1, tries + 1):
-        try:
-            parse_filings.parse_filings_on_cloud(
-                afterdate=start, beforedate=end, get_old_active=False, scraper=scraper
-            )
-            parse_settings.parse_settings_on_cloud(
-                afterdate=start, beforedate=end, write_to_sheets=False, scraper=scraper
-            )
+    failed_stages = []
+    for stage in STAGES:
+        unit = JobUnit(county, start, end, stage)
+        if ledger and ledger.is_done(unit):
+            logger.info(f"Skipping {unit}, which the ledger says was already parsed.")
+            continue
+
+        for attempt in range(1, tries + 1):
+            if ledger:
+                ledger.start(unit)
+            try:
+                missing_case_nums = parse_stage(stage, start, end, scraper)
+            except Exception as error:
+                if ledger:
+                    ledger.fail(unit, repr(error))
+                if attempt == tries:
+                    logger.error(f"Error message: {error}")
+                    failed_stages.append(stage)
+                continue
+
+            if missing_case_nums:
+                # each case was already retried, so the stage isn't tried again in this run,
+                # but it's left unfinished so that the next run parses the week again
+                error_message = (
+                    f"{len(missing_case_nums)} cases failed to scrape or save: "
+                    + ", ".join(missing_case_nums)
+                )
+                if ledger:
+                    ledger.fail(unit, error_message)
+                logger.error(f"Error message: {error_message}")
+                failed_stages.append(stage)
+                break
+
+            if ledger:
+                ledger.finish(unit)
             logger.info(
                 Fore.GREEN
-                + "Successfully parsed filings and settings "
+                + f"Successfully parsed {stage} "
                 + f"between {start} and {end} on attempt {attempt}.\n"
                 + Style.RESET_ALL
             )
+            break
 
-            return "success"
-        except Exception as error:
-            if attempt == tries:
-                logger.error(f"Error message: {error}")
+    if not failed_stages:
+        return "success"
 
     message = f"{start}, {end}"
     logger.error(
         Fore.RED
-        + f"Failed to parse filings and settings between {start} "
+        + f"Failed to parse {' and '.join(failed_stages)} between {start} "
         + f"and {end} on all {tries} attempts.\n"
         + Style.RESET_ALL
     )
     return message
 
 
+# the scraper and ledger of a worker process, set up when it starts
+worker_scraper: Optional[scrapers.FakeScraper] = None
+worker_ledger: Optional[JobLedger] = None
+worker_county = ""
+
+
+def start_worker(county: str, showbrowser: bool, ledger: Optional[JobLedger]) -> None:
+    global worker_scraper, worker_ledger, worker_county
+    worker_scraper = scrapers.get_scraper(county, headless=not showbrowser)
+    worker_ledger = ledger
+    worker_county = county
+    # worker processes don't run atexit handlers, so close the browser when the pool shuts down
+    Finalize(worker_scraper, worker_scraper.close_driver, exitpriority=10)
+
+
+def parse_week_in_worker(week: Tuple[date, date]) -> str:
+    week_start, week_end = week
+    return try_to_parse(
+        week_start,
+        week_end,
+        5,
+        scraper=worker_scraper,
+        ledger=worker_ledger,
+        county=worker_county,
+    )
+
+
 def get_all_filings_settings_between_dates(
-    start_date: date, end_date: date, county: str, showbrowser=bool
+    start_date: date,
+    end_date: date,
+    county: str,
+    showbrowser=bool,
+    ledger: Optional[JobLedger] = None,
+    parallel: int = 1,
 ) -> List[str]:
     """
     Gets all filings and settings between `start_date` and `end_date` but splits it up by week.
 
-    Logs the weeks that failed.
+    With a `ledger`, skips the weeks it says were already parsed, and records each week as it goes.
+    With `parallel` above 1, parses that many weeks at once in separate processes, each with its
+    own scraper, but never more than MAX_SESSIONS_PER_HOST for the county.
+    Logs the weeks that failed, and returns them.
     """
 
     weeks = split_into_weeks(start_date, end_date)
     logger.info(
         f"Will get all filings and settings between {start_date} and {end_date}\n"
     )
+    if ledger:
+        logger.info(f"Skipping the weeks that {ledger.path} says were already parsed.")
+
+    workers = min(parallel, config.max_sessions_per_host, len(weeks))
+    if workers < parallel:
+        logger.info(f"Parsing {workers} weeks at once instead of {parallel}.")
 
-    failures: List[str] = []
-    scraper = scrapers.SCRAPER_NAMES[county](headless=not showbrowser)
-    for week_start, week_end in weeks:
-        msg = try_to_parse(week_start, week_end, 5, scraper=scraper)
-        if msg != "success":
-            failures.append(msg)
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=start_worker,
+            initargs=(county, bool(showbrowser), ledger),
+        ) as executor:
+            messages = list(executor.map(parse_week_in_worker, weeks))
+    else:
+        scraper = scrapers.get_scraper(county, headless=not showbrowser)
+        messages = [
+            try_to_parse(
+                week_start, week_end, 5, scraper=scraper, ledger=ledger, county=county
+            )
+            for week_start, week_end in weeks
+        ]
+    failures = [msg for msg in messages if msg != "success"]
+
+    if ledger:
+        logger.info(f"Ledger for {county}: {ledger.summary(county)}.")
 
     if failures:
         failures_str = "\n".join(failures)
@@ -112,11 +227,13 @@ def get_all_filings_settings_between_dates(
             + f"between {start_date} and {end_date} - yay!!"
             + Style.RESET_ALL
         )
+    return failures
 
 
 if __name__ == "__main__":
 
     @click.command()
+    # dates should be in format (m)m-(d)d-yyyy
     @click.argument(
         "start_date", type=click.DateTime(formats=["%Y-%m-%d", "%m-%d-%Y", "%m/%d/%Y"])
     )
@@ -128,9 +245,25 @@ if __name__ == "__main__":
         type=click.Choice(scrapers.SCRAPER_NAMES, case_sensitive=False),
         default="travis",
     )
-
-    # dates should be in format (m)m-(d)d-yyyy
-    def get_all_between_dates(start_date, end_date, county):
-        get_all_filings_settings_between_dates(start_date, end_date, county)
+    @click.option(
+        "--ledger",
+        "ledger_path",
+        default=config.job_ledger_path,
+        help="SQLite file recording the weeks already parsed, so a rerun skips them (every week is parsed if not given)",
+    )
+    @click.option(
+        "--parallel",
+        type=click.IntRange(min=1),
+        default=1,
+        help="how many weeks to parse at once, each in its own process with its own scraper",
+    )
+    def get_all_between_dates(start_date, end_date, county, ledger_path, parallel):
+        get_all_filings_settings_between_dates(
+            start_date.date(),
+            end_date.date(),
+            county,
+            ledger=JobLedger(ledger_path) if ledger_path else None,
+            parallel=parallel,
+        )
 
     get_all_between_dates()
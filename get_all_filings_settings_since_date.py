@@ -7,12 +7,14 @@ python get_all_filings_since_date.py (m)m-(d)d-yyyy
 
 from datetime import date, timedelta
 import sys
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import logging
 
 import click
 
+import config
 import get_all_filings_settings_between_dates as get_filings
+from job_ledger import JobLedger
 import scrapers
 
 logger = logging.getLogger()
@@ -20,16 +22,26 @@ logging.basicConfig(stream=sys.stdout)
 logger.setLevel(logging.INFO)
 
 
-def get_all_filings_settings_since_date(start_date: date, county: str):
+def get_all_filings_settings_since_date(
+    start_date: date,
+    county: str,
+    ledger: Optional[JobLedger] = None,
+    parallel: int = 1,
+):
     """
     Get all filings and settings since `start_date`.
 
-    Splits queries up by week. Logs the weeks that failed.
+    Splits queries up by week, skipping the weeks `ledger` says were parsed, and parses
+    `parallel` weeks at once. Logs the weeks that failed.
     """
 
     yesterdays_date = date.today() - timedelta(days=1)
     get_filings.get_all_filings_settings_between_dates(
-        start_date=start_date, end_date=yesterdays_date, county=county
+        start_date=start_date,
+        end_date=yesterdays_date,
+        county=county,
+        ledger=ledger,
+        parallel=parallel,
     )
 
 
@@ -44,7 +56,24 @@ if __name__ == "__main__":
         type=click.Choice(scrapers.SCRAPER_NAMES, case_sensitive=False),
         default="travis",
     )
-    def get_all_since_date(date, county):
-        get_all_filings_settings_since_date(date, county)
+    @click.option(
+        "--ledger",
+        "ledger_path",
+        default=config.job_ledger_path,
+        help="SQLite file recording the weeks already parsed, so a rerun skips them (every week is parsed if not given)",
+    )
+    @click.option(
+        "--parallel",
+        type=click.IntRange(min=1),
+        default=1,
+        help="how many weeks to parse at once, each in its own process with its own scraper",
+    )
+    def get_all_since_date(date, county, ledger_path, parallel):
+        get_all_filings_settings_since_date(
+            date.date(),
+            county,
+            ledger=JobLedger(ledger_path) if ledger_path else None,
+            parallel=parallel,
+        )
 
     get_all_since_date()
@@ -59,8 +59,8 @@ def write_data(sheet, df):
 def dump_to_sheets(sheet, worksheet, sql="SELECT * FROM table"):
     """Function to dump sql view or table to sheet based on q defaults to selecting all"""
     sheet = open_sheet(init_sheets(), sheet, worksheet)
-    conn = connect_to_database.get_database_connection(local_dev=local_dev)
-    df = pd.read_sql_query(sql, conn)
+    with connect_to_database.database_connection(local_dev=local_dev) as conn:
+        df = pd.read_sql_query(sql, conn)
     write_data(sheet, df)
 
 
@@ -2,15 +2,15 @@
 from decimal import Decimal
 import re
 import sys
-import itertools
 from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
+from bs4.element import Tag
 import datetime
 import logging
 
 from cases import EvictionHearing, CaseEvent, EvictionCase
 from statuses import statuses_map
-from fuzzywuzzy import fuzz
+from name_matching import get_name_matcher
 from emailing import log_and_email
 
 logger = logging.getLogger()
@@ -18,7 +18,74 @@ logger.setLevel(logging.INFO)
 logging.basicConfig(stream=sys.stdout)
 
 
+class RegisterIndex:
+    """
+    The elements of a CaseDetail document that the parsers look up again and again,
+    found in one walk through the document.
+    """
+
+    def __init__(self, soup, plaintiff_label, defendant_label) -> None:
+        self.tables: List[Tag] = []
+        self.captions: List[Tag] = []
+        self.section_titles: List[Tag] = []
+        self.plaintiff_elements: List[Tag] = []
+        self.defendant_elements: List[Tag] = []
+        self.disposition_tr: Optional[Tag] = None
+        self.disposition_date_node: Optional[Tag] = None
+        self.events_tbody: Optional[Tag] = None
+        # first <b> label in the events tbody for each event name, filled in when first needed
+        self.event_labels: Optional[Dict[str, Tag]] = None
+
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            if element.name == "table":
+                self.tables.append(element)
+            elif element.name == "caption":
+                self.captions.append(element)
+            elif element.name == "div" and "ssCaseDetailSectionTitle" in element.get(
+                "class", []
+            ):
+                self.section_titles.append(element)
+            elif element.name == "th":
+                text = element.string
+                if text is not None and plaintiff_label.search(text):
+                    self.plaintiff_elements.append(element)
+                if text is not None and defendant_label.search(text):
+                    self.defendant_elements.append(element)
+                th_id = element.get("id")
+                if th_id is not None and "RDISPDATE" in th_id:
+                    if self.disposition_tr is None:
+                        self.disposition_tr = element.parent
+                    if self.disposition_date_node is None and "RDISPDATE1" in th_id:
+                        self.disposition_date_node = element
+
+
 class BaseParser:
+    plaintiff_label = re.compile(r"Plaintiff")
+    # sometimes the text of the element does not always say "Defendant", but may say something like "Defendant 2"
+    defendant_label = re.compile(r"^Defendant")
+
+    # the page indexed most recently, since the same parser may be handed different pages
+    indexed_soup = None
+    index: Optional[RegisterIndex] = None
+
+    def get_index(self, soup) -> RegisterIndex:
+        """Returns the index of `soup`, indexing it unless it's the page indexed last."""
+        if soup is self.indexed_soup:
+            return self.index
+
+        index = RegisterIndex(soup, self.plaintiff_label, self.defendant_label)
+        try:
+            index.events_tbody = self.find_events_tbody_element(index)
+        except (AttributeError, IndexError):
+            index.events_tbody = None
+
+        # parts of a page, like a disposition <tr>, are cheap to index and not worth keeping
+        if isinstance(soup, BeautifulSoup):
+            self.indexed_soup, self.index = soup, index
+        return index
+
     def get_plaintiff(self, soup):
         # TODO handle multiple plaintiffs
         tag = self.get_plaintiff_elements(soup)[0]
@@ -31,15 +98,14 @@ class BaseParser:
         Gets the plaintiff HTML elements from a CaseDetail.
         These are currently used as an anchor for most of the Party Info parsing.
         """
-        return soup.find_all("th", text=re.compile(r"Plaintiff"))
+        return list(self.get_index(soup).plaintiff_elements)
 
     def get_defendant_elements(self, soup):
         """
         Gets the defendant HTML elements from a CaseDetail.
         These are currently used as an anchor for most of the Party Info parsing.
-        Sometimes the text of the element does not always say "Defendant", but may say something like "Defendant 2".
         """
-        return soup.find_all("th", text=re.compile(r"^Defendant"))
+        return list(self.get_index(soup).defendant_elements)
 
     def get_defendants(self, soup) -> str:
         defendants = []
@@ -101,12 +167,14 @@ class BaseParser:
         return elem.text
 
     def get_style(self, soup) -> str:
-        elem = soup.find_all("table")[4].tbody.tr.td
+        elem = self.get_index(soup).tables[4].tbody.tr.td
         return elem.text.strip()
 
     def get_date_filed(self, soup: BeautifulSoup) -> str:
         """Get date filed for the case filing."""
-        elem = soup.find_all("table")[4].find("th", text="Date Filed:").find_next("b")
+        elem = (
+            self.get_index(soup).tables[4].find("th", text="Date Filed:").find_next("b")
+        )
         return elem.text
 
     def get_zip(self, party_info_th_soup) -> str:
@@ -123,10 +191,7 @@ class BaseParser:
         """
         Returns the <tr> element of a CaseDetail document that contains Disposition info, if one exists.
         """
-        disp_date_th = soup.find(
-            "th", id=lambda id_str: id_str is not None and "RDISPDATE" in id_str
-        )
-        return disp_date_th.parent if disp_date_th is not None else None
+        return self.get_index(soup).disposition_tr
 
     def get_disposition_type(self, disposition_tr) -> str:
         if disposition_tr:
@@ -161,19 +226,38 @@ class BaseParser:
 
         return award_field.next_sibling.text.strip()
 
+    def find_events_tbody_element(self, index: RegisterIndex):
+        """Finds the events <tbody> element among the indexed section titles."""
+        title = re.compile(r"\s*Events & Orders of the Court\s*")
+        table_caption_div = next(
+            (
+                div
+                for div in index.section_titles
+                if div.string is not None and title.search(div.string)
+            ),
+            None,
+        )
+        tbody = table_caption_div.parent.find_next_sibling("tbody")
+        return tbody
+
     def get_events_tbody_element(self, soup):
         """
         Returns the <tbody> element  of a CaseDetail document
         that contains Dispositions, Hearings, and Other Events.
         Used as a starting point for many event parsing methods.
         """
-        table_caption_div = soup.find(
-            "div",
-            class_="ssCaseDetailSectionTitle",
-            text=re.compile(r"\s*Events & Orders of the Court\s*"),
-        )
-        tbody = table_caption_div.parent.find_next_sibling("tbody")
-        return tbody
+        return self.get_index(soup).events_tbody
+
+    def get_event_label(self, soup, event_name: str):
+        """Returns the first <b> element in the events <tbody> whose text is `event_name`."""
+        index = self.get_index(soup)
+        if index.event_labels is None:
+            event_labels: Dict[str, Tag] = {}
+            for label in index.events_tbody.find_all("b"):
+                if label.string is not None:
+                    event_labels.setdefault(str(label.string), label)
+            index.event_labels = event_labels
+        return index.event_labels.get(event_name)
 
     def get_hearing_tags(self, soup) -> List:
         """
@@ -247,7 +331,7 @@ class BaseParser:
         return self.remove_whitespace(name)
 
     def get_disposition_date_node(self, soup) -> Optional[BeautifulSoup]:
-        return soup.find("th", id=re.compile(r"RDISPDATE1")) if soup else None
+        return self.get_index(soup).disposition_date_node if soup else None
 
     def get_disposition_date(self, soup: Optional[BeautifulSoup]) -> Optional[str]:
         if soup is None:
@@ -328,8 +412,7 @@ class BaseParser:
         """Get date for case event entries that only include event name."""
         case_event_date: Optional[str] = None
 
-        case_events = self.get_events_tbody_element(soup)
-        event_label = case_events.find("b", text=event_name)
+        event_label = self.get_event_label(soup, event_name)
         if event_label:
             try:
                 case_event_tr = event_label.parent.parent
@@ -375,8 +458,7 @@ class BaseParser:
     def get_writ(self, soup: BeautifulSoup) -> Optional[CaseEvent]:
         """Get details for the "Writ" case event."""
 
-        case_events = self.get_events_tbody_element(soup)
-        event_label = case_events.find("b", text="Writ")
+        event_label = self.get_event_label(soup, "Writ")
         if not event_label:
             return None
 
@@ -489,35 +571,9 @@ class BaseParser:
             all_text=all_text,
         )
 
-    THRESH = 75
-
-    def lt(self, i):
-        if i > self.THRESH:
-            return i
-        else:
-            return 0
-
-    def fuzzy(self, i):
-        j = fuzz.partial_ratio(i[0].upper(), i[1].upper())
-        return j
-
     def match_wordwise(self, awarded_to, plaintiff, defendant):
-        # Split into word lists
-        a_l = [x.strip(",") for x in awarded_to.split()]
-        p_l = [x.strip(",") for x in plaintiff.split()]
-        d_l = [x.strip(",") for x in defendant.split()]
-        # Build word pairs to match
-        ap_l = [x for x in itertools.product(a_l, p_l)]
-        ad_l = [x for x in itertools.product(a_l, d_l)]
-        # Calculate full matches
-        # pj = [len(j) for j in [set(i) for i in ap_l]].count(1)
-        # dj = [len(j) for j in [set(i) for i in ad_l]].count(1)
-        # Calculate fuzzy matches (>THRES)
-        pj = list(map(self.lt, list(map(self.fuzzy, ap_l))))
-        dj = list(map(self.lt, list(map(self.fuzzy, ad_l))))
-        pj = sum(pj)
-        dj = sum(dj)
-        return (pj, dj)
+        """How well `awarded_to` matches `plaintiff` and `defendant`, word by word."""
+        return get_name_matcher().match_wordwise(awarded_to, plaintiff, defendant)
 
     def match_disposition(
         self,
@@ -624,12 +680,17 @@ class BaseParser:
         except AttributeError:
             disp_type = ""
 
+        defendants = self.get_defendants(soup)
+        awarded_against = self.get_disposition_awarded_against(disposition_tr)
+        awarded_to = self.get_disposition_awarded_to(disposition_tr)
+        comments = self.get_comments(soup)
+
         try:
             score, winner = self.match_disposition(
-                self.get_disposition_awarded_against(disposition_tr),
-                self.get_disposition_awarded_to(disposition_tr),
+                awarded_against,
+                awarded_to,
                 plaintiff,
-                self.get_defendants(soup),
+                defendants,
                 disp_type,
                 status,
             )
@@ -637,8 +698,6 @@ class BaseParser:
             print(e)
             score, winner = None, None
 
-        defendants = self.get_defendants(soup)
-
         disposition_date = self.get_disposition_date(disposition_tr)
         return EvictionCase(
             precinct_number=self.get_precinct_number(soup),
@@ -665,20 +724,14 @@ class BaseParser:
             status=status,
             type=type,
             register_url=register_url or None,
-            disposition_type=self.get_disposition_type(disposition_tr)
-            if disp_type is not None
-            else "",
+            disposition_type=disp_type if disp_type is not None else "",
             disposition_amount=self.get_disposition_amount(disposition_tr),
             disposition_date=disposition_date if disposition_tr is not None else "",
-            disposition_awarded_to=self.get_disposition_awarded_to(disposition_tr),
-            disposition_awarded_against=self.get_disposition_awarded_against(
-                disposition_tr
-            )
-            if self.get_disposition_awarded_against(disposition_tr) is not None
-            else "",
-            comments=self.get_comments(soup)
-            if self.get_comments(soup) is not None
+            disposition_awarded_to=awarded_to,
+            disposition_awarded_against=awarded_against
+            if awarded_against is not None
             else "",
+            comments=comments if comments is not None else "",
             writ=self.get_writ(soup),
             writ_of_possession_service=self.get_writ_of_possession_service(soup),
             writ_of_possession_requested=self.get_writ_of_possession_requested(soup),
@@ -693,13 +746,7 @@ class BaseParser:
 
 
 class HaysParser(BaseParser):
-    def get_defendant_elements(self, soup):
-        """
-        Gets the defendant HTML elements from a CaseDetail.
-        These are currently used as an anchor for most of the Party Info parsing.
-        Sometimes the text of the element does not always say "Defendant", but may say something like "Defendant 2".
-        """
-        return soup.find_all("th", text=re.compile(r"Defendant"))
+    defendant_label = re.compile(r"Defendant")
 
     def get_precinct_number(self, soup) -> int:
         location_heading = soup.find(text=re.compile("Location:")).parent
@@ -842,6 +889,8 @@ class HaysParser(BaseParser):
 
 
 class WilliamsonParser(BaseParser):
+    defendant_label = re.compile(r"^\s*Defendant")
+
     def get_all_text_from_hearing_tag(self, hearing_tag) -> str:
 
         all_text = self.remove_whitespace(hearing_tag.text)
@@ -855,26 +904,14 @@ class WilliamsonParser(BaseParser):
 
         return element.get("id")
 
-    def get_defendant_elements(self, soup):
-        """
-        Gets the defendant HTML elements from a CaseDetail.
-        These are currently used as an anchor for most of the Party Info parsing.
-        Sometimes the text of the element does not always say "Defendant", but may say something like "Defendant 2".
-        """
-        return soup.find_all("th", text=re.compile(r"^\s*Defendant"))
-
-    def get_events_tbody_element(self, soup):
-        """
-        Returns the <tbody> element  of a CaseDetail document
-        that contains Dispositions, Hearings, and Other Events.
-        Used as a starting point for many event parsing methods.
-        """
-        table_caption = soup.find_all("caption")[1]
+    def find_events_tbody_element(self, index: RegisterIndex):
+        """Finds the events <tbody> element, which follows the second table caption."""
+        table_caption = index.captions[1]
         try:
             tbody = table_caption.find_next_sibling("tr").find_next_sibling("tr")
             return tbody
         except AttributeError:
-            return super().get_events_tbody_element(soup)
+            return super().find_events_tbody_element(index)
 
     def get_hearing_date(self, hearing_tag) -> str:
         if hearing_tag is None:
@@ -914,7 +951,7 @@ class WilliamsonParser(BaseParser):
 
     def get_style(self, soup):
         """Get name of the case."""
-        tables = soup.find_all("table")
+        tables = self.get_index(soup).tables
         elem = tables[4].tr.td.b
         return self.remove_whitespace(elem.text)
 
@@ -0,0 +1,146 @@
+"""
+Module for choosing the parser BeautifulSoup uses to read court website pages.
+
+Set HTML_PARSER (or pass --html-parser to the command line tools) to "lxml" for the faster
+C parser, or leave it as Python's built-in "html.parser".
+
+To check that every backend reads our test pages the same way, and see how much faster each one is, run
+
+    python html_backend.py
+"""
+
+import glob
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import click
+from bs4 import BeautifulSoup, SoupStrainer
+
+import config
+
+HTML_PARSERS = ["html.parser", "lxml"]
+
+
+def make_soup(markup, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parses `markup` with the configured HTML parser, keeping only the elements `parse_only` matches."""
+    return BeautifulSoup(markup, config.html_parser, parse_only=parse_only)
+
+
+def set_html_parser(ctx, param, value):
+    """Click callback for the --html-parser option of the command line tools."""
+    if value:
+        config.html_parser = value
+    return value
+
+
+html_parser_option = click.option(
+    "--html-parser",
+    type=click.Choice(HTML_PARSERS),
+    default=None,
+    expose_value=False,
+    callback=set_html_parser,
+    help="which parser BeautifulSoup should use for court website pages",
+)
+
+
+def available_html_parsers() -> List[str]:
+    """Returns the HTML parsers that are installed."""
+    available = []
+    for html_parser in HTML_PARSERS:
+        try:
+            BeautifulSoup("", html_parser)
+        except Exception:
+            continue
+        available.append(html_parser)
+    return available
+
+
+def fixture_readers() -> Dict[str, Callable[[BeautifulSoup], Any]]:
+    """
+    Maps the path of every test page to a function that reads everything we scrape from that page.
+    Comparing what those functions return tells whether two parsers read the pages the same way.
+    """
+    import calendars
+    import case_search
+    import load_pages
+
+    this_directory = os.path.dirname(os.path.realpath(__file__))
+    readers: Dict[str, Callable[[BeautifulSoup], Any]] = {}
+    for path in load_pages.get_test_register_paths():
+        parser_class = load_pages.get_test_parser_class(path)
+        readers[path] = lambda soup, parser_class=parser_class: (
+            parser_class().make_parsed_case(
+                soup,
+                status="Final Disposition",
+                register_url="https://example.com/CaseDetail.aspx",
+            )
+        )
+
+    search_pages = os.path.join(this_directory, "test_search_pages")
+    readers[os.path.join(search_pages, "calendar.html")] = calendars.get_setting_list
+    readers[
+        os.path.join(search_pages, "example_case_query_result.html")
+    ] = calendars.get_filing_case_nums
+    for path in sorted(glob.glob(os.path.join(search_pages, "example_[0-9]*.html"))):
+        readers[path] = lambda soup: (
+            case_search.get_status_and_type(soup),
+            case_search.get_register_url(soup),
+        )
+    return readers
+
+
+def read_fixture(path: str, html_parser: str, reader: Callable[[BeautifulSoup], Any]):
+    with open(path) as page_file:
+        return reader(BeautifulSoup(page_file.read(), html_parser))
+
+
+def time_parsing(html_parser: str, pages: List[str], repeat: int = 5) -> float:
+    """Returns the seconds `html_parser` takes to build soups of all `pages`, best of `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        before = time.perf_counter()
+        for page in pages:
+            BeautifulSoup(page, html_parser)
+        best = min(best, time.perf_counter() - before)
+    return best
+
+
+@click.command()
+@click.option("--repeat", type=click.IntRange(min=1), default=5)
+def compare_html_parsers(repeat: int = 5):
+    """Checks that every installed HTML parser reads the test pages the same way and reports its speedup."""
+    readers = fixture_readers()
+    html_parsers = available_html_parsers()
+    pages = []
+    for path in readers:
+        with open(path) as page_file:
+            pages.append(page_file.read())
+
+    differences = []
+    for path, reader in readers.items():
+        expected = read_fixture(path, "html.parser", reader)
+        for html_parser in html_parsers[1:]:
+            if read_fixture(path, html_parser, reader) != expected:
+                differences.append(f"{html_parser} reads {os.path.basename(path)} differently")
+
+    timings = {
+        html_parser: time_parsing(html_parser, pages, repeat)
+        for html_parser in html_parsers
+    }
+    baseline = timings["html.parser"]
+    for html_parser, seconds in timings.items():
+        click.echo(
+            f"{html_parser}: {round(seconds * 1000, 1)} ms for {len(pages)} pages, "
+            f"{round(baseline / seconds, 2)}x the speed of html.parser"
+        )
+
+    for difference in differences:
+        click.echo(difference, err=True)
+    if differences:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    compare_html_parsers()
@@ -0,0 +1,154 @@
+"""
+Module for keeping track of which parts of a long scraper run are done, so that a run that
+stopped part way through can be started again without redoing them.
+
+A run is split into units of work, one for each county, week and stage ("filings" or "settings").
+The ledger keeps the status of each unit, how many times it has been attempted, and when its
+last attempt started and finished, in a SQLite database (JOB_LEDGER_PATH, if it's set). A unit that was still
+running when a run crashed counts as not done, so it's attempted again on the next run.
+"""
+
+from contextlib import closing
+import datetime
+import sqlite3
+import time
+from typing import List, NamedTuple, Optional
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS JOB_UNIT (
+    COUNTY TEXT NOT NULL,
+    WEEK_START TEXT NOT NULL,
+    WEEK_END TEXT NOT NULL,
+    STAGE TEXT NOT NULL,
+    STATUS TEXT NOT NULL,
+    ATTEMPTS INTEGER NOT NULL DEFAULT 0,
+    STARTED_AT REAL,
+    FINISHED_AT REAL,
+    ERROR TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (COUNTY, WEEK_START, WEEK_END, STAGE)
+)
+"""
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobUnit(NamedTuple):
+    county: str
+    week_start: datetime.date
+    week_end: datetime.date
+    stage: str
+
+    def key(self) -> tuple:
+        return (
+            self.county,
+            self.week_start.isoformat(),
+            self.week_end.isoformat(),
+            self.stage,
+        )
+
+    def __str__(self) -> str:
+        return f"{self.stage} for {self.county} between {self.week_start} and {self.week_end}"
+
+
+class UnitRecord(NamedTuple):
+    unit: JobUnit
+    status: str
+    attempts: int
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    error: str
+
+
+class JobLedger:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with closing(self.connect()) as connection, connection:
+            connection.execute(CREATE_TABLE)
+
+    def connect(self) -> sqlite3.Connection:
+        # other processes may be writing to the same ledger
+        return sqlite3.connect(self.path, timeout=30)
+
+    def update(self, statement: str, parameters: tuple) -> None:
+        with closing(self.connect()) as connection, connection:
+            connection.execute(statement, parameters)
+
+    def start(self, unit: JobUnit) -> None:
+        """Records that an attempt at `unit` started."""
+        self.update(
+            """
+            INSERT INTO JOB_UNIT (COUNTY, WEEK_START, WEEK_END, STAGE, STATUS, ATTEMPTS, STARTED_AT)
+            VALUES (?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (COUNTY, WEEK_START, WEEK_END, STAGE) DO UPDATE SET
+            STATUS = EXCLUDED.STATUS, ATTEMPTS = ATTEMPTS + 1,
+            STARTED_AT = EXCLUDED.STARTED_AT, FINISHED_AT = NULL
+            """,
+            unit.key() + (RUNNING, time.time()),
+        )
+
+    def finish(self, unit: JobUnit) -> None:
+        self.update(
+            """
+            UPDATE JOB_UNIT SET STATUS = ?, FINISHED_AT = ?, ERROR = ''
+            WHERE COUNTY = ? AND WEEK_START = ? AND WEEK_END = ? AND STAGE = ?
+            """,
+            (DONE, time.time()) + unit.key(),
+        )
+
+    def fail(self, unit: JobUnit, error: str) -> None:
+        self.update(
+            """
+            UPDATE JOB_UNIT SET STATUS = ?, FINISHED_AT = ?, ERROR = ?
+            WHERE COUNTY = ? AND WEEK_START = ? AND WEEK_END = ? AND STAGE = ?
+            """,
+            (FAILED, time.time(), error) + unit.key(),
+        )
+
+    def is_done(self, unit: JobUnit) -> bool:
+        record = self.get(unit)
+        return record is not None and record.status == DONE
+
+    def get(self, unit: JobUnit) -> Optional[UnitRecord]:
+        records = self.records(
+            "WHERE COUNTY = ? AND WEEK_START = ? AND WEEK_END = ? AND STAGE = ?",
+            unit.key(),
+        )
+        return records[0] if records else None
+
+    def records(self, where: str = "", parameters: tuple = ()) -> List[UnitRecord]:
+        """Returns the units in the ledger, in order of county, week and stage."""
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT COUNTY, WEEK_START, WEEK_END, STAGE, STATUS, ATTEMPTS, "
+                f"STARTED_AT, FINISHED_AT, ERROR FROM JOB_UNIT {where} "
+                "ORDER BY COUNTY, WEEK_START, WEEK_END, STAGE",
+                parameters,
+            ).fetchall()
+        return [
+            UnitRecord(
+                JobUnit(
+                    county,
+                    datetime.date.fromisoformat(week_start),
+                    datetime.date.fromisoformat(week_end),
+                    stage,
+                ),
+                status,
+                attempts,
+                started_at,
+                finished_at,
+                error,
+            )
+            for county, week_start, week_end, stage, status, attempts, started_at, finished_at, error in rows
+        ]
+
+    def summary(self, county: str) -> str:
+        """Counts the units of `county` by status, e.g. "12 done, 1 failed"."""
+        with closing(self.connect()) as connection:
+            counts = connection.execute(
+                "SELECT STATUS, COUNT(*) FROM JOB_UNIT WHERE COUNTY = ? GROUP BY STATUS ORDER BY STATUS",
+                (county,),
+            ).fetchall()
+        return ", ".join(f"{count} {status}" for status, count in counts) or "nothing recorded"
+
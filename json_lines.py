@@ -0,0 +1,65 @@
+"""
+Module for writing scraper output as JSON lines: one case or setting per line, written as soon
+as it's scraped, so that the output of a long run can be read while the run goes on, and a run
+that stops part way through keeps what it got. Read it back with e.g.
+
+    cases = [json.loads(line) for line in open("cases.jsonl")]
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterable
+
+import config
+from cases import CaseLike
+
+
+class JSONLinesWriter:
+    """
+    Writes JSON lines to `outfile`, flushing it after every `flush_lines` lines,
+    or once `flush_seconds` have passed since it was last flushed.
+    """
+
+    def __init__(
+        self, outfile, flush_lines: int = 100, flush_seconds: float = 5
+    ) -> None:
+        self.outfile = outfile
+        self.flush_lines = flush_lines
+        self.flush_seconds = flush_seconds
+        self.lines = 0
+        self.unflushed_lines = 0
+        self.flushed_at = time.monotonic()
+
+    @classmethod
+    def from_config(cls, outfile) -> "JSONLinesWriter":
+        return cls(
+            outfile,
+            flush_lines=config.jsonl_flush_lines,
+            flush_seconds=config.jsonl_flush_seconds,
+        )
+
+    def write_line(self, line: str) -> None:
+        self.outfile.write(line + "\n")
+        self.lines += 1
+        self.unflushed_lines += 1
+        if (
+            self.unflushed_lines >= self.flush_lines
+            or time.monotonic() - self.flushed_at >= self.flush_seconds
+        ):
+            self.flush()
+
+    def write_case(self, case: CaseLike) -> None:
+        self.write_line(case.json())
+
+    def write_setting(self, setting: Dict[str, Any]) -> None:
+        self.write_line(json.dumps(setting, default=dict))
+
+    def write_settings(self, settings: Iterable[Dict[str, Any]]) -> None:
+        for setting in settings:
+            self.write_setting(setting)
+        self.flush()
+
+    def flush(self) -> None:
+        self.outfile.flush()
+        self.unflushed_lines = 0
+        self.flushed_at = time.monotonic()
@@ -1,7 +1,11 @@
+import glob
 import os
+from typing import List
 
 from bs4 import BeautifulSoup
 
+from html_backend import make_soup
+
 
 def get_test_html_path(index: int, page_type: str, county: str = "example") -> str:
     this_directory = os.path.dirname(os.path.realpath(__file__))
@@ -9,6 +13,24 @@ def get_test_html_path(index: int, page_type: str, county: str = "example") -> s
     return test_filepath
 
 
+def get_test_register_paths() -> List[str]:
+    """Paths of every saved register of actions in test_pages."""
+    this_directory = os.path.dirname(os.path.realpath(__file__))
+    return sorted(glob.glob(os.path.join(this_directory, "test_pages", "*.html")))
+
+
+def get_test_parser_class(path: str):
+    """The parser for the test register of actions at `path`, which depends on its county."""
+    import hearing
+
+    parser_classes = {
+        "example": hearing.BaseParser,
+        "hays": hearing.HaysParser,
+        "williamson": hearing.WilliamsonParser,
+    }
+    return parser_classes[os.path.basename(path).split("_")[0]]
+
+
 def get_test_calendar_path() -> str:
     this_directory = os.path.dirname(os.path.realpath(__file__))
     test_filepath = os.path.join(this_directory, "test_search_pages", "calendar.html")
@@ -26,7 +48,7 @@ def get_test_filing_search_path() -> str:
 
 def load_soup_from_filepath(filepath: str) -> BeautifulSoup:
     with open(filepath) as fp:
-        soup = BeautifulSoup(fp, "html.parser")
+        soup = make_soup(fp)
     return soup
 
 
@@ -59,3 +81,8 @@ def get_test_filings_search_page() -> BeautifulSoup:
 def get_test_calendar_page() -> BeautifulSoup:
     filepath = get_test_calendar_path()
     return load_soup_from_filepath(filepath)
+
+
+def get_test_calendar_content() -> str:
+    with open(get_test_calendar_path()) as fp:
+        return fp.read()
@@ -0,0 +1,331 @@
+"""
+Module for scoring how well the names in a case's judgment match its plaintiff and its defendants.
+
+Every word of the name a judgment was awarded to is fuzzy matched against every word of
+the plaintiff's and the defendants' names. The same landlords turn up in thousands of cases,
+so names are split into words once, the score of each pair of words is remembered
+(for the NAME_MATCH_CACHE_SIZE most recently used pairs), and the pairs a case needs
+that haven't been scored yet are scored together.
+
+Set NAME_MATCH_SCORER to "levenshtein" to score pairs by calling the Levenshtein C library
+directly, which gives the same scores as fuzzywuzzy about a third faster.
+To check that on the test pages (or on the cases saved in a page cache), and see how much
+faster matching is than scoring every pair with fuzzywuzzy, run
+
+    python name_matching.py
+"""
+
+from collections import Counter, OrderedDict
+from functools import lru_cache
+import itertools
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import click
+from fuzzywuzzy import fuzz
+import Levenshtein
+
+import config
+
+# word pairs scoring at or below this don't count as a match
+THRESHOLD = 75
+
+WordPair = Tuple[str, str]
+
+
+def fuzzywuzzy_scorer(pairs: List[WordPair]) -> List[int]:
+    return [fuzz.partial_ratio(word, other_word) for word, other_word in pairs]
+
+
+def levenshtein_partial_ratio(word: str, other_word: str) -> int:
+    """The same score as fuzzywuzzy's partial_ratio (backed by python-Levenshtein), without its wrappers."""
+    if word == other_word:
+        return 100
+    if not word or not other_word:
+        return 0
+    if len(word) <= len(other_word):
+        shorter, longer = word, other_word
+    else:
+        shorter, longer = other_word, word
+
+    best = 0.0
+    blocks = Levenshtein.matching_blocks(
+        Levenshtein.opcodes(shorter, longer), shorter, longer
+    )
+    for shorter_start, longer_start, _ in blocks:
+        start = max(longer_start - shorter_start, 0)
+        ratio = Levenshtein.ratio(shorter, longer[start : start + len(shorter)])
+        if ratio > 0.995:
+            return 100
+        best = max(best, ratio)
+    return int(round(100 * best))
+
+
+def levenshtein_scorer(pairs: List[WordPair]) -> List[int]:
+    return [levenshtein_partial_ratio(word, other_word) for word, other_word in pairs]
+
+
+# each scorer takes a batch of word pairs and returns their scores from 0 to 100
+SCORERS: Dict[str, Callable[[List[WordPair]], List[int]]] = {
+    "fuzzywuzzy": fuzzywuzzy_scorer,
+    "levenshtein": levenshtein_scorer,
+}
+
+
+@lru_cache(maxsize=10000)
+def name_words(name: str) -> Tuple[str, ...]:
+    """Splits `name` into uppercase words without their commas."""
+    return tuple(word.strip(",") for word in name.upper().split())
+
+
+def above_threshold(score: int) -> int:
+    return score if score > THRESHOLD else 0
+
+
+class NameMatcher:
+    """
+    Matches names word by word, keeping the scores of up to `cache_size` word pairs.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        scorer: Callable[[List[WordPair]], List[int]] = fuzzywuzzy_scorer,
+        cache_size: int = 100000,
+    ) -> None:
+        self.scorer = scorer
+        self.cache_size = cache_size
+        self.scores: "OrderedDict[WordPair, int]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def score_pairs(self, pairs: Iterable[WordPair]) -> Dict[WordPair, int]:
+        """Returns the score of each of `pairs`, scoring the ones that aren't cached in one batch."""
+        scores: Dict[WordPair, int] = {}
+        unscored = []
+        with self.lock:
+            for pair in set(pairs):
+                if pair in self.scores:
+                    self.scores.move_to_end(pair)
+                    scores[pair] = self.scores[pair]
+                else:
+                    unscored.append(pair)
+            self.hits += len(scores)
+            self.misses += len(unscored)
+
+        if unscored:
+            new_scores = dict(zip(unscored, self.scorer(unscored)))
+            scores.update(new_scores)
+            with self.lock:
+                self.scores.update(new_scores)
+                while len(self.scores) > self.cache_size:
+                    self.scores.popitem(last=False)
+        return scores
+
+    def match_wordwise(
+        self, awarded_to: str, plaintiff: str, defendant: str
+    ) -> Tuple[int, int]:
+        """
+        Sums the scores above THRESHOLD of every pair of a word from `awarded_to` with a word from
+        `plaintiff`, and of every pair with a word from `defendant`.
+        """
+        awarded_words = Counter(name_words(awarded_to))
+        plaintiff_words = Counter(name_words(plaintiff))
+        defendant_words = Counter(name_words(defendant))
+        scores = self.score_pairs(
+            itertools.chain(
+                itertools.product(awarded_words, plaintiff_words),
+                itertools.product(awarded_words, defendant_words),
+            )
+        )
+
+        def total(party_words: Counter) -> int:
+            # a word appearing twice in a name counts twice, as every pair is summed
+            return sum(
+                awarded_count * party_count * above_threshold(scores[(word, party_word)])
+                for word, awarded_count in awarded_words.items()
+                for party_word, party_count in party_words.items()
+            )
+
+        return total(plaintiff_words), total(defendant_words)
+
+
+name_matcher: Optional[NameMatcher] = None
+name_matcher_lock = threading.Lock()
+
+
+def get_name_matcher() -> NameMatcher:
+    """Returns the matcher shared by every parser in this process, set up from the config."""
+    global name_matcher
+    with name_matcher_lock:
+        if name_matcher is None:
+            name_matcher = NameMatcher(
+                scorer=SCORERS[config.name_match_scorer],
+                cache_size=config.name_match_cache_size,
+            )
+        return name_matcher
+
+
+def match_wordwise_pair_by_pair(
+    awarded_to: str, plaintiff: str, defendant: str
+) -> Tuple[int, int]:
+    """Scores every word pair with fuzzywuzzy, one at a time, like the parsers used to."""
+    awarded_words = [word.strip(",") for word in awarded_to.split()]
+    plaintiff_words = [word.strip(",") for word in plaintiff.split()]
+    defendant_words = [word.strip(",") for word in defendant.split()]
+    return (
+        sum(
+            above_threshold(fuzz.partial_ratio(word.upper(), other_word.upper()))
+            for word, other_word in itertools.product(awarded_words, plaintiff_words)
+        ),
+        sum(
+            above_threshold(fuzz.partial_ratio(word.upper(), other_word.upper()))
+            for word, other_word in itertools.product(awarded_words, defendant_words)
+        ),
+    )
+
+
+def judgment_names(paths: List[str], cache_directory: str = "") -> List[tuple]:
+    """
+    Returns the arguments the parsers would pass to `match_disposition` for each test page
+    in `paths` and each case saved in the page cache at `cache_directory`.
+    """
+    from html_backend import make_soup
+    import load_pages
+
+    soups = []
+    for path in paths:
+        with open(path) as page_file:
+            parser_class = load_pages.get_test_parser_class(path)
+            soups.append((parser_class(), make_soup(page_file.read()), ""))
+    if cache_directory:
+        from page_cache import PageCache
+        import case_search
+        import reparse
+
+        cache = PageCache(cache_directory)
+        for entry in reparse.case_entries(cache):
+            result_page, register_page = [
+                cache.load_page(digest) for digest in entry["pages"]
+            ]
+            status, _ = case_search.get_status_and_type(make_soup(result_page))
+            parser_class = reparse.PARSER_CLASSES[entry["key"].split("/")[0]]
+            soups.append((parser_class(), make_soup(register_page), status))
+
+    names = []
+    for parser, soup, status in soups:
+        # read the same way make_parsed_case reads them
+        disposition_tr = parser.get_disposition_tr_element(soup)
+        try:
+            plaintiff = parser.get_plaintiff(soup)
+        except Exception:
+            plaintiff = ""
+        try:
+            disposition_type = parser.get_disposition_type(disposition_tr)
+        except AttributeError:
+            disposition_type = ""
+        names.append(
+            (
+                parser.get_disposition_awarded_against(disposition_tr),
+                parser.get_disposition_awarded_to(disposition_tr),
+                plaintiff,
+                parser.get_defendants(soup),
+                disposition_type,
+                status,
+            )
+        )
+    return names
+
+
+def time_matching(
+    match_wordwise: Callable[[str, str, str], Tuple[int, int]],
+    names: List[tuple],
+    repeat: int,
+) -> Tuple[float, list]:
+    """Returns the seconds it takes to match the judgments of `names` `repeat` times over, and the matches."""
+    import hearing
+
+    parser = hearing.BaseParser()
+    parser.match_wordwise = match_wordwise
+    before = time.perf_counter()
+    for _ in range(repeat):
+        matches = [parser.match_disposition(*case_names) for case_names in names]
+    return time.perf_counter() - before, matches
+
+
+def word_pairs(names: List[tuple]) -> List[WordPair]:
+    """Returns every pair of words the judgments of `names` are matched on."""
+    pairs = set()
+    for awarded_against, awarded_to, plaintiff, defendant, _, _ in names:
+        for awarded in (awarded_against, awarded_to):
+            for party in (plaintiff, defendant):
+                pairs.update(
+                    itertools.product(name_words(awarded or ""), name_words(party or ""))
+                )
+    return sorted(pairs)
+
+
+def time_scoring(
+    scorer: Callable[[List[WordPair]], List[int]], pairs: List[WordPair], repeat: int
+) -> float:
+    before = time.perf_counter()
+    for _ in range(repeat):
+        scorer(pairs)
+    return time.perf_counter() - before
+
+
+@click.command()
+@click.option("--repeat", type=click.IntRange(min=1), default=200)
+@click.option(
+    "--page-cache",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="also match the cases saved in this page cache",
+)
+def compare_name_matchers(repeat: int = 200, page_cache: Optional[str] = None):
+    """
+    Checks that matching judgments with every scorer gives the same (score, winner) as
+    scoring each word pair with fuzzywuzzy, and reports how much faster it is.
+    """
+    import load_pages
+
+    names = judgment_names(load_pages.get_test_register_paths(), page_cache or "")
+
+    baseline, expected = time_matching(match_wordwise_pair_by_pair, names, repeat)
+    click.echo(
+        f"pair by pair: {round(baseline * 1000, 1)} ms to match {len(names)} cases {repeat} times"
+    )
+    differences = []
+    for scorer_name, scorer in SCORERS.items():
+        matcher = NameMatcher(scorer=scorer, cache_size=config.name_match_cache_size)
+        seconds, matches = time_matching(matcher.match_wordwise, names, repeat)
+        if matches != expected:
+            differences.append(f"{scorer_name} matches judgments differently")
+        click.echo(
+            f"{scorer_name}: {round(seconds * 1000, 1)} ms, "
+            f"{round(baseline / seconds, 2)}x the speed of pair by pair"
+        )
+
+    # without the cache, only the speed of the scorer matters
+    pairs = word_pairs(names)
+    scorer_timings = {
+        scorer_name: time_scoring(scorer, pairs, repeat)
+        for scorer_name, scorer in SCORERS.items()
+    }
+    for scorer_name, seconds in scorer_timings.items():
+        click.echo(
+            f"{scorer_name}: {round(seconds * 1000, 1)} ms to score {len(pairs)} word pairs {repeat} times, "
+            f"{round(scorer_timings['fuzzywuzzy'] / seconds, 2)}x the speed of fuzzywuzzy"
+        )
+
+    for difference in differences:
+        click.echo(difference, err=True)
+    if differences:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    compare_name_matchers()
@@ -0,0 +1,143 @@
+"""Module for replaying Odyssey portal form posts without a browser"""
+
+import datetime
+import re
+from typing import Dict, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+
+def format_date(date: datetime.date) -> str:
+    """Formats a date the way the Odyssey search forms expect it, e.g. 9/1/2020"""
+    return date.strftime(format="%m/%d/%Y").lstrip("0").replace("/0", "/")
+
+
+def get_link_url(soup: BeautifulSoup, base_url: str, link_text: str) -> Optional[str]:
+    """Returns the absolute URL of the first link whose text is `link_text`, if one exists."""
+    for link in soup.find_all("a", href=True):
+        if link.text.strip() == link_text:
+            return urljoin(base_url, link["href"])
+    return None
+
+
+# the register of actions' party information table, which a page sent instead of it won't have
+REGISTER_MARKER = re.compile(r"""id\s*=\s*["']?PIr11\b""")
+
+
+def is_register_page(page: str) -> bool:
+    """Whether `page` is a register of actions, without parsing all of it."""
+    return REGISTER_MARKER.search(page) is not None
+
+
+def get_form(soup: BeautifulSoup):
+    """Returns the ASP.NET form that wraps a search page (the one carrying the viewstate)."""
+    viewstate = soup.find("input", attrs={"name": "__VIEWSTATE"})
+    if viewstate is not None and viewstate.find_parent("form") is not None:
+        return viewstate.find_parent("form")
+    return soup.find("form")
+
+
+def get_form_action(form, page_url: str) -> str:
+    """Returns the absolute URL that `form` posts to."""
+    return urljoin(page_url, form.get("action") or page_url)
+
+
+def get_form_payload(form) -> Dict[str, str]:
+    """
+    Collects the values a browser would submit for `form` if nothing was changed,
+    including hidden ASP.NET fields like __VIEWSTATE and __EVENTVALIDATION.
+    Submit buttons are left out, since only the clicked one is sent.
+    """
+    payload: Dict[str, str] = {}
+    for element in form.find_all("input"):
+        name = element.get("name")
+        if not name:
+            continue
+        input_type = element.get("type", "text").lower()
+        if input_type in ("submit", "button", "image", "reset"):
+            continue
+        if input_type in ("checkbox", "radio"):
+            if element.has_attr("checked"):
+                payload[name] = element.get("value", "on")
+            continue
+        payload[name] = element.get("value", "")
+
+    for select in form.find_all("select"):
+        name = select.get("name")
+        if not name:
+            continue
+        option = select.find("option", selected=True) or select.find("option")
+        if option is not None:
+            payload[name] = option.get("value", option.text)
+
+    for textarea in form.find_all("textarea"):
+        if textarea.get("name"):
+            payload[textarea["name"]] = textarea.text
+
+    return payload
+
+
+def click(form, payload: Dict[str, str], element_id: str) -> None:
+    """Selects the radio button, checkbox, or submit button with id `element_id`."""
+    element = form.find(id=element_id)
+    if element is None:
+        raise ValueError(f"Could not find element {element_id} in search form")
+    payload[element.get("name", element_id)] = element.get("value", "on")
+
+
+def uncheck(form, payload: Dict[str, str], element_id: str) -> None:
+    """Deselects the checkbox with id `element_id`, if it is selected."""
+    element = form.find(id=element_id)
+    if element is None:
+        return
+    payload.pop(element.get("name", element_id), None)
+
+
+def fill(form, payload: Dict[str, str], element_id: str, value: str) -> None:
+    """Types `value` into the text box with id `element_id`."""
+    element = form.find(id=element_id)
+    name = element.get("name", element_id) if element is not None else element_id
+    payload[name] = value
+
+
+def case_search_payload(form, case_id: str) -> Dict[str, str]:
+    """Fields for searching the Case Records page for one case number."""
+    payload = get_form_payload(form)
+    click(form, payload, "Case")
+    fill(form, payload, "CaseSearchValue", case_id)
+    click(form, payload, "SearchSubmit")
+    return payload
+
+
+def filings_search_payload(
+    form, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
+) -> Dict[str, str]:
+    """Fields for searching the Case Records page for cases filed between two dates."""
+    payload = get_form_payload(form)
+    click(form, payload, "Case")
+    fill(form, payload, "DateFiledOnAfter", format_date(afterdate))
+    fill(form, payload, "DateFiledOnBefore", format_date(beforedate))
+    fill(form, payload, "CaseSearchValue", case_num_prefix)
+    click(form, payload, "SearchSubmit")
+    return payload
+
+
+def settings_search_payload(
+    form,
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+    date_range_button_id: str = "DateRange",
+) -> Dict[str, str]:
+    """Fields for searching a court calendar for civil settings between two dates."""
+    payload = get_form_payload(form)
+    click(form, payload, date_range_button_id)
+
+    # deselect all Case Category checkboxes besides Civil
+    for check_id in ["chkDtRangeProbate", "chkDtRangeFamily", "chkDtRangeCriminal"]:
+        uncheck(form, payload, check_id)
+
+    fill(form, payload, "DateSettingOnAfter", format_date(afterdate))
+    fill(form, payload, "DateSettingOnBefore", format_date(beforedate))
+    click(form, payload, "SearchSubmit")
+    return payload
@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 from arcgis import join_features
 from arcgis.gis import GIS
 from arcgis.features import FeatureLayerCollection
-from connect_to_database import get_database_connection
+from connect_to_database import database_connection
 from statuses import statuses_map
 from emailing import log_and_email
 
@@ -18,10 +18,15 @@ logging.basicConfig(stream=sys.stdout)
 logger.setLevel(logging.INFO)
 
 load_dotenv()
-engine = get_database_connection(local_dev=False)
 ARCGIS_USERNAME, ARCGIS_PASSWORD = os.getenv("ARCGIS_USERNAME"), os.getenv("ARCGIS_PASSWORD")
 
 
+def read_sql(sql_query: str) -> pd.DataFrame:
+    """Runs `sql_query` on a pooled connection to the production database"""
+
+    with database_connection(local_dev=False) as conn:
+        return pd.read_sql(sql_query, con=conn)
+
 def overwrite_csv(username: str, password: str, new_df: pd.DataFrame, old_csv_name: str):
     """
     Overwrites the existing table/feature layer named `old_csv_name` using `new_df`
@@ -71,7 +76,7 @@ def create_dates_df() -> pd.DataFrame:
                 	 GROUP BY j_date) AS judgment_counts_by_date
                 ON filing_counts_by_date.f_date = judgment_counts_by_date.j_date
                 """
-    return pd.read_sql(sql_query, con=engine)
+    return read_sql(sql_query)
 
 def create_zips_df() -> pd.DataFrame:
     """Creates a DataFrame with filings count by zip code"""
@@ -83,7 +88,7 @@ def create_zips_df() -> pd.DataFrame:
                 GROUP BY "ZIP_Code"
                 """
 
-    return pd.read_sql(sql_query, con=engine)
+    return read_sql(sql_query)
 
 def create_precincts_df() -> pd.DataFrame:
     """Creates a DataFrame with filings count by precinct."""
@@ -96,7 +101,7 @@ def create_precincts_df() -> pd.DataFrame:
                 WHERE LOWER(case_type) = 'eviction'
                 GROUP BY "Precinct_1", "Precinct"
                 """
-    return pd.read_sql(sql_query, con=engine)
+    return read_sql(sql_query)
 
 def create_jpdata_df() -> pd.DataFrame:
     """Creates a DataFrame with various fields to replicate the JPData2 csv on arcGIS"""
@@ -135,7 +140,7 @@ def create_jpdata_df() -> pd.DataFrame:
                 ORDER BY "Case_Num", setting_date
                 """
 
-    jpdata = pd.read_sql(sql_query, con=engine)
+    jpdata = read_sql(sql_query)
     jpdata["DATE FORMATTED"] = pd.to_datetime(jpdata["Hearing Date"]).apply(lambda x: x + timedelta(days=1)) #this is kinda hacky bc arcGIS for some reason pushes dates back a day?
     jpdata["Status"] = jpdata.apply(lambda case: get_case_status(case), axis=1)
     jpdata["Precinct"] = jpdata.apply(lambda case: case["Case_Num"][1], axis=1)
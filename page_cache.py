@@ -0,0 +1,152 @@
+"""
+Module for keeping the court website pages we download on disk,
+so cases and calendars that haven't changed don't have to be scraped again.
+
+Each page is stored once, gzipped, under the SHA-256 hash of its content. An entry
+for a case or calendar query points to its pages by hash, along with when they were
+fetched and how long they stay fresh. Stale entries are kept, so old pages can still
+be reparsed, but scrapers fetch them again.
+"""
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Iterator, List, Optional
+
+import config
+from statuses import statuses_map
+
+
+def case_key(county: str, case_id: str) -> str:
+    return f"{county}/case/{case_id}"
+
+
+def calendar_key(
+    county: str,
+    calendar_link: str,
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+) -> str:
+    return f"{county}/calendar/{calendar_link}/{afterdate.isoformat()}/{beforedate.isoformat()}"
+
+
+def case_ttl(status: str) -> datetime.timedelta:
+    """
+    How long the pages of a case with substatus `status` stay fresh.
+    Cases that are no longer active rarely change, so they are kept much longer.
+    Cases with an unknown status aren't kept.
+    """
+    status = status.lower()
+    if status not in statuses_map:
+        return datetime.timedelta(0)
+    if statuses_map[status]["is_active"]:
+        return datetime.timedelta(hours=config.page_cache_active_ttl_hours)
+    return datetime.timedelta(days=config.page_cache_inactive_ttl_days)
+
+
+def calendar_ttl(beforedate: datetime.date) -> datetime.timedelta:
+    """How long a calendar page stays fresh. Settings can still change until the days have passed."""
+    if beforedate < datetime.date.today():
+        return datetime.timedelta(days=config.page_cache_inactive_ttl_days)
+    return datetime.timedelta(hours=config.page_cache_active_ttl_hours)
+
+
+class PageCache:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.html.gz")
+
+    def entry_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "entries", digest[:2], f"{digest}.json")
+
+    def write_file(self, path: str, content: bytes) -> None:
+        """Writes `content` to `path` all at once, so other processes never read half a file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+
+    def store_page(self, page: str) -> str:
+        """Stores `page` unless an identical page is already stored, and returns its hash."""
+        content = page.encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            self.write_file(path, gzip.compress(content))
+        return digest
+
+    def load_page(self, digest: str) -> str:
+        with gzip.open(self.object_path(digest), "rb") as page_file:
+            return page_file.read().decode("utf-8")
+
+    def get_entry(self, key: str) -> Optional[dict]:
+        try:
+            with open(self.entry_path(key)) as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("key") == key else None
+
+    def put(
+        self, key: str, pages: List[str], ttl: datetime.timedelta, status: str = ""
+    ) -> None:
+        """Stores `pages` as the content for `key`, fresh for `ttl` from now."""
+        entry = {
+            "key": key,
+            "pages": [self.store_page(page) for page in pages],
+            "status": status,
+            "fetched_at": time.time(),
+            "ttl_seconds": ttl.total_seconds(),
+        }
+        self.write_file(self.entry_path(key), json.dumps(entry).encode("utf-8"))
+
+    def get(self, key: str, include_stale: bool = False) -> Optional[List[str]]:
+        """
+        Returns the pages stored for `key`, or None if there are none
+        or they're past their TTL (unless `include_stale` is set).
+        """
+        entry = self.get_entry(key)
+        if entry is not None and (
+            include_stale or time.time() < entry["fetched_at"] + entry["ttl_seconds"]
+        ):
+            try:
+                pages = [self.load_page(digest) for digest in entry["pages"]]
+            except (OSError, EOFError, UnicodeDecodeError):
+                pages = None
+            if pages is not None:
+                self.hits += 1
+                return pages
+
+        self.misses += 1
+        return None
+
+    def iter_entries(self) -> Iterator[dict]:
+        """Yields every entry in the cache, fresh or stale."""
+        for root, dirs, files in os.walk(os.path.join(self.directory, "entries")):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(root, name)) as entry_file:
+                        entry = json.load(entry_file)
+                except (OSError, ValueError):
+                    continue
+                yield entry
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Returns the cache in PAGE_CACHE_DIR, or None if no directory is set."""
+    if not config.page_cache_dir:
+        return None
+    return PageCache(config.page_cache_dir)
@@ -4,14 +4,20 @@ To perform a scraper run, use: python parse_filings.py afterdate beforedate
 (dates in format mm-dd-yyyy)
 """
 import datetime
+from functools import partial
 import os
 import sys
-import json
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
 
 import click
+
+from case_pipeline import PipelineResult, run_case_pipeline
+from cases import CaseRecord
+from html_backend import html_parser_option
+from json_lines import JSONLinesWriter
+import rescrape
 import scrapers
-from parse_hearings import parse_all_from_parse_filings, persist_parsed_cases
+from parse_hearings import email_unsaved_cases, persist_parsed_cases
 
 import logging
 
@@ -19,19 +25,33 @@ logger = logging.getLogger()
 logging.basicConfig(stream=sys.stdout)
 
 
-def parse_filings_on_cloud(
+def run_filings_pipeline(
     afterdate: datetime.date,
     beforedate: datetime.date,
     get_old_active=True,
     showbrowser=False,
     scraper: Optional[scrapers.FakeScraper] = None,
-):
-    """Parses filings without command line interface and outfile options."""
+    workers: int = 1,
+    incremental: bool = False,
+    keep_cases: bool = True,
+    on_case: Optional[Callable[[CaseRecord], Any]] = None,
+) -> PipelineResult:
+    """
+    Parses filings without command line interface and outfile options.
+
+    Cases are saved in batches while the rest are still being scraped. Returns the result of the
+    pipeline, with the case numbers that failed to scrape or save. It only holds the parsed cases
+    if `keep_cases` is set, so that a long run doesn't hold every case in memory.
+    Each case is passed to `on_case` as soon as it's parsed.
+
+    If `incremental` is set, only old active cases that are due for a check are scraped,
+    and only cases that changed since they were last checked are persisted.
+    """
 
     logger.info(f"Parsing filings between {afterdate} and {beforedate}.")
 
     if not scraper:
-        scraper = scrapers.TravisScraper(headless=not showbrowser)
+        scraper = scrapers.get_scraper(headless=not showbrowser)
 
     all_case_nums = scraper.get_all_case_nums(
         afterdate=afterdate, beforedate=beforedate
@@ -39,18 +59,68 @@ def parse_filings_on_cloud(
     if get_old_active:
         from persist import get_old_active_case_nums
 
-        all_case_nums += get_old_active_case_nums()
+        if incremental:
+            old_active_case_nums = get_old_active_case_nums(due_by=datetime.date.today())
+        else:
+            old_active_case_nums = get_old_active_case_nums()
+        all_case_nums += old_active_case_nums
 
     # using dict to eliminate duplicates
     all_case_nums = list(dict.fromkeys(all_case_nums))
     logger.info(f"Found {len(all_case_nums)} case numbers (including old active ones).")
-    cases = parse_all_from_parse_filings(all_case_nums, scraper=scraper)
 
     # persist cases only if not using the test scraper
+    # failures are emailed once at the end, rather than for each batch
+    save = None
     if isinstance(scraper, scrapers.TravisScraper):
-        persist_parsed_cases(cases)
+        save = (
+            rescrape.persist_changed_cases
+            if incremental
+            else partial(persist_parsed_cases, email_failures=False)
+        )
+
+    result = run_case_pipeline(
+        all_case_nums,
+        scraper=scraper,
+        save=save,
+        workers=workers,
+        keep_cases=keep_cases,
+        on_case=on_case,
+    )
+    logger.info(
+        f"Parsed {result.parsed} cases; {len(result.failed_case_nums)} failed to scrape "
+        f"and {len(result.unsaved_case_nums)} failed to save."
+    )
+    email_unsaved_cases(result.unsaved_case_nums)
+    return result
 
-    return cases
+
+def parse_filings_on_cloud(
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+    get_old_active=True,
+    showbrowser=False,
+    scraper: Optional[scrapers.FakeScraper] = None,
+    workers: int = 1,
+    incremental: bool = False,
+    keep_cases: bool = True,
+    on_case: Optional[Callable[[CaseRecord], Any]] = None,
+):
+    """
+    Parses filings like `run_filings_pipeline`, and returns the parsed cases,
+    or an empty list if `keep_cases` isn't set.
+    """
+    return run_filings_pipeline(
+        afterdate,
+        beforedate,
+        get_old_active=get_old_active,
+        showbrowser=showbrowser,
+        scraper=scraper,
+        workers=workers,
+        incremental=incremental,
+        keep_cases=keep_cases,
+        on_case=on_case,
+    ).cases
 
 
 @click.command()
@@ -70,8 +140,25 @@ def parse_filings_on_cloud(
     default=False,
     help="whether to operate in headless mode or not",
 )
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="how many scraper sessions to run at once",
+)
+@click.option(
+    "--incremental / --all-active",
+    default=False,
+    help="whether to only re-scrape old active cases that are due for a check, and only save cases that changed",
+)
+@html_parser_option
 def parse_filings(
-    afterdate: datetime.date, beforedate: datetime.date, outfile, showbrowser=False
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+    outfile,
+    showbrowser=False,
+    workers=1,
+    incremental=False,
 ):
     """
     Perform a full 'scraper run' between `afterdate` and `beforedate`.
@@ -80,14 +167,22 @@ def parse_filings(
     `afterdate` and `beforedate`.
     Example of date format: 9-1-2020.
     Also updates rows in event/disposition/case_detail table that are still active.
+    Writes each case to `outfile` as a line of JSON as soon as it's parsed.
     """
-    parsed_cases = parse_filings_on_cloud(
-        afterdate=afterdate, beforedate=beforedate, showbrowser=showbrowser
-    )
-
-    if outfile:
-        json.dump(parsed_cases, outfile)
-    return parsed_cases
+    writer = JSONLinesWriter.from_config(outfile) if outfile else None
+    try:
+        parse_filings_on_cloud(
+            afterdate=afterdate,
+            beforedate=beforedate,
+            showbrowser=showbrowser,
+            workers=workers,
+            incremental=incremental,
+            keep_cases=False,
+            on_case=writer and writer.write_case,
+        )
+    finally:
+        if writer:
+            writer.flush()
 
 
 if __name__ == "__main__":
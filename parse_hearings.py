@@ -4,13 +4,17 @@ To perform a scraper run, use: python parse_hearings.py name_of_csv_with_case_nu
 """
 
 import csv
+from functools import partial
 import click
 import logging
 import sys
-import simplejson
 
+from case_pipeline import run_case_pipeline
+from cases import CaseLike
 import scrapers
-from typing import Any, Dict, List, Optional
+from html_backend import html_parser_option
+from json_lines import JSONLinesWriter
+from typing import List, Optional
 from emailing import log_and_email
 
 logger = logging.getLogger()
@@ -28,64 +32,40 @@ def get_ids_to_parse(infile: click.File) -> List[str]:
     return ids_to_parse
 
 
-def parse_all_from_parse_filings(
-    case_nums: List[str],
-    scraper: Optional[scrapers.FakeScraper] = None,
-    db: bool = True,
-    county: str = "travis",
-    showbrowser: bool = False,
-) -> List[Dict[str, Any]]:
+def email_unsaved_cases(case_nums: List[str]) -> None:
+    """Sends one email listing the case numbers that failed to send to SQL, if there are any."""
+    if case_nums:
+        error_message = f"Failed to send the following case numbers to SQL:\n{', '.join(case_nums)}"
+        log_and_email(
+            error_message,
+            "Case Numbers for Which Sending to SQL Failed",
+            error=True,
+        )
+
+
+def persist_parsed_cases(cases: List[CaseLike], email_failures: bool = True) -> List[str]:
     """
-    Gets case details for each case number in `case_nums` and sends the data to PostgreSQL.
-    Logs any case numbers for which getting data failed.
+    Sends `cases` to SQL and returns the case numbers that failed to send.
+    Unless `email_failures` is unset (e.g. when the caller sends many batches and emails
+    about all of their failures at the end), also emails the failed case numbers.
     """
-    if not scraper:
-        # Get the scraper corresponding to the lowercase command line entry for county. Default to TravisScraper.
-        county = county.lower()
-        scraper = (
-            scrapers.SCRAPER_NAMES[county]()
-            if county in scrapers.SCRAPER_NAMES
-            else scrapers.TravisScraper()
-        )
-    parsed_cases = []
-    for tries in range(1, 6):
-        try:
-            parsed_cases = scraper.make_case_list(ids_to_parse=case_nums)
-            return parsed_cases
-        except Exception as e:
-            logger.error(
-                f"Failed to parse hearings on attempt {tries}. Error message: {e}"
-            )
-    return parsed_cases
-
-
-def persist_parsed_cases(cases: List[Dict[str, Any]]) -> None:
     import persist
 
     logger.info(
         f"Finished making case list, now will send all {len(cases)} cases to SQL."
     )
 
-    failed_cases = []
-    for parsed_case in cases:
-        try:
-            persist.rest_case(parsed_case)
-        except:
-            try:
-                failed_cases.append(parsed_case.case_number)
-            except:
-                logger.error(
-                    "A case failed to be parsed but it doesn't have a case number."
-                )
-
-    if failed_cases:
-        error_message = f"Failed to send the following case numbers to SQL:\n{', '.join(failed_cases)}"
-        log_and_email(
-            error_message,
-            "Case Numbers for Which Sending to SQL Failed",
-            error=True,
-        )
+    try:
+        failed_cases = persist.rest_cases(cases)
+    except Exception as error:
+        logger.error(f"Could not send cases to SQL: {error}")
+        failed_cases = [parsed_case.case_number for parsed_case in cases]
+
+    if email_failures:
+        email_unsaved_cases(failed_cases)
+
     logger.info("Finished sending cases to SQL.")
+    return failed_cases
 
 
 @click.command()
@@ -112,23 +92,42 @@ def persist_parsed_cases(cases: List[Dict[str, Any]]) -> None:
     default=True,
     help="whether to persist the data to a db",
 )
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="how many scraper sessions to run at once",
+)
+@html_parser_option
 def parse_all(
     infile: Optional[click.File],
     outfile: Optional[click.File],
     county: Optional[click.STRING],
     showbrowser=False,
     db=True,
+    workers=1,
 ):
-    """Same as `parse_all_from_parse_filings()` but takes in a csv of case numbers instead of a list."""
+    """
+    Gets case details for each case number in the csv `infile` and sends the data to PostgreSQL.
+    Writes each case to `outfile` as a line of JSON as soon as it's parsed.
+    """
 
     ids_to_parse = get_ids_to_parse(infile)
-    parsed_cases = parse_all_from_parse_filings(
-        case_nums=ids_to_parse, showbrowser=showbrowser, db=db, county=county
-    )
-    if db:
-        persist_parsed_cases(parsed_cases)
-    if outfile:
-        simplejson.dump(parsed_cases, outfile, default=dict)
+    scraper = scrapers.get_scraper(county, headless=not showbrowser)
+    writer = JSONLinesWriter.from_config(outfile) if outfile else None
+    try:
+        result = run_case_pipeline(
+            ids_to_parse,
+            scraper=scraper,
+            save=partial(persist_parsed_cases, email_failures=False) if db else None,
+            workers=workers,
+            keep_cases=False,
+            on_case=writer and writer.write_case,
+        )
+    finally:
+        if writer:
+            writer.flush()
+    email_unsaved_cases(result.unsaved_case_nums)
 
 
 if __name__ == "__main__":
@@ -6,12 +6,14 @@ To perform a scraper run, use: python parse_settings.py afterdate beforedate
 import datetime as dt
 import logging
 import sys
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 import os
 import click
-import simplejson as json
 
+import config
 import scrapers
+from html_backend import html_parser_option
+from json_lines import JSONLinesWriter
 
 logger = logging.getLogger()
 logging.basicConfig(stream=sys.stdout)
@@ -27,6 +29,15 @@ def get_days_between_dates(afterdate: str, beforedate: str):
     return [(afterdate + dt.timedelta(days=i)) for i in range(n_days + 1)]
 
 
+def persist_pulled_settings(pulled_settings: List[Dict[str, Any]]) -> None:
+    import persist
+
+    counts = persist.rest_settings(pulled_settings)
+    logger.info(
+        f"Sent settings to SQL: {counts.inserted} new, {counts.skipped} already saved or duplicated."
+    )
+
+
 def parse_settings_on_cloud(
     afterdate: str,
     beforedate: str,
@@ -38,7 +49,7 @@ def parse_settings_on_cloud(
     Outputs scraped results to a gsheet:Settings_scheduler if `write_to_sheets` is True
     """
     if scraper is None:
-        scraper = scrapers.TravisScraper()
+        scraper = scrapers.get_scraper()
     logger.info(f"Parsing settings between {afterdate} and {beforedate}.")
 
     days_to_pull = get_days_between_dates(afterdate=afterdate, beforedate=beforedate)
@@ -46,10 +57,7 @@ def parse_settings_on_cloud(
     if scraper is None:
         scraper = scrapers.TravisScraper(headless=True)
     if isinstance(scraper, scrapers.TravisScraper):
-        import persist
-
-        for setting in pulled_settings:
-            persist.rest_setting(setting)
+        persist_pulled_settings(pulled_settings)
     # maybe make this cleaner in sql? future work
     if write_to_sheets:
         import gsheet
@@ -63,12 +71,25 @@ def parse_settings(
     outfile: str,
     showbrowser=False,
     county: str = "travis",
+    on_settings: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
 ):
-    """Gets data for all settings between `afterdate` and `beforedate` and sends results to PostgreSQL database."""
-    scraper = scrapers.SCRAPER_NAMES[county](headless=not showbrowser)
-
+    """
+    Gets data for all settings between `afterdate` and `beforedate` and sends results to PostgreSQL database.
+    Passes the settings to `on_settings` as they're pulled, a calendar query at a time.
+    With SCRAPER_BACKEND set to "async", every calendar is queried at once with asyncio.
+    """
     days_to_pull = get_days_between_dates(afterdate=afterdate, beforedate=beforedate)
-    pulled_settings = scraper.make_setting_list(days_to_pull)
+    if config.scraper_backend == "async":
+        import async_scrapers
+
+        # the test scraper reads saved pages, so it has no async version
+        if county.lower() in async_scrapers.ASYNC_SCRAPER_NAMES:
+            return async_scrapers.make_setting_list(
+                county, days_to_pull, on_settings=on_settings
+            )
+
+    scraper = scrapers.get_scraper(county, headless=not showbrowser)
+    pulled_settings = scraper.make_setting_list(days_to_pull, on_settings=on_settings)
     return pulled_settings
 
 
@@ -81,13 +102,18 @@ def _parse_and_persist_settings(
     gs: bool = True,
     county: str = "travis",
 ):
+    # written as they're pulled, so the settings aren't lost if the run or saving them fails
+    writer = JSONLinesWriter.from_config(outfile) if outfile else None
     pulled_settings = parse_settings(
-        afterdate, beforedate, outfile, showbrowser, county=county
+        afterdate,
+        beforedate,
+        outfile,
+        showbrowser,
+        county=county,
+        on_settings=writer.write_settings if writer else None,
     )
     if db:
-        import persist
-        for setting in pulled_settings:
-            persist.rest_setting(setting)
+        persist_pulled_settings(pulled_settings)
     # write to google sheets if credentials exist
     if os.getenv("GOOGLE_SHEETS_CREDS_JSON") is None:
         gs = False
@@ -97,8 +123,6 @@ def _parse_and_persist_settings(
 
         gsheet.write_pulled_settings(pulled_settings)
 
-    if outfile:
-        json.dump(pulled_settings, outfile, default=dict)
     return pulled_settings
 
 
@@ -134,6 +158,7 @@ def _parse_and_persist_settings(
     type=click.Choice(scrapers.SCRAPER_NAMES, case_sensitive=False),
     default="travis",
 )
+@html_parser_option
 def parse_and_persist_settings(
     afterdate: dt.date,
     beforedate: dt.date,
@@ -0,0 +1,248 @@
+"""
+Module for timing the parsers field by field on the test pages, so we can tell whether
+a parser change makes nightly reparses slower.
+
+Each benchmark is run on every test page it applies to, `--repeat` times over. For each one,
+the median (p50) and 95th percentile (p95) time of a call is reported, along with the peak
+memory a call allocates and how many of its memory blocks are still allocated when it returns.
+To check a change, save a baseline before making it and compare against it afterwards:
+
+    python parser_benchmarks.py --save-baseline benchmarks.json
+    python parser_benchmarks.py --baseline benchmarks.json
+
+Comparing exits with an error if any benchmark's p50 got slower than `--tolerance` allows.
+"""
+
+import gc
+import inspect
+import json
+import math
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import click
+
+import calendars
+import hearing
+from html_backend import html_parser_option, make_soup
+import load_pages
+
+PARSER_CLASSES = [hearing.BaseParser, hearing.HaysParser, hearing.WilliamsonParser]
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    calls: int
+    p50_ms: float
+    p95_ms: float
+    peak_kib: float
+    retained_blocks: int
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """The value `fraction` of the way through `sorted_values`, by the nearest-rank method."""
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def soup_getters(parser_class) -> List[str]:
+    """Names of the parser's getters that read a whole register of actions."""
+    return [
+        name
+        for name, function in inspect.getmembers(parser_class, inspect.isfunction)
+        if name.startswith("get_")
+        and name != "get_index"
+        and list(inspect.signature(function).parameters) == ["self", "soup"]
+    ]
+
+
+def call_quietly(function: Callable, *args) -> Any:
+    # some fields are missing from some pages, and the parsers raise when they are
+    try:
+        return function(*args)
+    except Exception:
+        return None
+
+
+def register_benchmarks() -> Dict[str, List[Callable[[], Any]]]:
+    """Maps the name of each benchmark on the registers of actions to its calls, one per test page."""
+    benchmarks: Dict[str, List[Callable[[], Any]]] = {}
+    for path in load_pages.get_test_register_paths():
+        parser_class = load_pages.get_test_parser_class(path)
+        soup = load_pages.load_soup_from_filepath(path)
+        prefix = parser_class.__name__
+
+        # a new parser indexes the page again, as it would for every case in a reparse
+        benchmarks.setdefault(f"{prefix}.get_index", []).append(
+            lambda parser_class=parser_class, soup=soup: parser_class().get_index(soup)
+        )
+        benchmarks.setdefault(f"{prefix}.make_parsed_case", []).append(
+            lambda parser_class=parser_class, soup=soup: call_quietly(
+                parser_class().make_parsed_case,
+                soup,
+                "Final Disposition",
+                "Eviction",
+                "https://example.com/CaseDetail.aspx",
+            )
+        )
+
+        # getters are timed on a page that's already indexed, as in make_parsed_case
+        parser = parser_class()
+        parser.get_index(soup)
+        for name in soup_getters(parser_class):
+            benchmarks.setdefault(f"{prefix}.{name}", []).append(
+                lambda getter=getattr(parser, name), soup=soup: call_quietly(getter, soup)
+            )
+    return benchmarks
+
+
+def results_page_benchmarks() -> Dict[str, List[Callable[[], Any]]]:
+    """Maps the name of each benchmark on the search results pages to its calls."""
+    calendar_page = load_pages.get_test_calendar_content()
+    with open(load_pages.get_test_filing_search_path()) as page_file:
+        filings_page = page_file.read()
+    return {
+        "calendars.get_setting_list": [
+            lambda: calendars.get_setting_list(calendar_page)
+        ],
+        "calendars.get_filing_case_nums": [
+            lambda: calendars.get_filing_case_nums(filings_page)
+        ],
+        "make_soup(calendar)": [lambda: make_soup(calendar_page)],
+    }
+
+
+def all_benchmarks() -> Dict[str, List[Callable[[], Any]]]:
+    return {**register_benchmarks(), **results_page_benchmarks()}
+
+
+def measure(name: str, calls: List[Callable[[], Any]], repeat: int) -> BenchmarkResult:
+    """Times each of `calls` `repeat` times, then measures the memory of one more round of them."""
+    durations = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for call in calls:
+                before = time.perf_counter()
+                call()
+                durations.append(time.perf_counter() - before)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # tracing memory slows calls down, so it's kept out of the timings
+    peaks = []
+    retained = []
+    for call in calls:
+        tracemalloc.start()
+        try:
+            result = call()
+            retained.append(
+                sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+            )
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        del result
+
+    durations.sort()
+    return BenchmarkResult(
+        name=name,
+        calls=len(durations),
+        p50_ms=percentile(durations, 0.5) * 1000,
+        p95_ms=percentile(durations, 0.95) * 1000,
+        peak_kib=max(peaks) / 1024,
+        retained_blocks=max(retained),
+    )
+
+
+def run_benchmarks(repeat: int = 20, only: str = "") -> List[BenchmarkResult]:
+    """Runs the benchmarks whose names contain `only`."""
+    return [
+        measure(name, calls, repeat)
+        for name, calls in sorted(all_benchmarks().items())
+        if only in name
+    ]
+
+
+def compare_to_baseline(
+    results: List[BenchmarkResult], baseline: Dict[str, dict], tolerance: float
+) -> List[str]:
+    """Returns a message for each benchmark whose p50 is more than `tolerance` times its baseline p50."""
+    regressions = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None or before["p50_ms"] == 0:
+            continue
+        ratio = result.p50_ms / before["p50_ms"]
+        if ratio > tolerance:
+            regressions.append(
+                f"{result.name} is {round(ratio, 2)}x slower "
+                f"({round(before['p50_ms'], 3)} ms -> {round(result.p50_ms, 3)} ms)"
+            )
+    return regressions
+
+
+def format_result(result: BenchmarkResult, before: Optional[dict] = None) -> str:
+    line = (
+        f"{result.name:<60} {result.p50_ms:>9.3f} {result.p95_ms:>9.3f} "
+        f"{result.peak_kib:>10.1f} {result.retained_blocks:>8}"
+    )
+    if before and before["p50_ms"]:
+        line += f" {result.p50_ms / before['p50_ms']:>8.2f}x"
+    return line
+
+
+@click.command()
+@click.option("--repeat", type=click.IntRange(min=1), default=20)
+@click.option("--only", default="", help="only run benchmarks whose names contain this")
+@click.option(
+    "--save-baseline",
+    type=click.File(mode="w"),
+    default=None,
+    help="save the results to this file to compare against later",
+)
+@click.option(
+    "--baseline",
+    type=click.File(mode="r"),
+    default=None,
+    help="compare the results to ones saved with --save-baseline",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=1.25,
+    help="how many times slower than the baseline a p50 may get before failing",
+)
+@html_parser_option
+def benchmark_parsers(
+    repeat: int = 20,
+    only: str = "",
+    save_baseline=None,
+    baseline=None,
+    tolerance: float = 1.25,
+):
+    """Times every parser field on the test pages, and compares the timings to a baseline."""
+    results = run_benchmarks(repeat=repeat, only=only)
+    baseline_results: Dict[str, dict] = json.load(baseline) if baseline else {}
+
+    header = f"{'benchmark':<60} {'p50 ms':>9} {'p95 ms':>9} {'peak KiB':>10} {'blocks':>8}"
+    click.echo(header + (f" {'vs base':>9}" if baseline else ""))
+    for result in results:
+        click.echo(format_result(result, baseline_results.get(result.name)))
+
+    if save_baseline:
+        json.dump({result.name: result._asdict() for result in results}, save_baseline, indent=2)
+
+    regressions = compare_to_baseline(results, baseline_results, tolerance)
+    for regression in regressions:
+        click.echo(regression, err=True)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark_parsers()
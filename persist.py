@@ -1,159 +1,337 @@
 """Module for writing data to and reading from PostgreSQL database"""
 
+import csv
+import datetime
+import io
 import os
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from psycopg2.extras import execute_values
 import config
-from connect_to_database import get_database_connection
-from cases import EvictionCase
-
+from connect_to_database import database_connection
+from cases import CaseCheck, CaseLike
 
 
 def get_case(case_id: str) -> Dict:
-    conn = get_database_connection(local_dev=config.local_dev)
-
-    # conn.row_factory = sqlite3.Row
-    curs = conn.cursor()
-    curs.execute("SELECT * FROM V_CASE WHERE CASE_NUMBER = ?", (case_id,))
-    case = curs.fetchone()
-    curs.close()
+    with database_connection(local_dev=config.local_dev) as conn:
+        # conn.row_factory = sqlite3.Row
+        curs = conn.cursor()
+        curs.execute("SELECT * FROM V_CASE WHERE CASE_NUMBER = ?", (case_id,))
+        case = curs.fetchone()
+        curs.close()
     return dict(case)
 
 
-def rest_case(case: EvictionCase):
-    """
-    Takes a EvictionCase class representation of a case and maps it into the CASE_DETAIL, DISPOSITION,
-    and EVENT table of the PostgreSQL database
-    """
-
-    conn = get_database_connection(local_dev=config.local_dev)
-    curs = conn.cursor()
-    curs.execute(
-        """
+CASE_DETAIL_UPSERT = """
     INSERT INTO CASE_DETAIL
     (CASE_NUMBER, STATUS, REGISTER_URL, PRECINCT, STYLE, PLAINTIFF, DEFENDANTS, PLAINTIFF_ZIP, DEFENDANT_ZIP, CASE_TYPE, DATE_FILED, ACTIVE_OR_INACTIVE, JUDGMENT_AFTER_MORATORIUM)
-    VALUES (%(case_num)s, %(status)s, %(reg_url)s, %(prec_num)s, %(style)s, %(plaint)s, %(defend)s, %(plaint_zip)s, %(defend_zip)s, %(type)s, %(date_filed)s, %(active_or_inactive)s, %(after_moraorium)s)
+    VALUES %s
     ON CONFLICT(CASE_NUMBER)
     DO UPDATE SET
     (STATUS, REGISTER_URL, PRECINCT, STYLE, PLAINTIFF, DEFENDANTS, PLAINTIFF_ZIP, DEFENDANT_ZIP, CASE_TYPE, DATE_FILED, ACTIVE_OR_INACTIVE, JUDGMENT_AFTER_MORATORIUM) =
-    (%(status)s, %(reg_url)s, %(prec_num)s, %(style)s, %(plaint)s, %(defend)s, %(plaint_zip)s, %(defend_zip)s, %(type)s, %(date_filed)s, %(active_or_inactive)s, %(after_moraorium)s)
-    """,
-        {
-            "case_num": case.case_number,
-            "status": case.status,
-            "reg_url": case.register_url,
-            "prec_num": case.precinct_number,
-            "style": case.style,
-            "plaint": case.plaintiff,
-            "defend": case.defendants,
-            "plaint_zip": case.plaintiff_zip,
-            "defend_zip": case.defendant_zip,
-            "type": case.type,
-            "date_filed": case.date_filed,
-            "active_or_inactive": case.active_or_inactive,
-            "after_moraorium": case.judgment_after_moratorium,
-        },
-    )
+    (EXCLUDED.STATUS, EXCLUDED.REGISTER_URL, EXCLUDED.PRECINCT, EXCLUDED.STYLE, EXCLUDED.PLAINTIFF, EXCLUDED.DEFENDANTS, EXCLUDED.PLAINTIFF_ZIP, EXCLUDED.DEFENDANT_ZIP, EXCLUDED.CASE_TYPE, EXCLUDED.DATE_FILED, EXCLUDED.ACTIVE_OR_INACTIVE, EXCLUDED.JUDGMENT_AFTER_MORATORIUM)
+    """
 
-    curs.execute(
-        """
+DISPOSITION_UPSERT = """
     INSERT INTO DISPOSITION
-    (CASE_NUMBER, TYPE, DATE, AMOUNT, AWARDED_TO, AWARDED_AGAINST,JUDGEMENT_FOR,MATCH_SCORE,ATTORNEYS_FOR_PLAINTIFFS, ATTORNEYS_FOR_DEFENDANTS, COMMENTS)
-    VALUES (%(case_num)s, %(disp_type)s, %(disp_date)s, %(disp_amt)s, %(disp_to)s, %(disp_against)s, %(judgement_for)s,%(match_score)s,%(attorneys_for_plaintiffs)s, %(attorneys_for_defendants)s, %(comments)s)
+    (CASE_NUMBER, TYPE, DATE, AMOUNT, AWARDED_TO, AWARDED_AGAINST, JUDGEMENT_FOR, MATCH_SCORE, ATTORNEYS_FOR_PLAINTIFFS, ATTORNEYS_FOR_DEFENDANTS, COMMENTS)
+    VALUES %s
     ON CONFLICT(CASE_NUMBER)
     DO UPDATE SET
-    (TYPE, DATE, AMOUNT, AWARDED_TO, AWARDED_AGAINST, JUDGEMENT_FOR, MATCH_SCORE,ATTORNEYS_FOR_PLAINTIFFS, ATTORNEYS_FOR_DEFENDANTS,COMMENTS) =
-    (%(disp_type)s, %(disp_date)s, %(disp_amt)s, %(disp_to)s, %(disp_against)s, %(judgement_for)s,%(match_score)s, %(attorneys_for_plaintiffs)s, %(attorneys_for_defendants)s,  %(comments)s)
-    """,
-        {
-            "case_num": case.case_number,
-            "disp_type": case.disposition_type,
-            "disp_date": case.disposition_date,
-            "disp_amt": str(case.disposition_amount),
-            "disp_to": case.disposition_awarded_to,
-            "disp_against": case.disposition_awarded_against,
-            "judgement_for": case.judgement_for,
-            "match_score": case.match_score,
-            "attorneys_for_plaintiffs": case.attorneys_for_plaintiffs,
-            "attorneys_for_defendants": case.attorneys_for_defendants,
-            "comments": case.comments,
-        },
+    (TYPE, DATE, AMOUNT, AWARDED_TO, AWARDED_AGAINST, JUDGEMENT_FOR, MATCH_SCORE, ATTORNEYS_FOR_PLAINTIFFS, ATTORNEYS_FOR_DEFENDANTS, COMMENTS) =
+    (EXCLUDED.TYPE, EXCLUDED.DATE, EXCLUDED.AMOUNT, EXCLUDED.AWARDED_TO, EXCLUDED.AWARDED_AGAINST, EXCLUDED.JUDGEMENT_FOR, EXCLUDED.MATCH_SCORE, EXCLUDED.ATTORNEYS_FOR_PLAINTIFFS, EXCLUDED.ATTORNEYS_FOR_DEFENDANTS, EXCLUDED.COMMENTS)
+    """
+
+# TODO scrape all event types in a similar way (writs should be consolidated in)
+# Types should mirror the values from the HTML table headers, HR/ER/SE/etc.
+EVENT_UPSERT = """
+    INSERT INTO EVENT
+    (CASE_NUMBER, EVENT_NUMBER, DATE, TIME, OFFICER, RESULT, TYPE, ALL_TEXT)
+    VALUES %s
+    ON CONFLICT(CASE_NUMBER, EVENT_NUMBER)
+    DO UPDATE SET
+    (DATE, TIME, OFFICER, RESULT, TYPE, ALL_TEXT) =
+    (EXCLUDED.DATE, EXCLUDED.TIME, EXCLUDED.OFFICER, EXCLUDED.RESULT, EXCLUDED.TYPE, EXCLUDED.ALL_TEXT)
+    """
+
+
+def case_detail_row(case: CaseLike) -> Tuple:
+    return (
+        case.case_number,
+        case.status,
+        case.register_url,
+        case.precinct_number,
+        case.style,
+        case.plaintiff,
+        case.defendants,
+        case.plaintiff_zip,
+        case.defendant_zip,
+        case.type,
+        case.date_filed,
+        case.active_or_inactive,
+        case.judgment_after_moratorium,
+    )
+
+
+def disposition_row(case: CaseLike) -> Tuple:
+    return (
+        case.case_number,
+        case.disposition_type,
+        case.disposition_date,
+        str(case.disposition_amount),
+        case.disposition_awarded_to,
+        case.disposition_awarded_against,
+        case.judgement_for,
+        case.match_score,
+        case.attorneys_for_plaintiffs,
+        case.attorneys_for_defendants,
+        case.comments,
+    )
+
+
+def event_rows(case: CaseLike) -> List[Tuple]:
+    return [
+        (
+            case.case_number,
+            hearing_number,
+            hearing.hearing_date,
+            hearing.hearing_time,
+            hearing.hearing_officer,
+            hearing.appeared,
+            hearing.hearing_type,
+            hearing.all_text,
+        )
+        for hearing_number, hearing in enumerate(case.hearings)
+    ]
+
+
+def upsert_cases(curs, cases: List[CaseLike]) -> None:
+    """
+    Maps `cases` into the CASE_DETAIL, DISPOSITION, and EVENT tables with one statement per table.
+    Each case number must appear only once, since a statement can't update the same row twice.
+    """
+    if not cases:
+        return
+    execute_values(curs, CASE_DETAIL_UPSERT, [case_detail_row(case) for case in cases])
+    execute_values(curs, DISPOSITION_UPSERT, [disposition_row(case) for case in cases])
+    events = [row for case in cases for row in event_rows(case)]
+    if events:
+        execute_values(curs, EVENT_UPSERT, events)
+
+
+def rest_case(case: CaseLike):
+    """
+    Takes a EvictionCase (or CaseRecord) representation of a case and maps it into the CASE_DETAIL, DISPOSITION,
+    and EVENT table of the PostgreSQL database
+    """
+
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
+        upsert_cases(curs, [case])
+        curs.close()
+
+
+def rest_cases(cases: List[CaseLike]) -> List[str]:
+    """
+    Maps many cases into the CASE_DETAIL, DISPOSITION, and EVENT tables over one connection
+    and in one transaction, and returns the case numbers that couldn't be saved.
+
+    If saving them all at once fails, each case is saved on its own instead,
+    so that one bad case doesn't keep the others out of the database.
+    """
+
+    # later copies of a case replace earlier ones
+    cases = list({case.case_number: case for case in cases}.values())
+
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
+        failed_case_nums = []
+        try:
+            upsert_cases(curs, cases)
+        except Exception:
+            conn.rollback()
+            for case in cases:
+                curs.execute("SAVEPOINT rest_case")
+                try:
+                    upsert_cases(curs, [case])
+                except Exception:
+                    curs.execute("ROLLBACK TO SAVEPOINT rest_case")
+                    failed_case_nums.append(case.case_number)
+                else:
+                    curs.execute("RELEASE SAVEPOINT rest_case")
+        curs.close()
+
+    return failed_case_nums
+
+
+SETTING_COLUMNS = [
+    "case_number",
+    "case_link",
+    "setting_type",
+    "setting_style",
+    "judicial_officer",
+    "setting_date",
+    "setting_time",
+    "hearing_type",
+]
+
+
+class SettingCounts(NamedTuple):
+    inserted: int
+    skipped: int
+
+
+def setting_key(setting: Dict) -> Tuple:
+    """The columns of the SETTING table's unique index, which decide whether a setting is already saved."""
+    return (
+        setting["case_number"],
+        setting["setting_type"],
+        setting["hearing_type"],
+        setting["setting_date"],
     )
-    # TODO scrape all event types in a similar way (writs should be consolidated in)
-    # Types should mirror the values from the HTML table headers, HR/ER/SE/etc.
-    for hearing_number, hearing in enumerate(case.hearings):
+
+
+def rest_settings(settings: List[Dict]) -> SettingCounts:
+    """
+    Takes dictionary representations of settings and maps the ones that aren't saved yet into
+    the SETTING table of the PostgreSQL database, all at once.
+    Returns how many were inserted and how many were skipped as duplicates.
+    """
+
+    unique_settings: Dict[Tuple, Dict] = {}
+    for setting in settings:
+        unique_settings.setdefault(setting_key(setting), setting)
+
+    rows = io.StringIO()
+    writer = csv.writer(rows, quoting=csv.QUOTE_ALL)
+    for setting in unique_settings.values():
+        writer.writerow([setting[column] for column in SETTING_COLUMNS])
+    rows.seek(0)
+
+    columns = ", ".join(SETTING_COLUMNS).upper()
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
         curs.execute(
             """
-            INSERT INTO EVENT
-            (CASE_NUMBER, EVENT_NUMBER, DATE, TIME, OFFICER, RESULT, TYPE, ALL_TEXT)
-            VALUES (%(case_num)s, %(hearing_num)s, %(hearing_date)s, %(hearing_time)s, %(hearing_officer)s, %(hearing_appeared)s, %(hearing_type)s, %(all_text)s)
-            ON CONFLICT(CASE_NUMBER, EVENT_NUMBER)
-            DO UPDATE SET
-            (EVENT_NUMBER, DATE, TIME, OFFICER, RESULT, TYPE, ALL_TEXT) =
-            (%(hearing_num)s, %(hearing_date)s, %(hearing_time)s, %(hearing_officer)s, %(hearing_appeared)s, %(hearing_type)s, %(all_text)s)
-            """,
-            {
-                "case_num": case.case_number,
-                "hearing_num": hearing_number,
-                "hearing_date": hearing.hearing_date,
-                "hearing_time": hearing.hearing_time,
-                "hearing_officer": hearing.hearing_officer,
-                "hearing_appeared": hearing.appeared,
-                "hearing_type": hearing.hearing_type,
-                "all_text": hearing.all_text,
-            },
+        CREATE TEMP TABLE SETTING_STAGING
+        (CASE_NUMBER TEXT, CASE_LINK TEXT, SETTING_TYPE TEXT, SETTING_STYLE TEXT, JUDICIAL_OFFICER TEXT, SETTING_DATE TEXT, SETTING_TIME TEXT, HEARING_TYPE TEXT)
+        ON COMMIT DROP
+        """
+        )
+        curs.copy_expert(
+            f"COPY SETTING_STAGING ({columns}) FROM STDIN WITH (FORMAT csv)", rows
         )
-    conn.commit()
-    curs.close()
-    conn.close()
+        curs.execute(
+            f"""
+        INSERT INTO SETTING ({columns})
+        SELECT {columns} FROM SETTING_STAGING
+        ON CONFLICT(CASE_NUMBER, SETTING_TYPE, HEARING_TYPE, SETTING_DATE)
+        DO NOTHING
+        """
+        )
+        inserted = curs.rowcount
+        curs.close()
+
+    return SettingCounts(inserted=inserted, skipped=len(settings) - inserted)
 
 
 def rest_setting(setting: Dict):
     """Takes a dictionary representation of a setting and maps it into the SETTING table of the PostgreSQL database"""
 
-    conn = get_database_connection(local_dev=config.local_dev)
-    curs = conn.cursor()
-    curs.execute(
-        """
-    INSERT INTO SETTING
-    (CASE_NUMBER, CASE_LINK, SETTING_TYPE, SETTING_STYLE, JUDICIAL_OFFICER, SETTING_DATE, SETTING_TIME, HEARING_TYPE)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT(CASE_NUMBER, SETTING_TYPE, HEARING_TYPE, SETTING_DATE)
-    DO NOTHING
-    """,
-        (
-            setting["case_number"],
-            setting["case_link"],
-            setting["setting_type"],
-            setting["setting_style"],
-            setting["judicial_officer"],
-            setting["setting_date"],
-            setting["setting_time"],
-            setting["hearing_type"],
-        ),
-    )
-    conn.commit()
-    curs.close()
-    conn.close()
+    rest_settings([setting])
 
 
-def get_old_active_case_nums() -> List[str]:
-    """Returns list of case numbers in CASE_DETAIL table that are still active (as determined by the STATUS column)."""
+def get_old_active_case_nums(due_by: Optional[datetime.date] = None) -> List[str]:
+    """
+    Returns list of case numbers in CASE_DETAIL table that are still active (as determined by the STATUS column).
+    If `due_by` is given, only returns the ones whose next check in CASE_CHECK is on or before that day.
+    """
 
-    conn = get_database_connection(local_dev=config.local_dev)
-    curs = conn.cursor()
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
 
-    curs.execute(
-        """SELECT CASE_NUMBER FROM CASE_DETAIL WHERE LOWER(STATUS) NOT IN
-                ('final disposition', 'transferred', 'bankruptcy', 'judgment released',
-                'judgment satisfied', 'appealed', 'final status', 'dismissed')"""
-    )
-    active_case_nums = [tup[0] for tup in curs.fetchall()]
-    curs.close()
-    conn.close()
+        active = """LOWER(STATUS) NOT IN
+                    ('final disposition', 'transferred', 'bankruptcy', 'judgment released',
+                    'judgment satisfied', 'appealed', 'final status', 'dismissed')"""
+        if due_by is None:
+            # CASE_CHECK is only needed in incremental mode, so it may not exist
+            curs.execute(f"SELECT CASE_NUMBER FROM CASE_DETAIL WHERE {active}")
+        else:
+            curs.execute(
+                f"""SELECT CASE_DETAIL.CASE_NUMBER FROM CASE_DETAIL
+                    LEFT JOIN CASE_CHECK ON CASE_DETAIL.CASE_NUMBER = CASE_CHECK.CASE_NUMBER
+                    WHERE {active}
+                    AND (CASE_CHECK.NEXT_CHECK IS NULL OR CASE_CHECK.NEXT_CHECK <= %(due_by)s)""",
+                {"due_by": due_by},
+            )
+        active_case_nums = [tup[0] for tup in curs.fetchall()]
+        curs.close()
 
     return active_case_nums
 
 
+def get_case_checks(case_nums: List[str]) -> Dict[str, CaseCheck]:
+    """Returns the hash and last change date stored in CASE_CHECK for each of `case_nums` that has one."""
+
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
+        curs.execute(
+            "SELECT CASE_NUMBER, CONTENT_HASH, LAST_CHANGED FROM CASE_CHECK WHERE CASE_NUMBER = ANY(%s)",
+            (case_nums,),
+        )
+        checks = {
+            case_number: CaseCheck(content_hash=content_hash, last_changed=last_changed)
+            for case_number, content_hash, last_changed in curs.fetchall()
+        }
+        curs.close()
+
+    return checks
+
+
+def get_setting_dates(case_nums: List[str]) -> Dict[str, List[str]]:
+    """Returns the SETTING_DATE of every setting in the SETTING table for each of `case_nums`."""
+
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
+        curs.execute(
+            "SELECT CASE_NUMBER, SETTING_DATE FROM SETTING WHERE CASE_NUMBER = ANY(%s)",
+            (case_nums,),
+        )
+        setting_dates: Dict[str, List[str]] = {}
+        for case_number, setting_date in curs.fetchall():
+            setting_dates.setdefault(case_number, []).append(setting_date or "")
+        curs.close()
+
+    return setting_dates
+
+
+CASE_CHECK_UPSERT = """
+    INSERT INTO CASE_CHECK
+    (CASE_NUMBER, CONTENT_HASH, LAST_CHECKED, LAST_CHANGED, NEXT_CHECK)
+    VALUES %s
+    ON CONFLICT(CASE_NUMBER)
+    DO UPDATE SET
+    (CONTENT_HASH, LAST_CHECKED, LAST_CHANGED, NEXT_CHECK) =
+    (EXCLUDED.CONTENT_HASH, EXCLUDED.LAST_CHECKED, EXCLUDED.LAST_CHANGED, EXCLUDED.NEXT_CHECK)
+    """
+
+
+def record_case_checks(
+    checks: List[Tuple[str, str, datetime.date, datetime.date, datetime.date]]
+):
+    """
+    Stores when each case was checked, when it last changed, and when it should be checked next
+    in the CASE_CHECK table, all in one statement. Each of `checks` is a row of
+    (case number, content hash, last checked, last changed, next check).
+    """
+    if not checks:
+        return
+
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
+        execute_values(curs, CASE_CHECK_UPSERT, checks)
+        curs.close()
+
+
 # not currently being used for anything
 def drop_rows_from_table(table_name: str, case_ids: list):
     """Drops all rows with case number in case_ids from table `table_name` - works for CASE_DETAIL, DISPOSITION, and EVENT tables"""
@@ -163,17 +341,15 @@ def drop_rows_from_table(table_name: str, case_ids: list):
     else:
         case_ids = str(tuple(case_ids))
 
-    conn = get_database_connection(local_dev=config.local_dev)
-    curs = conn.cursor()
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
 
-    if table_name == "CASE_DETAIL":
-        curs.execute("DELETE FROM %s WHERE CASE_NUMBER IN %s", (table_name, case_ids))
-    else:
-        curs.execute("DELETE FROM %s WHERE CASE_NUMBER IN %s", (table_name, case_ids))
+        if table_name == "CASE_DETAIL":
+            curs.execute("DELETE FROM %s WHERE CASE_NUMBER IN %s", (table_name, case_ids))
+        else:
+            curs.execute("DELETE FROM %s WHERE CASE_NUMBER IN %s", (table_name, case_ids))
 
-    conn.commit()
-    curs.close()
-    conn.close()
+        curs.close()
 
 
 def update_first_court_apperance_column():
@@ -192,9 +368,7 @@ def update_first_court_apperance_column():
                         )
                    """
 
-    conn = get_database_connection(local_dev=config.local_dev)
-    curs = conn.cursor()
-    curs.execute(update_query)
-    conn.commit()
-    curs.close()
-    conn.close()
+    with database_connection(local_dev=config.local_dev) as conn:
+        curs = conn.cursor()
+        curs.execute(update_query)
+        curs.close()
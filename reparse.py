@@ -0,0 +1,222 @@
+"""
+Module for parsing cases again from the pages saved in the page cache, without visiting the court websites.
+Useful after fixing a parser bug or adding a field, to bring every saved case up to date at once.
+
+The cases are parsed in parallel by a pool of processes, one per CPU core by default. For example
+
+    python reparse.py page_cache --outfile cases.jsonl
+
+writes each case as a line of JSON, and
+
+    python reparse.py page_cache.tar.gz --db
+
+sends the cases to the database instead. The pages can be a page cache directory
+(see PAGE_CACHE_DIR) or a .zip or .tar archive of one.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+import logging
+import os
+import sys
+import tarfile
+import tempfile
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import zipfile
+
+import click
+
+from cases import CaseRecord
+import config
+from html_backend import html_parser_option, make_soup
+from page_cache import PageCache
+import scrapers
+
+logger = logging.getLogger()
+logging.basicConfig(stream=sys.stdout)
+logger.setLevel(logging.INFO)
+
+# cases are parsed with the same parser that the county's scraper uses
+PARSER_CLASSES = {
+    scraper_class.county: scraper_class.parser_class
+    for scraper_class in (
+        scrapers.FakeScraper,
+        scrapers.TravisScraper,
+        scrapers.HaysScraper,
+        scrapers.WilliamsonScraper,
+    )
+}
+
+
+class ReparseResult(NamedTuple):
+    key: str
+    case: Optional[CaseRecord]
+    error: str = ""
+
+
+def find_cache_directory(root: str) -> str:
+    """Returns the page cache directory at or under `root`, e.g. inside an unpacked archive."""
+    for directory, dirs, _ in os.walk(root):
+        if "entries" in dirs:
+            return directory
+        dirs.sort()
+    raise click.BadParameter(f"no saved pages found in {root}")
+
+
+@contextmanager
+def open_cache_directory(path: str) -> Iterator[str]:
+    """Yields the page cache directory at `path`, unpacking it first if it's an archive."""
+    if os.path.isdir(path):
+        yield find_cache_directory(path)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                archive.extractall(temp_directory)
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path) as archive:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extractall(temp_directory, filter="data")
+                else:
+                    archive.extractall(temp_directory)
+        else:
+            raise click.BadParameter(f"{path} is not a directory, zip file or tar file")
+        yield find_cache_directory(temp_directory)
+
+
+def case_entries(cache: PageCache, counties: Iterable[str] = ()) -> Iterator[dict]:
+    """Yields the cache entries of the cases from `counties`, or from every county we can parse."""
+    counties = set(counties) or set(PARSER_CLASSES)
+    for entry in cache.iter_entries():
+        county, kind, _ = entry["key"].split("/", 2)
+        if kind == "case" and county in counties:
+            yield entry
+
+
+def set_worker_html_parser(html_parser: str) -> None:
+    config.html_parser = html_parser
+
+
+def reparse_entry(cache_directory: str, entry: dict) -> ReparseResult:
+    """Parses the case saved in the cache `entry`."""
+    county, _, case_id = entry["key"].split("/", 2)
+    try:
+        cache = PageCache(cache_directory)
+        result_page, register_page = [
+            cache.load_page(digest) for digest in entry["pages"]
+        ]
+        case = scrapers.parse_case(
+            case_id,
+            make_soup(result_page),
+            make_soup(register_page),
+            PARSER_CLASSES[county](),
+            # a reparse goes over every cached case, so don't send an email for each one
+            email_unknown_status=False,
+        )
+    except Exception as error:
+        return ReparseResult(key=entry["key"], case=None, error=repr(error))
+    # records are much smaller to send back from a worker process than models
+    return ReparseResult(key=entry["key"], case=CaseRecord.from_model(case))
+
+
+def reparse_cases(
+    cache_directory: str, counties: Iterable[str] = (), workers: int = 1
+) -> Iterator[ReparseResult]:
+    """
+    Parses every case saved in the page cache at `cache_directory`, in `workers` processes,
+    and yields the results in the order of the cache's entries as they're ready.
+    """
+    entries = case_entries(PageCache(cache_directory), counties)
+    parse = partial(reparse_entry, cache_directory)
+    if workers == 1:
+        yield from map(parse, entries)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=set_worker_html_parser,
+        initargs=(config.html_parser,),
+    ) as executor:
+        yield from executor.map(parse, entries, chunksize=16)
+
+
+def reparse_to(
+    results: Iterable[ReparseResult],
+    outfile=None,
+    db: bool = False,
+    batch_size: int = 500,
+) -> Tuple[int, List[str]]:
+    """
+    Writes each parsed case to `outfile` as a line of JSON and, if `db` is set,
+    sends the cases to the database `batch_size` at a time.
+    Returns how many cases were parsed and the keys of the entries that couldn't be.
+    """
+    from parse_hearings import email_unsaved_cases, persist_parsed_cases
+
+    parsed = 0
+    failed_keys = []
+    unsaved_case_nums: List[str] = []
+    batch: List[CaseRecord] = []
+    for result in results:
+        if result.case is None:
+            logger.error(f"Could not reparse {result.key}: {result.error}")
+            failed_keys.append(result.key)
+            continue
+        parsed += 1
+        if outfile:
+            outfile.write(result.case.json() + "\n")
+        if db:
+            batch.append(result.case)
+            if len(batch) >= batch_size:
+                unsaved_case_nums += persist_parsed_cases(batch, email_failures=False)
+                batch = []
+    if db and batch:
+        unsaved_case_nums += persist_parsed_cases(batch, email_failures=False)
+    email_unsaved_cases(unsaved_case_nums)
+    return parsed, failed_keys
+
+
+@click.command()
+@click.argument("pages", type=click.Path(exists=True))
+@click.option("--outfile", type=click.File(mode="w"), required=False)
+@click.option(
+    "--county",
+    "counties",
+    type=click.Choice(sorted(PARSER_CLASSES), case_sensitive=False),
+    multiple=True,
+    help="only reparse cases from this county (can be given more than once)",
+)
+@click.option(
+    "--db / --no-db",
+    default=False,
+    help="whether to persist the cases to a db",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    help="how many processes to parse cases in",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=500,
+    help="how many cases to send to the db at a time",
+)
+@html_parser_option
+def reparse(pages, outfile=None, counties=(), db=False, workers=1, batch_size=500):
+    """Parses every case saved in PAGES, a page cache directory or an archive of one."""
+    with open_cache_directory(pages) as cache_directory:
+        parsed, failed_keys = reparse_to(
+            reparse_cases(cache_directory, counties=counties, workers=workers),
+            outfile=outfile,
+            db=db,
+            batch_size=batch_size,
+        )
+    logger.info(f"Reparsed {parsed} cases, {len(failed_keys)} failed.")
+
+
+if __name__ == "__main__":
+    reparse()
@@ -0,0 +1,112 @@
+"""
+Module for scraping old active cases again only when they're likely to have changed.
+
+Each persisted case gets a row in the CASE_CHECK table with a hash of its parsed data,
+the last day that hash changed, and the next day the case should be checked.
+Cases that haven't changed in a while are checked less and less often,
+but always the day after one of their settings.
+"""
+
+import datetime
+import hashlib
+import logging
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from cases import CaseCheck, CaseLike
+import config
+import parse_hearings
+import persist
+
+logger = logging.getLogger()
+logging.basicConfig(stream=sys.stdout)
+
+
+def case_hash(case: CaseLike) -> str:
+    """Returns a hash of everything parsed from a case, which changes whenever the case does."""
+    return hashlib.sha256(case.json(sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def parse_setting_date(setting_date: str) -> Optional[datetime.date]:
+    try:
+        return datetime.datetime.strptime(setting_date.strip(), "%m/%d/%Y").date()
+    except ValueError:
+        return None
+
+
+def next_check_date(
+    today: datetime.date,
+    last_changed: datetime.date,
+    setting_dates: Iterable[str] = (),
+) -> datetime.date:
+    """
+    Returns the day a case last checked `today` should be checked again.
+
+    Waits half as long as the case has gone without changing, between
+    RESCRAPE_MIN_DAYS and RESCRAPE_MAX_DAYS, but no later than the day after
+    the case's next setting.
+    """
+    days_unchanged = (today - last_changed).days
+    wait_days = min(
+        max(days_unchanged // 2, config.rescrape_min_days), config.rescrape_max_days
+    )
+    next_check = today + datetime.timedelta(days=wait_days)
+
+    upcoming_settings = [
+        day
+        for day in map(parse_setting_date, setting_dates)
+        if day is not None and day >= today
+    ]
+    if upcoming_settings:
+        next_check = min(next_check, min(upcoming_settings) + datetime.timedelta(days=1))
+    return next_check
+
+
+def persist_changed_cases(
+    cases: List[CaseLike], today: Optional[datetime.date] = None
+) -> List[str]:
+    """
+    Persists the cases whose hash differs from the one stored when they were last checked,
+    schedules the next check of every case, and returns the case numbers that failed to send,
+    like `parse_hearings.persist_parsed_cases`.
+    """
+    today = today or datetime.date.today()
+    case_nums = [case.case_number for case in cases]
+    checks = persist.get_case_checks(case_nums)
+    setting_dates = persist.get_setting_dates(case_nums)
+
+    changed_cases = []
+    new_checks: Dict[str, CaseCheck] = {}
+    for case in cases:
+        content_hash = case_hash(case)
+        check = checks.get(case.case_number)
+        if check is None or check.content_hash != content_hash:
+            changed_cases.append(case)
+            check = CaseCheck(content_hash=content_hash, last_changed=today)
+        new_checks[case.case_number] = check
+
+    logger.info(
+        f"{len(changed_cases)} of {len(cases)} cases changed since they were last checked."
+    )
+    failed_case_nums = parse_hearings.persist_parsed_cases(
+        changed_cases, email_failures=False
+    )
+
+    persist.record_case_checks(
+        [
+            (
+                case_number,
+                check.content_hash,
+                today,
+                check.last_changed,
+                next_check_date(
+                    today, check.last_changed, setting_dates.get(case_number, [])
+                ),
+            )
+            for case_number, check in new_checks.items()
+            # a case that couldn't be saved must look changed next time too
+            if case_number not in failed_case_nums
+        ]
+    )
+
+    return failed_case_nums
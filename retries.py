@@ -0,0 +1,292 @@
+"""
+Module for retrying requests to court websites.
+
+Each request (loading a case, a filing search or a calendar query) is retried on its own, up to
+RETRY_ATTEMPTS times in all. Before each retry it waits a random time of up to RETRY_BASE_DELAY
+seconds, doubled after every failed attempt up to RETRY_MAX_DELAY, so that sessions that failed
+together don't all retry together.
+
+Only errors that another attempt could get past are retried: lost connections, timeouts,
+browser errors, responses saying the server failed or is busy, and pages that were just loaded
+but couldn't be read (e.g. an error page sent instead of the results). Any other error, like
+a search the portal turned down, fails straight away.
+
+When CIRCUIT_FAILURE_THRESHOLD requests in a row to a county's portal fail with retryable errors,
+the portal is probably down, so requests to that county are paused for CIRCUIT_PAUSE_SECONDS.
+After each pause a single request is let through to find out whether the portal is back, and the
+others wait until it's done. Once the portal has been down for CIRCUIT_GIVE_UP_MINUTES, requests
+made while it's paused fail without waiting, so a run finishes instead of waiting out the outage.
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+import requests
+from selenium.common.exceptions import WebDriverException
+
+import config
+
+logger = logging.getLogger()
+logging.basicConfig(stream=sys.stdout)
+
+T = TypeVar("T")
+
+# how often requests waiting for the one probing a paused portal check whether it's done
+PROBE_CHECK_SECONDS = 1.0
+
+
+class UnexpectedPageError(Exception):
+    """Raised when a page just loaded from a court website can't be read."""
+
+
+RETRYABLE_ERRORS = (
+    UnexpectedPageError,
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+    WebDriverException,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a portal that's been down too long."""
+
+
+def read_page(parse: Callable[[str], T], page: str) -> T:
+    """
+    Parses a page that was just loaded, raising UnexpectedPageError if it can't be, so that
+    the page is loaded again when this is called from a retried function.
+    """
+    try:
+        return parse(page)
+    except Exception as error:
+        raise UnexpectedPageError(f"Could not read the page: {error!r}") from error
+
+
+def is_retryable_status(status: Optional[int]) -> bool:
+    """Whether a response with HTTP `status` might succeed if the request is sent again."""
+    return status is not None and (status >= 500 or status in (408, 429))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether another attempt at the request that raised `error` could succeed."""
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is not None and is_retryable_status(response.status_code)
+    if isinstance(error, aiohttp.ClientResponseError):
+        return is_retryable_status(error.status)
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class CircuitBreaker:
+    """
+    Counts the retryable failures in a row of one county's requests, and pauses its requests
+    while its portal seems to be down. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        pause_seconds: float = 60,
+        give_up_seconds: float = 1800,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.pause_seconds = pause_seconds
+        self.give_up_seconds = give_up_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.failures = 0
+        # when the portal was first found down, and when requests may be sent to it again
+        self.opened_at: Optional[float] = None
+        self.paused_until = 0.0
+        # whether a request was let through after a pause to see if the portal is back
+        self.probing = False
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def seconds_to_wait(self) -> float:
+        """
+        How long to wait before asking again, or 0 if a request can be sent now. Raises
+        CircuitOpenError instead if the portal has been down for longer than `give_up_seconds`
+        and is still paused.
+
+        Once a pause is over, only the next request is let through, and the others are asked
+        to wait until it succeeds or fails. If it never does, another one is let through
+        after another pause.
+        """
+        with self.lock:
+            now = self.clock()
+            if self.opened_at is None:
+                return 0.0
+            if now >= self.paused_until:
+                self.probing = True
+                self.paused_until = now + self.pause_seconds
+                return 0.0
+            if now - self.opened_at >= self.give_up_seconds:
+                raise CircuitOpenError(
+                    f"The {self.name} portal has been down for "
+                    f"{round((now - self.opened_at) / 60)} minutes."
+                )
+            if self.probing:
+                return min(self.paused_until - now, PROBE_CHECK_SECONDS)
+            return self.paused_until - now
+
+    def record_success(self) -> None:
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"The {self.name} portal is back up.")
+            self.failures = 0
+            self.opened_at = None
+            self.paused_until = 0.0
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures < self.failure_threshold:
+                return
+            now = self.clock()
+            if now < self.paused_until and not self.probing:
+                return
+            self.probing = False
+            if self.opened_at is None:
+                self.opened_at = now
+            self.paused_until = now + self.pause_seconds
+            logger.warning(
+                f"{self.failures} requests in a row to the {self.name} portal failed, "
+                f"pausing its requests for {self.pause_seconds} seconds."
+            )
+
+    def end_probe(self) -> None:
+        """
+        Lets the next request through straight away, after the one let through to see if the
+        portal is back failed in a way that doesn't say whether it is.
+        """
+        with self.lock:
+            if self.probing:
+                self.probing = False
+                self.paused_until = self.clock()
+
+
+# one breaker per county, shared by every scraper in the process
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(county: str) -> CircuitBreaker:
+    with circuit_breakers_lock:
+        if county not in circuit_breakers:
+            circuit_breakers[county] = CircuitBreaker(
+                county,
+                failure_threshold=config.circuit_failure_threshold,
+                pause_seconds=config.circuit_pause_seconds,
+                give_up_seconds=config.circuit_give_up_minutes * 60,
+            )
+        return circuit_breakers[county]
+
+
+class RetryPolicy:
+    def __init__(
+        self, attempts: int = 4, base_delay: float = 2, max_delay: float = 60
+    ) -> None:
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls) -> "RetryPolicy":
+        return cls(
+            attempts=config.retry_attempts,
+            base_delay=config.retry_base_delay,
+            max_delay=config.retry_max_delay,
+        )
+
+    def delay(self, attempt: int) -> float:
+        """A random wait before retrying after `attempt` failed attempts."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def failed(
+        self,
+        error: Exception,
+        attempt: int,
+        breaker: Optional[CircuitBreaker],
+        description: str,
+    ) -> float:
+        """
+        Records a failed attempt, and returns how long to wait before the next one.
+        Raises `error` again if there shouldn't be a next one.
+        """
+        retryable = is_retryable(error)
+        if breaker is not None and retryable:
+            breaker.record_failure()
+        elif breaker is not None:
+            breaker.end_probe()
+        if not retryable or attempt >= self.attempts:
+            raise error
+        delay = self.delay(attempt)
+        logger.warning(
+            f"{description} failed on attempt {attempt} of {self.attempts} "
+            f"({type(error).__name__}: {error}), retrying in {round(delay, 1)} seconds."
+        )
+        return delay
+
+    def call(
+        self,
+        function: Callable[..., Any],
+        *args,
+        breaker: Optional[CircuitBreaker] = None,
+        description: str = "Request",
+    ) -> Any:
+        """Calls `function` with `args` until it succeeds, and returns what it returns."""
+        for attempt in range(1, self.attempts + 1):
+            while breaker is not None:
+                wait = breaker.seconds_to_wait()
+                if not wait:
+                    break
+                time.sleep(wait)
+            try:
+                result = function(*args)
+            except Exception as error:
+                time.sleep(self.failed(error, attempt, breaker, description))
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    async def call_async(
+        self,
+        function: Callable[..., Awaitable[Any]],
+        *args,
+        breaker: Optional[CircuitBreaker] = None,
+        description: str = "Request",
+    ) -> Any:
+        """Awaits `function` with `args` until it succeeds, and returns what it returns."""
+        for attempt in range(1, self.attempts + 1):
+            while breaker is not None:
+                wait = breaker.seconds_to_wait()
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+            try:
+                result = await function(*args)
+            except Exception as error:
+                await asyncio.sleep(self.failed(error, attempt, breaker, description))
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            return result
@@ -5,18 +5,22 @@ import sys
 import time
 import logging
 import smtplib, ssl
+from typing import Optional
+import config
 import connect_to_database
 import pandas as pd
 import gsheet
 from datetime import date, timedelta
 from apscheduler.schedulers.blocking import BlockingScheduler
-from functools import reduce
+from functools import partial, reduce
 from dotenv import load_dotenv
+from driver_pool import DriverPool
 from emailing import log_and_email
 from overwrite_arcgis_csvs import update_all_csvs
 import parse_filings
 import parse_settings
 import persist
+import scrapers
 
 load_dotenv()
 local_dev = os.getenv("LOCAL_DEV") == "true"
@@ -55,18 +59,32 @@ def perform_task_and_catch_errors(task_function, task_name):
             logger.error(f"Unanticipated Error {task_name} on attempt {tries} of 1:\n{str(error)}")
     log_and_email(f"{task_name} failed on every attempt. Check Heroku logs for more details.", f"{task_name} failed", error=True)
 
-def scrape_filings():
+def scrape_filings(driver_pool: Optional[DriverPool] = None):
     """Scrapes all case filings data from the past week and outputs results to PostgreSQL database"""
 
     seven_days_ago = get_date_from_today("-", 7, "past")
-    parse_filings.parse_filings_on_cloud(seven_days_ago, date.today().strftime(f"%-m-%-d-%Y"))
-
-def scrape_settings():
+    scraper = scrapers.get_scraper(driver_pool=driver_pool)
+    try:
+        parse_filings.parse_filings_on_cloud(
+            seven_days_ago,
+            date.today().strftime(f"%-m-%-d-%Y"),
+            scraper=scraper,
+            incremental=config.incremental_rescrape,
+            keep_cases=False,
+        )
+    finally:
+        scraper.close_driver()
+
+def scrape_settings(driver_pool: Optional[DriverPool] = None):
     """Scrapes all case settings data from 7 days ago to 90 days from now and outputs results to PostgreSQL database"""
 
     ninety_days_later = get_date_from_today("-", 90, "future")
     seven_days_ago = get_date_from_today("-", 7, "past")
-    parse_settings.parse_settings_on_cloud(seven_days_ago, ninety_days_later)
+    scraper = scrapers.get_scraper(driver_pool=driver_pool)
+    try:
+        parse_settings.parse_settings_on_cloud(seven_days_ago, ninety_days_later, scraper=scraper)
+    finally:
+        scraper.close_driver()
 
 def update_first_court_apperance():
     """Updates first_court_appearacnce column in CASE_DETAIL table of PostgreSQL database"""
@@ -79,8 +97,12 @@ def all_tasks():
 
     logger.info("STARTING DAILY TASKS...")
 
-    perform_task_and_catch_errors(scrape_filings, "Scraping filings")
-    perform_task_and_catch_errors(scrape_settings, "Scraping settings")
+    # both scraping tasks borrow the same Chrome, so it only starts once per run
+    with DriverPool(headless=True) as driver_pool:
+        if config.scraper_backend != "http":
+            perform_task_and_catch_errors(driver_pool.warm_up, "Starting Chrome")
+        perform_task_and_catch_errors(partial(scrape_filings, driver_pool), "Scraping filings")
+        perform_task_and_catch_errors(partial(scrape_settings, driver_pool), "Scraping settings")
     perform_task_and_catch_errors(update_first_court_apperance, "Updating first_court_appearance column")
     perform_task_and_catch_errors(update_all_csvs, "Updating arcGIS csvs")
 
@@ -91,6 +113,9 @@ def all_tasks():
     gsheet.dump_to_sheets('Court_scraper_evictions_archive','evictions_archive',"SELECT "+ cols +" FROM filings_archive WHERE case_type='Eviction'") #Convert Date to Text
     gsheet.dump_to_sheets('Court_scraper_evictions_archive','events',"SELECT * FROM eviction_events")
 
+    # don't hold database connections open until tomorrow's run
+    connect_to_database.close_connection_pools()
+
     logger.info("FINISHED DAILY TASKS.\n\n")
 
 
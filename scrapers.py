@@ -1,32 +1,57 @@
-"""Module for scraping court websites using Selenium"""
+"""Module for scraping court websites using Selenium or plain HTTP"""
 
 import datetime
 from itertools import chain
 import logging
 import os
 import sys
-from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import threading
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlparse
 
 import atexit
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from selenium import webdriver
+import requests
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 
 import calendars
+from cases import CaseRecord, EvictionCase
 import case_search
 import config
+from driver_pool import DriverPool, make_chrome_driver
 from emailing import log_and_email
+import filing_planner
 import hearing
+from html_backend import make_soup
 import load_pages
+import odyssey
+import page_cache
+import retries
 
 
 logger = logging.getLogger()
 logging.basicConfig(stream=sys.stdout)
 
+# shared by every scraper in the process, so that separate worker pools still
+# respect the limit on simultaneous requests to one court website
+host_limits: Dict[str, threading.BoundedSemaphore] = {}
+host_limits_lock = threading.Lock()
+
+
+def get_host_limit(url: str) -> threading.BoundedSemaphore:
+    """Returns the semaphore capping concurrent requests to the host serving `url`."""
+    host = urlparse(url).netloc or url
+    with host_limits_lock:
+        if host not in host_limits:
+            host_limits[host] = threading.BoundedSemaphore(
+                config.max_sessions_per_host
+            )
+        return host_limits[host]
+
 
 class CalendarQuery(NamedTuple):
     afterdate: datetime.date
@@ -34,70 +59,313 @@ class CalendarQuery(NamedTuple):
     prefix: str
 
 
+def calendar_queries(
+    afterdate: datetime.date, beforedate: datetime.date
+) -> Iterator[CalendarQuery]:
+    """Make queries for court calendar to get all cases within date range."""
+    years = set([afterdate.year, beforedate.year])
+    for year in years:
+        for prefix_text in ["J1-CV", "J2-CV", "J3-EV", "J4-CV", "J5-CV"]:
+            yield CalendarQuery(
+                afterdate=afterdate,
+                beforedate=beforedate,
+                prefix=f"{prefix_text}-{year}*",
+            )
+
+
+# the content of a case's search result and register of actions
+CasePages = Tuple[str, str]
+
+
+def parse_case(
+    case_id: str,
+    result_soup: BeautifulSoup,
+    register_soup: BeautifulSoup,
+    parser: hearing.BaseParser,
+    email_unknown_status: bool = True,
+) -> EvictionCase:
+    """
+    Parses a case from its search result and its register of actions.
+    Unknown statuses are only logged, not emailed, if `email_unknown_status` is False.
+    """
+    register_url = case_search.get_register_url(result_soup)
+    status, type = case_search.get_status_and_type(result_soup)
+
+    if status.lower() not in hearing.statuses_map:
+        load_dotenv()
+        if os.getenv("LOCAL_DEV") != "true" and email_unknown_status:
+            log_and_email(
+                f"Case {case_id} has status '{status}', which is not in our list of known statuses.",
+                "Found Unknown Status",
+                error=True,
+            )
+        else:
+            logger.info(
+                f"Case {case_id} has status '{status}', which is not in our list of known statuses."
+            )
+
+    return parser.make_parsed_case(
+        soup=register_soup, status=status, type=type, register_url=register_url
+    )
+
+
+def parse_case_pages(
+    case_id: str, pages: CasePages, parser: hearing.BaseParser
+) -> EvictionCase:
+    """Parses a case from the content of its search result and its register of actions."""
+    result_page, register_page = pages
+    return parse_case(case_id, make_soup(result_page), make_soup(register_page), parser)
+
+
+def get_cached_case_pages(
+    cache: Optional[page_cache.PageCache], county: str, case_id: str
+) -> Optional[CasePages]:
+    """The pages of a case from `cache`, if they're fresh there."""
+    cached_pages = cache and cache.get(page_cache.case_key(county, case_id))
+    if not cached_pages:
+        return None
+    result_page, register_page = cached_pages
+    return result_page, register_page
+
+
+def cache_case_pages(
+    cache: Optional[page_cache.PageCache], county: str, case_id: str, pages: CasePages
+) -> None:
+    """Saves the pages of a case to `cache`, for longer if the case is closed."""
+    if not cache:
+        return
+    status, _ = case_search.get_status_and_type(make_soup(pages[0]))
+    cache.put(
+        page_cache.case_key(county, case_id),
+        list(pages),
+        ttl=page_cache.case_ttl(status),
+        status=status,
+    )
+
+
+def get_cached_calendar_settings(
+    cache: Optional[page_cache.PageCache],
+    county: str,
+    calendar_link: str,
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+) -> Optional[Tuple[List[Dict[str, str]], bool]]:
+    """The settings on a calendar page from `cache`, and whether it hit the result cap."""
+    key = page_cache.calendar_key(county, calendar_link, afterdate, beforedate)
+    cached_pages = cache and cache.get(key)
+    if not cached_pages:
+        return None
+    return calendars.get_settings(cached_pages[0])
+
+
+def cache_calendar_page(
+    cache: Optional[page_cache.PageCache],
+    county: str,
+    calendar_link: str,
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+    calendar_page: str,
+) -> None:
+    """Saves a calendar page to `cache`, for longer if its dates are further in the past."""
+    if cache:
+        cache.put(
+            page_cache.calendar_key(county, calendar_link, afterdate, beforedate),
+            [calendar_page],
+            ttl=page_cache.calendar_ttl(beforedate),
+        )
+
+
+def log_missing_settings(
+    calendar_link: str, afterdate: datetime.date, beforedate: datetime.date, error: Exception
+) -> None:
+    logger.error(
+        f"Failed to get the settings from {calendar_link} between {afterdate} and "
+        f"{beforedate}, so they're missing from this run: {error}"
+    )
+
+
+def log_missing_filings(
+    case_num_prefix: str, afterdate: datetime.date, beforedate: datetime.date, error: Exception
+) -> None:
+    logger.error(
+        f"Failed to find the case numbers for {case_num_prefix} filed between {afterdate} "
+        f"and {beforedate}, so they're missing from this run: {error}"
+    )
+
+
+def record_filings(
+    scraper: Any,
+    case_num_prefix: str,
+    afterdate: datetime.date,
+    beforedate: datetime.date,
+    filings: List[calendars.Filing],
+    capped: bool,
+) -> List[str]:
+    """
+    Tells the scraper's filing planner how a filing search went, remembers the search results
+    of the cases it found so they can be loaded without searching again, and returns their
+    case numbers.
+    """
+    scraper.filing_planner.record(case_num_prefix, afterdate, beforedate, filings, capped)
+    scraper.search_results.update(
+        (filing.case_number, filing) for filing in filings if filing.register_link
+    )
+    return [filing.case_number for filing in filings]
+
+
+def split_filing_search(
+    afterdate: datetime.date, beforedate: datetime.date, found: int
+) -> Optional[Tuple[datetime.date, datetime.date]]:
+    """
+    Where to split the date range of a filing search that hit the result cap: the last day of
+    the first half and the first day of the second. None if it's a single day, which can't be.
+    """
+    try:
+        return calendars.split_date_range(afterdate, beforedate)
+    except ValueError:
+        logger.error(
+            f"The search returned {found} results but there's nothing "
+            "the code can do because beforedate and afterdate are the same.\n"
+            "Case details will be scraped for these results.\n"
+        )
+        return None
+
+
+def collect_case_list(
+    ids_to_parse: List[str], fetched_cases: List[Optional[EvictionCase]]
+) -> List[CaseRecord]:
+    """
+    Turns the cases fetched for `ids_to_parse` into records,
+    and reports the case numbers that couldn't be fetched.
+    """
+    parsed_cases = []
+    failed_ids = []
+    for id_to_parse, new_case in zip(ids_to_parse, fetched_cases):
+        if new_case:
+            parsed_cases.append(CaseRecord.from_model(new_case))
+        else:
+            failed_ids.append(id_to_parse)
+
+    if failed_ids:
+        error_message = f"Failed to scrape data for {len(failed_ids)} case numbers. Here they are:\n{', '.join(failed_ids)}"
+        log_and_email(error_message, "Failed Case Numbers", error=True)
+
+    return parsed_cases
+
+
 class FakeScraper:
-    def __init__(self, headless: bool = True) -> None:
+    parser_class = hearing.BaseParser
+    county = "test"
+
+    def __init__(
+        self, headless: bool = True, driver_pool: Optional[DriverPool] = None
+    ) -> None:
+        self.headless = headless
+        self.driver_pool = driver_pool
         self.homepage = "will not access web"
         self.calendar_link_names = ["Court Calendar"]
+        self.page_cache = page_cache.get_page_cache()
+        self.filing_planner = filing_planner.get_filing_planner()
+        self.retry_policy = retries.RetryPolicy.from_config()
+        # search results of cases found by filing searches, so they can be loaded without searching again
+        self.search_results: Dict[str, calendars.Filing] = {}
+
+    def new_session(self) -> "FakeScraper":
+        """Makes another scraper like this one, with its own browser or HTTP session."""
+        scraper = self.__class__(headless=self.headless, driver_pool=self.driver_pool)
+        scraper.homepage = self.homepage
+        scraper.page_cache = self.page_cache
+        scraper.filing_planner = self.filing_planner
+        scraper.retry_policy = self.retry_policy
+        scraper.search_results = self.search_results
+        return scraper
 
-    def fetch_parsed_case(self, case_id: str) -> Tuple[str, str]:
-        query_result = self.query_case_id(case_id)
-        if query_result is None:
-            return None
-        result_soup, register_soup = query_result
-
-        register_url = case_search.get_register_url(result_soup)
-        status, type = case_search.get_status_and_type(result_soup)
-
-        if status.lower() not in hearing.statuses_map:
-            load_dotenv()
-            if os.getenv("LOCAL_DEV") != "true":
-                log_and_email(
-                    f"Case {case_id} has status '{status}', which is not in our list of known statuses.",
-                    "Found Unknown Status",
-                    error=True,
-                )
-            else:
-                logger.info(
-                    f"Case {case_id} has status '{status}', which is not in our list of known statuses."
-                )
+    def close_driver(self):
+        pass
 
-        parser = hearing.BaseParser()
-        return parser.make_parsed_case(
-            soup=register_soup, status=status, type=type, register_url=register_url
+    def retry(self, description: str, function: Callable[..., Any], *args) -> Any:
+        """
+        Calls `function` with `args`, retrying it if it fails in a way that could pass,
+        and waiting while the county's portal seems to be down.
+        """
+        return self.retry_policy.call(
+            function,
+            *args,
+            breaker=retries.get_circuit_breaker(self.county),
+            description=description,
         )
 
-    def make_case_list(
-        self, ids_to_parse: List[str], showbrowser: bool = False
-    ) -> List[Dict[str, Any]]:
-        """Gets case details for each case number in `ids_to_parse`"""
-        parsed_cases = []
+    def fetch_case_pages(self, case_id: str) -> Optional[CasePages]:
+        """
+        Gets the content of the search result and register of actions of a case, from the page
+        cache if they're fresh there. Returns None if the case couldn't be found.
+        """
+        cached_pages = get_cached_case_pages(self.page_cache, self.county, case_id)
+        if cached_pages:
+            return cached_pages
+
+        pages = self.retry(f"Loading case {case_id}", self.query_case, case_id)
+        if pages is not None:
+            cache_case_pages(self.page_cache, self.county, case_id, pages)
+        return pages
+
+    def query_case(self, case_id: str) -> Optional[CasePages]:
+        return self.query_found_case(case_id) or self.query_case_id(case_id)
+
+    def fetch_parsed_case(self, case_id: str) -> Optional[EvictionCase]:
+        pages = self.fetch_case_pages(case_id)
+        if pages is None:
+            return None
+        return parse_case_pages(case_id, pages, self.parser_class())
+
+    def try_to_fetch_parsed_case(self, case_id: str) -> Optional[EvictionCase]:
+        """Same as `fetch_parsed_case`, but returns None if the case couldn't be scraped or parsed."""
+        try:
+            return self.fetch_parsed_case(case_id)
+        except Exception as error:
+            logger.error(f"Failed to scrape case {case_id}: {error}")
+            return None
 
-        failed_ids = []
-        for id_to_parse in ids_to_parse:
-            new_case = self.fetch_parsed_case(id_to_parse)
-            if new_case:
-                parsed_cases.append(new_case)
-            else:
-                failed_ids.append(id_to_parse)
+    def query_found_case(self, case_id: str) -> Optional[CasePages]:
+        """
+        Loads the register of actions of a case found by a filing search straight from its link,
+        instead of searching for the case. Returns None if the case wasn't found that way,
+        or its register couldn't be loaded.
+        """
+        search_result = self.search_results.pop(case_id, None)
+        if search_result is None:
+            return None
+        register_page = self.query_register(
+            urljoin(self.homepage, search_result.register_link)
+        )
+        if register_page is None:
+            return None
+        return search_result.search_result, register_page
 
-        if failed_ids:
-            error_message = f"Failed to scrape data for {len(failed_ids)} case numbers. Here they are:\n{', '.join(failed_ids)}"
-            log_and_email(error_message, "Failed Case Numbers", error=True)
+    def query_register(self, register_url: str) -> Optional[str]:
+        return None
 
-        return parsed_cases
+    def make_case_list(
+        self, ids_to_parse: List[str], showbrowser: bool = False, workers: int = 1
+    ) -> List[CaseRecord]:
+        """
+        Gets case details for each case number in `ids_to_parse`, in the same order.
+        If `workers` is more than 1, the cases are scraped by that many sessions at once.
+        """
+        # case_pipeline imports this module, so it can't be imported at the top
+        from case_pipeline import run_case_pipeline
+
+        result = run_case_pipeline(ids_to_parse, scraper=self, workers=workers)
+        positions: Dict[str, int] = {}
+        for index, case_num in enumerate(ids_to_parse):
+            positions.setdefault(case_num, index)
+        return sorted(result.cases, key=lambda case: positions[case.case_number])
 
     def calendar_queries(
         self, afterdate: datetime.date, beforedate: datetime.date
     ) -> Iterator[CalendarQuery]:
         """Make queries for court calendar to get all cases within date range."""
-        years = set([afterdate.year, beforedate.year])
-        for year in years:
-            for prefix_text in ["J1-CV", "J2-CV", "J3-EV", "J4-CV", "J5-CV"]:
-                yield CalendarQuery(
-                    afterdate=afterdate,
-                    beforedate=beforedate,
-                    prefix=f"{prefix_text}-{year}*",
-                )
+        return calendar_queries(afterdate, beforedate)
 
     def fetch_settings(
         self, afterdate: datetime.date, beforedate: datetime.date
@@ -114,21 +382,50 @@ class FakeScraper:
     def fetch_settings_from_calendar(
         self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
     ) -> List[Optional[Dict[str, str]]]:
+        settings, _ = self.fetch_calendar_settings(afterdate, beforedate, calendar_link)
+        return settings
 
-        for tries in range(1, 11):
-            try:
-                "fetch all settings as a list of dicts"
-                calendar_soup = self.query_settings(
-                    afterdate, beforedate, calendar_link=calendar_link
-                )
-                return calendars.get_setting_list(calendar_soup)
-            except:
-                if tries == 10:
-                    logger.error(
-                        f"Failed to get setting list between {afterdate} and {beforedate} on all 10 attempts."
-                    )
+    def search_calendar(
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> Tuple[str, List[Dict[str, str]], bool]:
+        """Queries a calendar and reads its settings, so that a page that can't be read is retried too."""
+        calendar_page = self.query_settings(afterdate, beforedate, calendar_link)
+        settings, capped = retries.read_page(calendars.get_settings, calendar_page)
+        return calendar_page, settings, capped
+
+    def search_filings(
+        self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
+    ) -> Tuple[List[calendars.Filing], bool]:
+        """Searches for filings and reads them, so that a page that can't be read is retried too."""
+        filings_page = self.query_filings(afterdate, beforedate, case_num_prefix)
+        return retries.read_page(calendars.get_filings, filings_page)
 
-        return []
+    def fetch_calendar_settings(
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> Tuple[List[Dict[str, str]], bool]:
+        """Fetches all settings as a list of dicts, and whether the calendar hit the result cap."""
+        cached_settings = get_cached_calendar_settings(
+            self.page_cache, self.county, calendar_link, afterdate, beforedate
+        )
+        if cached_settings:
+            return cached_settings
+
+        try:
+            calendar_page, settings, capped = self.retry(
+                f"Calendar query between {afterdate} and {beforedate}",
+                self.search_calendar,
+                afterdate,
+                beforedate,
+                calendar_link,
+            )
+        except Exception as error:
+            log_missing_settings(calendar_link, afterdate, beforedate, error)
+            return [], False
+
+        cache_calendar_page(
+            self.page_cache, self.county, calendar_link, afterdate, beforedate, calendar_page
+        )
+        return settings, capped
 
     def get_all_case_nums(
         self, afterdate: datetime.date, beforedate: datetime.date
@@ -138,28 +435,77 @@ class FakeScraper:
         """
         all_case_nums = []
         for query in self.calendar_queries(afterdate, beforedate):
-            response = self.fetch_filings(
-                query.afterdate, query.beforedate, query.prefix
-            )
-            all_case_nums.extend(response)
+            # split ahead of time where the search is likely to hit the result cap
+            for window_afterdate, window_beforedate in self.filing_planner.plan(
+                query.prefix, query.afterdate, query.beforedate
+            ):
+                response = self.fetch_filings(
+                    window_afterdate, window_beforedate, query.prefix
+                )
+                all_case_nums.extend(response)
 
         logger.info(
             f"Scraped case numbers between {afterdate} and {beforedate} "
             f"- found {len(all_case_nums)} of them."
         )
+        logger.info(self.filing_planner.summary())
+        self.filing_planner.save()
         return all_case_nums
 
-    def make_setting_list(self, days_to_pull: List[str]) -> List[Dict[str, Any]]:
-        """Pulls all settings, one day at a time"""
-        pulled_settings = []
-        for setting_day in days_to_pull:
-            day_settings = self.fetch_settings(
-                afterdate=setting_day, beforedate=setting_day
-            )
-            pulled_settings.extend(day_settings)
+    def make_setting_list(
+        self,
+        days_to_pull: List[datetime.date],
+        on_settings: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pulls all settings, asking each calendar for up to CALENDAR_QUERY_DAYS days at a time.
+        Asks for fewer days after a page comes close to the result cap, and for more again
+        once pages are small. A page that hit the cap is asked for again over fewer days.
+        Passes the settings from each query to `on_settings` as soon as they're pulled,
+        leaving out repeats of settings already passed when querying ranges of days.
+        """
+        pulled_settings: List[Dict[str, Any]] = []
+        seen: set = set()
+
+        def add_settings(settings: List[Dict[str, Any]], dedupe: bool = True) -> None:
+            new_settings = calendars.unique_settings(settings, seen) if dedupe else settings
+            pulled_settings.extend(new_settings)
+            if on_settings is not None:
+                on_settings(new_settings)
+
+        if config.calendar_query_days == 1:
+            for setting_day in days_to_pull:
+                add_settings(
+                    self.fetch_settings(afterdate=setting_day, beforedate=setting_day),
+                    dedupe=False,
+                )
+            return pulled_settings
+
+        for calendar_link in self.calendar_link_names:
+            self.fetch_settings_in_windows(days_to_pull, calendar_link, add_settings)
         return pulled_settings
 
-    def query_case_id(self, case_id: str) -> Tuple[BeautifulSoup, BeautifulSoup]:
+    def fetch_settings_in_windows(
+        self,
+        days_to_pull: List[datetime.date],
+        calendar_link: str,
+        on_settings: Optional[Callable[[List[Dict[str, str]]], Any]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Pulls the settings on `days_to_pull` from one calendar, a range of days at a time.
+        Passes each range's settings to `on_settings` as soon as they're pulled.
+        """
+        return calendars.fetch_settings_in_windows(
+            days_to_pull,
+            lambda afterdate, beforedate: self.fetch_calendar_settings(
+                afterdate, beforedate, calendar_link
+            ),
+            config.calendar_query_days,
+            calendar_link=calendar_link,
+            on_settings=on_settings,
+        )
+
+    def query_case_id(self, case_id: str) -> CasePages:
         if case_id != "J1-CV-20-001590":
             raise ValueError(
                 "The testing-only FakeScraper can only take the Case ID J1-CV-20-001590. "
@@ -167,7 +513,7 @@ class FakeScraper:
             )
         search_page = load_pages.get_test_search_page(0)
         register_page = load_pages.get_test_soup(0)
-        return search_page, register_page
+        return str(search_page), str(register_page)
 
     def query_settings(
         self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
@@ -180,7 +526,7 @@ class FakeScraper:
                 "that begin on 2015-10-21. To make real queries, use a scraper named "
                 "for the county you want, such as 'TravisScraper'."
             )
-        return load_pages.get_test_calendar()
+        return load_pages.get_test_calendar_content()
 
     def fetch_filings(
         self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
@@ -189,147 +535,155 @@ class FakeScraper:
 
 
 class TravisScraper(FakeScraper):
-    def __init__(self, headless: bool = True) -> None:
-        super().__init__()
+    """
+    Scrapes Travis County's Odyssey portal by driving Chrome.
+
+    Starts its own Chrome unless given a `driver_pool`, in which case it borrows
+    a driver from the pool and gives it back when closed.
+    """
+
+    county = "travis"
+
+    def __init__(
+        self, headless: bool = True, driver_pool: Optional[DriverPool] = None
+    ) -> None:
+        super().__init__(headless=headless, driver_pool=driver_pool)
         self.homepage = (
             "https://odysseypa.traviscountytx.gov/JPPublicAccess/default.aspx"
         )
         self.date_range_button_id = "DateRange"
+        self.case_records_link_name = "Civil, Family & Probate Case Records"
+        # URLs of the pages linked from the homepage, so later queries can skip the homepage
+        self.linked_page_urls: Dict[str, str] = {}
+        self.navigations_saved = 0
+        self.start_driver(headless=headless)
+        atexit.register(self.close_driver)
 
-        options = Options()
-        options.add_argument("--no-sandbox")
-        options.add_argument("--headless")
-        options.add_argument("window-size=1920,1080")
-        options.headless = headless
-
-        if config.local_dev:
-            self.driver = webdriver.Chrome("./chromedriver", options=options)
+    def start_driver(self, headless: bool = True) -> None:
+        if self.driver_pool is not None:
+            self.driver = self.driver_pool.borrow()
         else:
-            driver_path, chrome_bin = (
-                os.getenv("CHROMEDRIVER_PATH"),
-                os.getenv("GOOGLE_CHROME_BIN"),
-            )
-            options.binary_location = chrome_bin
-            self.driver = webdriver.Chrome(executable_path=driver_path, options=options)
-        atexit.register(self.close_driver)
+            self.driver = make_chrome_driver(headless=headless)
 
     def load_start_page(self):
         self.driver.get(self.homepage)
         return self.driver
 
-    def load_search_page(self):
-        start_page = self.load_start_page()
-        try:
-            element = WebDriverWait(start_page, 10).until(
-                EC.presence_of_element_located(
-                    (By.LINK_TEXT, "Civil, Family & Probate Case Records")
+    def load_linked_page(self, link_name: str, ready_element_id: str):
+        """
+        Opens the page that the homepage links to as `link_name`.
+
+        After the first time, goes straight to that page's URL in the same session,
+        and only goes through the homepage again if the element `ready_element_id`
+        doesn't show up (for example because the session expired).
+        """
+        linked_page_url = self.linked_page_urls.get(link_name)
+        if linked_page_url is not None:
+            self.driver.get(linked_page_url)
+            try:
+                WebDriverWait(self.driver, 3).until(
+                    EC.presence_of_element_located((By.ID, ready_element_id))
                 )
-            )
-        finally:
-            element.click()
-            return start_page
-        return None
+                self.navigations_saved += 1
+                return self.driver
+            except TimeoutException:
+                logger.info(f"Could not go straight to '{link_name}', will start over.")
+
+        start_page = self.load_start_page()
+        element = WebDriverWait(start_page, 10).until(
+            EC.presence_of_element_located((By.LINK_TEXT, link_name))
+        )
+        element.click()
+        self.linked_page_urls[link_name] = start_page.current_url
+        return start_page
+
+    def load_search_page(self):
+        return self.load_linked_page(self.case_records_link_name, "Case")
 
     def load_case_records_search_page(self):
         """Clicks into Case Records search page"""
+        return self.load_search_page()
 
-        start_page = self.load_start_page()
-        try:
-            element = WebDriverWait(start_page, 10).until(
-                EC.presence_of_element_located(
-                    (By.LINK_TEXT, "Civil, Family & Probate Case Records")
-                )
+    def log_navigations_saved(self) -> None:
+        if self.navigations_saved:
+            logger.info(
+                f"Went straight to search pages {self.navigations_saved} times "
+                "instead of navigating from the homepage."
             )
-        finally:
-            element.click()
-            return start_page
-        return None
 
     def close_driver(self):
-        self.driver.close()
+        self.log_navigations_saved()
+        if self.driver_pool is not None:
+            self.driver_pool.give_back(self.driver)
+        else:
+            self.driver.close()
 
-    def query_case_id(self, case_id: str):
+    def query_case_id(self, case_id: str) -> Optional[CasePages]:
+        """
+        Searches for `case_id` and opens its register of actions. Returns None if the search
+        finds no such case. Browser errors and pages that don't load in time are raised, so
+        the retry policy can try again.
+        """
         # this is the same for travis and williamson.
         search_page = self.load_search_page()
-        try:
-            case_radio_button = WebDriverWait(search_page, 10).until(
-                EC.presence_of_element_located((By.ID, "Case"))
-            )
-            case_radio_button.click()
-        except:
-            # logger.error(f"Could not click button to search for case {case_id}")
-            return None
+        case_radio_button = WebDriverWait(search_page, 10).until(
+            EC.presence_of_element_located((By.ID, "Case"))
+        )
+        case_radio_button.click()
 
-        try:
-            search_box = WebDriverWait(search_page, 10).until(
-                EC.presence_of_element_located((By.ID, "CaseSearchValue"))
-            )
-        except:
-            # logger.error(f"Could not type query to search for case {case_id}")
-            return None
-        finally:
-            search_box.send_keys(case_id)
-            search_button = search_page.find_element_by_name("SearchSubmit")
-            search_button.click()
-            search_page.implicitly_wait(1)
-            search_page_content = search_page.page_source
+        search_box = WebDriverWait(search_page, 10).until(
+            EC.presence_of_element_located((By.ID, "CaseSearchValue"))
+        )
+        search_box.send_keys(case_id)
+        search_button = search_page.find_element(By.NAME, "SearchSubmit")
+        search_button.click()
+        search_page.implicitly_wait(1)
 
         try:
             register_link = WebDriverWait(search_page, 10).until(
                 EC.presence_of_element_located((By.LINK_TEXT, case_id))
             )
-            register_link.click()
-        except:
-            # logger.error(f"Could not click search result for case {case_id}")
-            return None
+        except TimeoutException:
+            if "No cases matched" in search_page.page_source:
+                return None
+            raise
+        search_page_content = search_page.page_source
+        register_link.click()
+
+        WebDriverWait(search_page, 10).until(
+            EC.presence_of_element_located((By.ID, "PIr11"))
+        )
+        register_page_content = search_page.page_source
+        return search_page_content, register_page_content
 
+    def query_register(self, register_url: str) -> Optional[str]:
         try:
-            register_heading = WebDriverWait(search_page, 10).until(
+            self.driver.get(register_url)
+            WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.ID, "PIr11"))
             )
-        except:
-            # logger.error(f"Could not load register of actions for case {case_id}")
+        except Exception:
             return None
-        finally:
-            register_page_content = search_page.page_source
-            search_soup = BeautifulSoup(search_page_content, "html.parser")
-            register_soup = BeautifulSoup(register_page_content, "html.parser")
-            return search_soup, register_soup
+        return self.driver.page_source
 
     def load_court_calendar(self, calendar_link_name: str):
         """Opens the court calendar to scrape settings"""
-
-        start_page = self.load_start_page()
-        try:
-            element = WebDriverWait(start_page, 10).until(
-                EC.presence_of_element_located((By.LINK_TEXT, calendar_link_name))
-            )
-        finally:
-            element.click()
-            return start_page
-        return None
+        return self.load_linked_page(calendar_link_name, self.date_range_button_id)
 
     def query_settings(
         self,
         afterdate: datetime.date,
         beforedate: datetime.date,
         calendar_link: str,
-    ) -> BeautifulSoup:
+    ) -> str:
         """Search for case settings between beforedate and afterdate for, returns content of resulting page"""
 
-        for tries in range(5):
-            # select Date Range radiobutton for search
-            try:
-                court_calendar = self.load_court_calendar(calendar_link)
-                date_range_radio_button = WebDriverWait(court_calendar, 10).until(
-                    EC.presence_of_element_located((By.ID, self.date_range_button_id))
-                )
-                date_range_radio_button.click()
-                break
-            except:
-                logger.error(
-                    f"Could not click button to search settings by Date Range, try {tries}"
-                )
+        # select Date Range radiobutton for search
+        court_calendar = self.load_court_calendar(calendar_link)
+        date_range_radio_button = WebDriverWait(court_calendar, 10).until(
+            EC.presence_of_element_located((By.ID, self.date_range_button_id))
+        )
+        date_range_radio_button.click()
 
         # deselect all Case Category checkboxes besides Civil
         for check_id in ["chkDtRangeProbate", "chkDtRangeFamily", "chkDtRangeCriminal"]:
@@ -379,27 +733,19 @@ class TravisScraper(FakeScraper):
             )
 
         finally:
-            calendar_page_content = court_calendar.page_source
-            return BeautifulSoup(calendar_page_content, "html.parser")
+            return court_calendar.page_source
 
     def query_filings(
         self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
     ):
         """Executes search for case filings between beforedate and afterdate for case_num_prefix, returns content of resulting page"""
 
-        for tries in range(5):
-            # select case in search by
-            try:
-                court_records = self.load_case_records_search_page()
-                case_button = WebDriverWait(court_records, 10).until(
-                    EC.presence_of_element_located((By.ID, "Case"))
-                )
-                case_button.click()
-                break
-            except Exception as e:
-                logger.error(
-                    f"Could not click button to search filings by Case, try {tries}"
-                )
+        # select case in search by
+        court_records = self.load_case_records_search_page()
+        case_button = WebDriverWait(court_records, 10).until(
+            EC.presence_of_element_located((By.ID, "Case"))
+        )
+        case_button.click()
 
         # enter after date
         try:
@@ -455,117 +801,66 @@ class TravisScraper(FakeScraper):
     ) -> List[str]:
         "Get filing case numbers between afterdate and beforedate and starting with case_num_prefix."
 
-        for tries in range(1, 11):
-            try:
-                filings_page_content = self.query_filings(
-                    afterdate, beforedate, case_num_prefix
-                )
-                filings_soup = BeautifulSoup(filings_page_content, "html.parser")
-                (
-                    filings_case_nums_list,
-                    query_needs_splitting,
-                ) = calendars.get_filing_case_nums(filings_soup)
-                break
-            except:
-                if tries == 10:
-                    logger.error(f"Failed to find case numbers on all 10 attempts.")
-                    query_needs_splitting = False
-                    filings_case_nums_list = []
+        try:
+            filings, query_needs_splitting = self.retry(
+                f"Filing search for {case_num_prefix} between {afterdate} and {beforedate}",
+                self.search_filings,
+                afterdate,
+                beforedate,
+                case_num_prefix,
+            )
+        except Exception as error:
+            log_missing_filings(case_num_prefix, afterdate, beforedate, error)
+            return []
 
-        # handle case of too many results (200 results means that the search cut off)
-        if query_needs_splitting:
-            try:
-                (
-                    end_of_first_range,
-                    start_of_second_range,
-                ) = calendars.split_date_range(afterdate, beforedate)
-                filings_case_nums_list = self.fetch_filings(
-                    afterdate, end_of_first_range, case_num_prefix
-                ) + self.fetch_filings(
-                    start_of_second_range, beforedate, case_num_prefix
-                )
-            except ValueError:
-                filings_case_nums_list = None
-                logger.error(
-                    f"The search returned {len(filings_case_nums_list)} results but there's nothing "
-                    "the code can do because beforedate and afterdate are the same.\n"
-                    "Case details will be scraped for these results.\n"
-                )
+        filings_case_nums_list = record_filings(
+            self, case_num_prefix, afterdate, beforedate, filings, query_needs_splitting
+        )
 
-        return filings_case_nums_list
+        # handle case of too many results (200 results means that the search cut off)
+        split = query_needs_splitting and split_filing_search(
+            afterdate, beforedate, len(filings_case_nums_list)
+        )
+        if not split:
+            return filings_case_nums_list
+        end_of_first_range, start_of_second_range = split
+        return self.fetch_filings(
+            afterdate, end_of_first_range, case_num_prefix
+        ) + self.fetch_filings(start_of_second_range, beforedate, case_num_prefix)
 
 
 class HaysScraper(TravisScraper):
-    def __init__(self, headless: bool = True) -> None:
-        super().__init__(headless=headless)
+    county = "hays"
+
+    def __init__(
+        self, headless: bool = True, driver_pool: Optional[DriverPool] = None
+    ) -> None:
+        super().__init__(headless=headless, driver_pool=driver_pool)
         self.homepage = "http://public.co.hays.tx.us/default.aspx"
 
 
 class WilliamsonScraper(TravisScraper):
-    def __init__(self, headless: bool = True) -> None:
-        super().__init__(headless=headless)
+    parser_class = hearing.WilliamsonParser
+    county = "williamson"
+
+    def __init__(
+        self, headless: bool = True, driver_pool: Optional[DriverPool] = None
+    ) -> None:
+        super().__init__(headless=headless, driver_pool=driver_pool)
         self.homepage = "https://judicialrecords.wilco.org/PublicAccess/default.aspx"
         self.calendar_link_names = ["Jp1 Court Calendar", "Jp3 Court Calendar"]
 
-    def fetch_parsed_case(self, case_id: str) -> Tuple[str, str]:
-        query_result = self.query_case_id(case_id)
-        if query_result is None:
-            return None
-        result_soup, register_soup = query_result
-
-        register_url = case_search.get_register_url(result_soup)
-        status, type = case_search.get_status_and_type(result_soup)
-
-        if status.lower() not in hearing.statuses_map:
-            load_dotenv()
-            if os.getenv("LOCAL_DEV") != "true":
-                log_and_email(
-                    f"Case {case_id} has status '{status}', which is not in our list of known statuses.",
-                    "Found Unknown Status",
-                    error=True,
-                )
-            else:
-                logger.info(
-                    f"Case {case_id} has status '{status}', which is not in our list of known statuses."
-                )
-
-        parser = hearing.WilliamsonParser()
-        return parser.make_parsed_case(
-            soup=register_soup, status=status, type=type, register_url=register_url
-        )
-
-    def load_court_calendar(self, calendar_name : str):
-        """Opens the court calendar to scrape settings"""
-
-        start_page = self.load_start_page()
-        try:
-            element = WebDriverWait(start_page, 10).until(
-                EC.presence_of_element_located((By.LINK_TEXT, calendar_name))
-            )
-        finally:
-            element.click()
-            return start_page
-        return None
-
-
     def query_settings(
-        self, afterdate: datetime.date, beforedate: datetime.date, calendar_name : str
-    ) -> BeautifulSoup:
+        self, afterdate: datetime.date, beforedate: datetime.date, calendar_link: str
+    ) -> str:
         """Executes search for case settings between beforedate and afterdate for, returns content of resulting page"""
 
-        for tries in range(5):
-            # select Date Range radiobutton for search
-            try:
-                court_calendar = self.load_court_calendar(calendar_name)
-                date_range_radio_button = WebDriverWait(court_calendar, 10).until(
-                    EC.presence_of_element_located((By.ID, "DateRange"))
-                )
-                date_range_radio_button.click()
-                break
-            except:
-                logger.error(
-                    f"Could not click button to search settings by Date Range, try {tries}"
-                )
+        # select Date Range radiobutton for search
+        court_calendar = self.load_court_calendar(calendar_link)
+        date_range_radio_button = WebDriverWait(court_calendar, 10).until(
+            EC.presence_of_element_located((By.ID, "DateRange"))
+        )
+        date_range_radio_button.click()
 
         # deselect all Case Category checkboxes besides Civil
         for check_id in ["chkDtRangeProbate", "chkDtRangeFamily", "chkDtRangeCriminal"]:
@@ -615,32 +910,170 @@ class WilliamsonScraper(TravisScraper):
             )
 
         finally:
-            calendar_page_content = court_calendar.page_source
-            return BeautifulSoup(calendar_page_content, "html.parser")
+            return court_calendar.page_source
+
+
+class TravisHTTPScraper(TravisScraper):
+    """
+    Scrapes the same Odyssey portal as TravisScraper, but replays its search form posts
+    over a plain HTTP session instead of driving Chrome.
+
+    The session keeps the ASP.NET cookies, and each search re-reads the form
+    so the viewstate posted back is always the one the portal just issued.
+    """
+
+    def start_driver(self, headless: bool = True) -> None:
+        self.timeout = 30
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (eviction-hearing-parser)"
+
+    def close_driver(self):
+        self.log_navigations_saved()
+        self.session.close()
+
+    def request_page(self, url: str, data: Optional[Dict[str, str]] = None):
+        """GETs `url`, or POSTs `data` to it, and returns the response."""
+        if data is None:
+            response = self.session.get(url, timeout=self.timeout)
+        else:
+            response = self.session.post(url, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def load_page(
+        self, url: str, data: Optional[Dict[str, str]] = None
+    ) -> Tuple[str, BeautifulSoup]:
+        """Returns the final URL and soup of the page at `url`."""
+        response = self.request_page(url, data=data)
+        return response.url, make_soup(response.text)
+
+    def load_start_page(self) -> Tuple[str, BeautifulSoup]:
+        return self.load_page(self.homepage)
+
+    def load_linked_page(
+        self, link_name: str, ready_element_id: str = "SearchSubmit"
+    ) -> Tuple[str, BeautifulSoup]:
+        """
+        Loads the page that the homepage links to as `link_name`.
+
+        After the first time, goes straight to that page's URL in the same session,
+        and only goes through the homepage again if the page doesn't have the element
+        `ready_element_id` (for example because the session expired).
+        """
+        linked_page_url = self.linked_page_urls.get(link_name)
+        if linked_page_url is not None:
+            try:
+                page_url, page = self.load_page(linked_page_url)
+                if page.find(id=ready_element_id) is not None:
+                    self.navigations_saved += 1
+                    return page_url, page
+            except requests.RequestException:
+                pass
+            logger.info(f"Could not go straight to '{link_name}', will start over.")
+
+        start_url, start_page = self.load_start_page()
+        link_url = odyssey.get_link_url(start_page, start_url, link_name)
+        if link_url is None:
+            raise ValueError(f"Could not find link '{link_name}' on {start_url}")
+        page_url, page = self.load_page(link_url)
+        self.linked_page_urls[link_name] = page_url
+        return page_url, page
+
+    def load_search_page(self) -> Tuple[str, BeautifulSoup]:
+        return self.load_linked_page(self.case_records_link_name, "Case")
+
+    def load_case_records_search_page(self) -> Tuple[str, BeautifulSoup]:
+        """Follows the link into the Case Records search page"""
+        return self.load_search_page()
+
+    def load_court_calendar(self, calendar_link_name: str) -> Tuple[str, BeautifulSoup]:
+        """Opens the court calendar to scrape settings"""
+        return self.load_linked_page(calendar_link_name, self.date_range_button_id)
+
+    def submit_search(self, page_url: str, form, payload: Dict[str, str]):
+        """Posts `form` with the fields in `payload`."""
+        return self.request_page(odyssey.get_form_action(form, page_url), data=payload)
+
+    def query_case_id(self, case_id: str) -> Optional[CasePages]:
+        try:
+            search_url, search_page = self.load_search_page()
+            form = odyssey.get_form(search_page)
+            payload = odyssey.case_search_payload(form, case_id)
+            response = self.submit_search(search_url, form, payload)
+
+            register_url = odyssey.get_link_url(
+                make_soup(response.text), response.url, case_id
+            )
+            if register_url is None:
+                return None
+            register_page = self.request_page(register_url).text
+        except (requests.RequestException, ValueError) as error:
+            # leave errors another attempt could get past to the retry policy
+            if retries.is_retryable(error):
+                raise
+            return None
+
+        return response.text, register_page
+
+    def query_register(self, register_url: str) -> Optional[str]:
+        try:
+            register_page = self.request_page(register_url).text
+        except requests.RequestException:
+            return None
+        # e.g. the portal sent back its homepage because the session expired
+        if not odyssey.is_register_page(register_page):
+            return None
+        return register_page
+
+    def query_settings(
+        self,
+        afterdate: datetime.date,
+        beforedate: datetime.date,
+        calendar_link: str,
+    ) -> str:
+        """Search for case settings between beforedate and afterdate for, returns content of resulting page"""
+
+        calendar_url, court_calendar = self.load_court_calendar(calendar_link)
+        form = odyssey.get_form(court_calendar)
+        payload = odyssey.settings_search_payload(
+            form, afterdate, beforedate, self.date_range_button_id
+        )
+        return self.submit_search(calendar_url, form, payload).text
+
+    def query_filings(
+        self, afterdate: datetime.date, beforedate: datetime.date, case_num_prefix: str
+    ) -> str:
+        """Executes search for case filings between beforedate and afterdate for case_num_prefix, returns content of resulting page"""
+
+        search_url, court_records = self.load_case_records_search_page()
+        form = odyssey.get_form(court_records)
+        payload = odyssey.filings_search_payload(
+            form, afterdate, beforedate, case_num_prefix
+        )
+        return self.submit_search(search_url, form, payload).text
+
+
+class HaysHTTPScraper(TravisHTTPScraper):
+    county = "hays"
+
+    def __init__(
+        self, headless: bool = True, driver_pool: Optional[DriverPool] = None
+    ) -> None:
+        super().__init__(headless=headless, driver_pool=driver_pool)
+        self.homepage = "http://public.co.hays.tx.us/default.aspx"
+
+
+class WilliamsonHTTPScraper(TravisHTTPScraper):
+    parser_class = hearing.WilliamsonParser
+    county = "williamson"
+
+    def __init__(
+        self, headless: bool = True, driver_pool: Optional[DriverPool] = None
+    ) -> None:
+        super().__init__(headless=headless, driver_pool=driver_pool)
+        self.homepage = "https://judicialrecords.wilco.org/PublicAccess/default.aspx"
+        self.calendar_link_names = ["Jp1 Court Calendar", "Jp3 Court Calendar"]
 
-    def fetch_settings(
-        self, afterdate: datetime.date, beforedate: datetime.date
-    ) -> List[Optional[Dict[str, str]]]:
-        settings_list = []
-
-        # Run once for each court calendar in Williamson County
-        for calendar_name in ["Jp1 Court Calendar", "Jp3 Court Calendar"]:
-            for tries in range(1, 11):
-                try:
-                    "fetch all settings as a list of dicts"
-                    calendar_soup = self.query_settings(afterdate, beforedate, calendar_name)
-                    calendar_settings = calendars.get_setting_list(calendar_soup)
-                    #only extend if there is data in the list
-                    if calendar_settings:
-                        settings_list.extend(calendar_settings)
-                    break
-                except:
-                    if tries == 10:
-                        logger.error(
-                            f"Failed to get setting list between {afterdate} and {beforedate} on all 10 attempts."
-                        )
-
-        return settings_list
 
 SCRAPER_NAMES = {
     "test": FakeScraper,
@@ -648,3 +1081,30 @@ SCRAPER_NAMES = {
     "williamson": WilliamsonScraper,
     "wilco": WilliamsonScraper,
 }
+
+HTTP_SCRAPER_NAMES = {
+    "test": FakeScraper,
+    "travis": TravisHTTPScraper,
+    "williamson": WilliamsonHTTPScraper,
+    "wilco": WilliamsonHTTPScraper,
+}
+
+
+def get_scraper(
+    county: str = "travis",
+    headless: bool = True,
+    driver_pool: Optional[DriverPool] = None,
+) -> FakeScraper:
+    """
+    Makes the scraper for `county`, defaulting to Travis County.
+
+    Uses the plain HTTP scrapers if the SCRAPER_BACKEND environment variable is "http"
+    (or "async"), and the Selenium ones otherwise. Selenium scrapers borrow their driver from
+    `driver_pool` if one is given.
+    """
+    names = (
+        HTTP_SCRAPER_NAMES if config.scraper_backend in ("http", "async") else SCRAPER_NAMES
+    )
+    county = county.lower()
+    scraper_class = names[county] if county in names else names["travis"]
+    return scraper_class(headless=headless, driver_pool=driver_pool)
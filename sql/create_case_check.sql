@@ -0,0 +1,8 @@
+CREATE TABLE CASE_CHECK (
+    CASE_NUMBER TEXT PRIMARY KEY NOT NULL,
+    CONTENT_HASH TEXT NOT NULL,
+    LAST_CHECKED DATE NOT NULL,
+    LAST_CHANGED DATE NOT NULL,
+    NEXT_CHECK DATE NOT NULL,
+    FOREIGN KEY(CASE_NUMBER) REFERENCES CASE_DETAIL(CASE_NUMBER)
+);
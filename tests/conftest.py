@@ -0,0 +1,230 @@
+"""
+Local stand-in for an Odyssey portal, serving the saved pages in test_pages and test_search_pages.
+
+Like the real portal, it hands out an ASP.NET session cookie on the homepage,
+rejects requests without it, and only accepts a search post carrying the
+viewstate from the search form it most recently served to that session.
+
+Also has a stand-in for a psycopg2 database connection, for tests of the code that talks to
+the database.
+"""
+
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import load_pages
+
+HOMEPAGE = """<html><body>
+<a href="Search.aspx?ID=400">Civil, Family &amp; Probate Case Records</a>
+<a href="Search.aspx?ID=900">Court Calendar</a>
+<a href="Search.aspx?ID=901">Jp1 Court Calendar</a>
+</body></html>"""
+
+SEARCH_FORM = """<html><body>
+<form name="Form1" method="post" action="Search.aspx?ID={page_id}" id="Form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+<input type="hidden" name="NodeID" id="NodeID" value="1,2,3" />
+<input type="radio" name="SearchBy" id="Case" value="0" />
+<input type="radio" name="SearchBy" id="Party" value="1" checked="checked" />
+<input type="radio" name="SearchBy" id="DateRange" value="5" />
+<input type="text" name="CaseSearchValue" id="CaseSearchValue" />
+<input type="text" name="DateFiledOnAfter" id="DateFiledOnAfter" />
+<input type="text" name="DateFiledOnBefore" id="DateFiledOnBefore" />
+<input type="text" name="DateSettingOnAfter" id="DateSettingOnAfter" />
+<input type="text" name="DateSettingOnBefore" id="DateSettingOnBefore" />
+<input type="checkbox" name="chkDtRangeCivil" id="chkDtRangeCivil" checked="checked" />
+<input type="checkbox" name="chkDtRangeProbate" id="chkDtRangeProbate" checked="checked" />
+<input type="checkbox" name="chkDtRangeFamily" id="chkDtRangeFamily" checked="checked" />
+<input type="checkbox" name="chkDtRangeCriminal" id="chkDtRangeCriminal" checked="checked" />
+<input type="submit" name="SearchSubmit" id="SearchSubmit" value="Search" />
+</form>
+</body></html>"""
+
+NO_MATCHES = """<html><body><table>
+<tr><th>Case Number</th><th>Style</th><th>Filed/Location</th></tr>
+<tr><td>No cases matched your search criteria.</td></tr>
+</table></body></html>"""
+
+CASE_SEARCH_RESULTS = {
+    "J1-CV-20-001590": load_pages.get_test_html_path(0, "test_search_pages"),
+}
+
+REGISTER_PAGES = {
+    "2286743": load_pages.get_test_html_path(0, "test_pages"),
+    # linked from the filing search results, standing in for J1-CV-20-001772's register
+    "2288519": load_pages.get_test_html_path(0, "test_pages"),
+}
+
+
+class OdysseyStandIn(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), OdysseyHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.viewstates: Dict[str, str] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.posts: List[Dict[str, str]] = []
+
+    def new_token(self, prefix: str) -> str:
+        with self.lock:
+            return f"{prefix}{next(self.counter)}"
+
+
+class OdysseyHandler(BaseHTTPRequestHandler):
+    server: OdysseyStandIn
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def send_page(self, html: str, status: int = 200, headers: Dict = {}) -> None:
+        body = html.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, filepath: str) -> None:
+        with open(filepath) as fp:
+            self.send_page(fp.read())
+
+    def get_session(self) -> str:
+        for cookie in self.headers.get_all("Cookie", []):
+            for part in cookie.split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == "ASP.NET_SessionId" and value in self.server.viewstates:
+                    return value
+        return ""
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append(("GET", self.path))
+
+        if url.path == "/default.aspx":
+            session = self.get_session() or self.server.new_token("session")
+            self.server.viewstates.setdefault(session, "")
+            cookie = f"ASP.NET_SessionId={session}; path=/"
+            return self.send_page(HOMEPAGE, headers={"Set-Cookie": cookie})
+
+        session = self.get_session()
+        if not session:
+            return self.send_page("session expired", status=403)
+
+        if url.path == "/Search.aspx":
+            viewstate = self.server.new_token("viewstate")
+            self.server.viewstates[session] = viewstate
+            page_id = query["ID"][0]
+            return self.send_page(
+                SEARCH_FORM.format(page_id=page_id, viewstate=viewstate)
+            )
+
+        if url.path == "/CaseDetail.aspx" and query["CaseID"][0] in REGISTER_PAGES:
+            return self.send_file(REGISTER_PAGES[query["CaseID"][0]])
+
+        self.send_page("not found", status=404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        self.server.requests.append(("POST", self.path))
+        length = int(self.headers.get("Content-Length", 0))
+        form = {
+            name: values[0]
+            for name, values in parse_qs(
+                self.rfile.read(length).decode("utf-8"), keep_blank_values=True
+            ).items()
+        }
+        self.server.posts.append(form)
+
+        session = self.get_session()
+        if not session:
+            return self.send_page("session expired", status=403)
+        if url.path != "/Search.aspx" or "SearchSubmit" not in form:
+            return self.send_page("not found", status=404)
+        if form.get("__VIEWSTATE") != self.server.viewstates[session]:
+            return self.send_page("invalid viewstate", status=500)
+
+        if form.get("SearchBy") == "5":
+            return self.send_file(load_pages.get_test_calendar_path())
+
+        if form.get("SearchBy") == "0":
+            if form.get("DateFiledOnAfter"):
+                return self.send_file(load_pages.get_test_filing_search_path())
+            case_id = form.get("CaseSearchValue", "")
+            if case_id in CASE_SEARCH_RESULTS:
+                return self.send_file(CASE_SEARCH_RESULTS[case_id])
+
+        self.send_page(NO_MATCHES)
+
+
+class FakeCursor:
+    """Records the statements it executes, and returns the connection's `rows` for any query."""
+
+    rowcount = 0
+
+    def __init__(self, connection: "FakeConnection") -> None:
+        self.connection = connection
+
+    def execute(self, statement: str, params=None) -> None:
+        if not self.connection.healthy:
+            raise ConnectionError("server closed the connection unexpectedly")
+        self.connection.statements.append(statement)
+
+    def fetchall(self) -> List[Any]:
+        return list(self.connection.rows)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    """
+    Stands in for a psycopg2 connection. Set `healthy` to False to make its cursors fail
+    as if the server had closed it.
+    """
+
+    cursor_class = FakeCursor
+
+    def __init__(self, rows: Optional[List[Any]] = None) -> None:
+        self.rows = rows or []
+        self.statements: List[str] = []
+        self.healthy = True
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = 0
+
+    def cursor(self) -> FakeCursor:
+        return self.cursor_class(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connection():
+    """The FakeConnection class, to make stand-in database connections with."""
+    return FakeConnection
+
+
+@pytest.fixture(scope="module")
+def odyssey_server():
+    server = OdysseyStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,163 @@
+import asyncio
+from datetime import date
+import threading
+import time
+
+import pytest
+
+import async_scrapers
+import config
+import parse_settings
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    """The stand-in portal doesn't need protecting."""
+    monkeypatch.setattr(config, "requests_per_second", 0)
+    monkeypatch.setattr(async_scrapers, "rate_limiters", {})
+
+
+def make_scraper(odyssey_server) -> async_scrapers.AsyncTravisScraper:
+    scraper = async_scrapers.AsyncTravisScraper()
+    scraper.homepage = odyssey_server.url + "/default.aspx"
+    return scraper
+
+
+async def run_with_scraper(odyssey_server, method: str, *args):
+    async with make_scraper(odyssey_server) as scraper:
+        return await getattr(scraper, method)(*args)
+
+
+class TestTokenBucket:
+    def test_limits_rate(self):
+        bucket = async_scrapers.TokenBucket(rate=20, capacity=1)
+
+        async def acquire_all():
+            await asyncio.gather(*[bucket.acquire() for _ in range(5)])
+
+        before = time.monotonic()
+        asyncio.run(acquire_all())
+        assert time.monotonic() - before >= 0.19
+
+    def test_no_limit(self):
+        bucket = async_scrapers.TokenBucket(rate=0)
+        asyncio.run(bucket.acquire())
+
+
+class TestAsyncScraper:
+    def test_fetch_parsed_case(self, odyssey_server):
+        case = asyncio.run(
+            run_with_scraper(odyssey_server, "fetch_parsed_case", "J1-CV-20-001590")
+        )
+        assert case.register_url.endswith("CaseID=2286743")
+        assert case.hearings[0].hearing_type == "Eviction Hearing"
+
+    def test_make_case_list(self, odyssey_server):
+        ids_to_parse = ["J1-CV-20-001590", "J1-CV-20-999999", "J1-CV-20-001590"]
+        cases = asyncio.run(
+            run_with_scraper(odyssey_server, "make_case_list", ids_to_parse)
+        )
+        assert [case.case_number for case in cases] == ["J1-CV-20-001590"] * 2
+
+    def test_make_case_list_loads_a_few_cases_at_once(self, monkeypatch):
+        monkeypatch.setattr(config, "max_sessions_per_host", 2)
+        scraper = async_scrapers.AsyncTravisScraper()
+        loading = []
+        most_loading = 0
+
+        async def fetch_parsed_case(case_id):
+            nonlocal most_loading
+            loading.append(case_id)
+            most_loading = max(most_loading, len(loading))
+            await asyncio.sleep(0.01)
+            loading.remove(case_id)
+            return None
+
+        scraper.fetch_parsed_case = fetch_parsed_case
+        assert asyncio.run(scraper.make_case_list([str(number) for number in range(6)])) == []
+        assert most_loading == 2
+
+    def test_fetch_filings(self, odyssey_server):
+        case_nums = asyncio.run(
+            run_with_scraper(
+                odyssey_server,
+                "fetch_filings",
+                date(2020, 6, 1),
+                date(2020, 6, 30),
+                "J1-CV-20*",
+            )
+        )
+        assert "J1-CV-20-001773" in case_nums
+
+    def test_found_case_loaded_from_its_link(self, odyssey_server):
+        async def fetch_found_case():
+            async with make_scraper(odyssey_server) as scraper:
+                await scraper.fetch_filings(date(2020, 6, 1), date(2020, 6, 30), "J1-CV-20*")
+                posts = len(odyssey_server.posts)
+                case = await scraper.fetch_parsed_case("J1-CV-20-001772")
+                return case, len(odyssey_server.posts) - posts
+
+        case, new_posts = asyncio.run(fetch_found_case())
+        assert case.status == "Active"
+        assert new_posts == 0
+
+    def test_make_setting_list(self, odyssey_server):
+        days_to_pull = [date(2015, 10, 21), date(2015, 10, 22), date(2015, 10, 23)]
+        posts = len(odyssey_server.posts)
+        settings = asyncio.run(
+            run_with_scraper(odyssey_server, "make_setting_list", days_to_pull)
+        )
+        case_numbers = [setting["case_number"] for setting in settings]
+        # the three days are asked for at once
+        assert case_numbers.count("J1-CV-20-002326") == 1
+        assert len(odyssey_server.posts) == posts + 1
+
+    def test_make_setting_list_one_day_at_a_time(self, odyssey_server, monkeypatch):
+        monkeypatch.setattr(config, "calendar_query_days", 1)
+        days_to_pull = [date(2015, 10, 21), date(2015, 10, 22), date(2015, 10, 23)]
+        settings = asyncio.run(
+            run_with_scraper(odyssey_server, "make_setting_list", days_to_pull)
+        )
+        case_numbers = [setting["case_number"] for setting in settings]
+        assert case_numbers.count("J1-CV-20-002326") == 3
+
+
+class TestAsyncBackend:
+    def test_parse_settings_uses_async_scraper(self, odyssey_server, monkeypatch):
+        class LocalScraper(async_scrapers.AsyncTravisScraper):
+            def __init__(self) -> None:
+                super().__init__()
+                self.homepage = odyssey_server.url + "/default.aspx"
+
+        monkeypatch.setattr(config, "scraper_backend", "async")
+        monkeypatch.setitem(async_scrapers.ASYNC_SCRAPER_NAMES, "travis", LocalScraper)
+        monkeypatch.setattr(
+            parse_settings.scrapers,
+            "get_scraper",
+            lambda *args, **kwargs: pytest.fail("should use the async scraper"),
+        )
+        pulled = []
+        settings = parse_settings.parse_settings(
+            date(2015, 10, 21), date(2015, 10, 23), "", on_settings=pulled.extend
+        )
+        assert any(setting["case_number"] == "J1-CV-20-002326" for setting in settings)
+        assert pulled == settings
+
+    def test_pages_parsed_off_the_event_loop(self, odyssey_server, monkeypatch):
+        loop_threads = []
+        parse_threads = []
+        parse_case_pages = async_scrapers.scrapers.parse_case_pages
+
+        def record_thread(*args):
+            parse_threads.append(threading.get_ident())
+            return parse_case_pages(*args)
+
+        async def fetch_case():
+            loop_threads.append(threading.get_ident())
+            return await run_with_scraper(
+                odyssey_server, "fetch_parsed_case", "J1-CV-20-001590"
+            )
+
+        monkeypatch.setattr(async_scrapers.scrapers, "parse_case_pages", record_thread)
+        assert asyncio.run(fetch_case()).case_number == "J1-CV-20-001590"
+        assert parse_threads and parse_threads[0] != loop_threads[0]
@@ -1,8 +1,10 @@
-from datetime import date
+from datetime import date, timedelta
+import sys
 
 import pytest
 
 import calendars
+import config
 import load_pages
 from scrapers import FakeScraper
 
@@ -26,3 +28,158 @@ class TestParseCalendar:
             )
         )
         assert queries[1].prefix == "J2-CV-2019*"
+
+
+class TestReadResultsTableRows:
+    def test_calendar_page_read_row_by_row(self):
+        page = load_pages.get_test_calendar_content()
+        assert calendars.top_level_tables(page) is not None
+        assert calendars.get_setting_list(page) == calendars.get_setting_list(
+            load_pages.get_test_calendar()
+        )
+
+    def test_commented_out_tables_skipped(self):
+        page = load_pages.get_test_calendar_content()
+        body_start = page.lower().index("<body")
+        decoys = (
+            "<!-- <table><tr><td>Judicial Officer</td></tr>"
+            "<tr><td>J1-CV-99-999999</td></tr></table> -->"
+            '<script>document.write("<table><tr><td>Judicial Officer</td></tr>");</script>'
+            '<div data-row="<tr>"></div>'
+        )
+        page = page[:body_start] + decoys + page[body_start:]
+        assert calendars.top_level_tables(page) is not None
+        assert calendars.get_setting_list(page) == calendars.get_setting_list(
+            load_pages.get_test_calendar()
+        )
+
+    def test_settings_are_yielded_as_read(self):
+        settings = calendars.iter_settings(load_pages.get_test_calendar_content())
+        assert next(settings)["case_number"] == "J1-CV-20-002326"
+
+    @pytest.mark.parametrize("index", [0, 1, 2])
+    def test_filings_page_read_from_content(self, index):
+        path = load_pages.get_test_html_path(index, "test_search_pages")
+        with open(path) as page_file:
+            page = page_file.read()
+        assert calendars.get_filing_case_nums(page) == calendars.get_filing_case_nums(
+            load_pages.get_test_search_page(index)
+        )
+
+    def test_unbalanced_rows_fall_back_to_parsing_tables(self):
+        page = "<table><tr><th>Filed/Location</th></tr><tr><td>J1-CV-20-1</td></table>"
+        assert calendars.top_level_tables(page) is None
+        assert calendars.get_filing_case_nums(page) == (["J1-CV-20-1"], False)
+
+    def test_page_without_results_table(self):
+        with pytest.raises(ValueError):
+            calendars.get_setting_list("<html><body><p>Error</p></body></html>")
+
+
+def settings_per_day(day: date) -> int:
+    return 5 if day.weekday() < 5 else 0
+
+
+class SimulatedCalendarScraper(FakeScraper):
+    """Lists `settings_per_day` settings for each day, capping results like the court website."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.page_cache = None
+        self.queries = []
+
+    def query_settings(self, afterdate, beforedate, calendar_link):
+        self.queries.append((afterdate, beforedate))
+        rows = []
+        for offset in range((beforedate - afterdate).days + 1):
+            day = afterdate + timedelta(days=offset)
+            for number in range(settings_per_day(day)):
+                cells = ["", f"J1-CV-{day.isoformat()}-{number}"] + [""] * 6
+                cells += [day.strftime("%m/%d/%Y"), "9:00 AM", "Eviction Hearing"]
+                rows.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+        if len(rows) > calendars.RESULT_CAP:
+            rows = ["<tr><td>The search returned too many matches to display.</td></tr>"]
+        return "<table><tr><td>Judicial Officer</td></tr>" + "".join(rows) + "</table>"
+
+
+class TestMultiDayCalendarQueries:
+    def test_consecutive_runs(self):
+        days = [date(2021, 3, 3), date(2021, 3, 1), date(2021, 3, 2), date(2021, 3, 9)]
+        assert list(calendars.consecutive_runs(days)) == [
+            (date(2021, 3, 1), date(2021, 3, 3)),
+            (date(2021, 3, 9), date(2021, 3, 9)),
+        ]
+
+    def test_resize_window(self):
+        assert calendars.resize_window(8, 10, False, 31) == 16
+        assert calendars.resize_window(8, 100, False, 31) == 8
+        assert calendars.resize_window(8, 170, False, 31) == 4
+        assert calendars.resize_window(1, 0, True, 31) == 1
+
+    def test_capped_calendar_page(self):
+        page = (
+            "<table><tr><td>Judicial Officer</td></tr>"
+            "<tr><td>The search returned too many matches to display.</td></tr></table>"
+        )
+        assert calendars.get_settings(page) == ([], True)
+
+    def test_fetch_settings_in_windows(self, caplog):
+        """A capped range is asked for again over fewer days, down to a single day."""
+        busy_day = date(2021, 3, 3)
+        queries = []
+
+        def fetch(afterdate, beforedate):
+            queries.append((afterdate, beforedate))
+            if afterdate <= busy_day <= beforedate:
+                return [], True
+            return [{"case_number": str(afterdate)}], False
+
+        days = [date(2021, 3, 1) + timedelta(days=offset) for offset in range(4)]
+        kept = []
+        settings = calendars.fetch_settings_in_windows(
+            days, fetch, 4, calendar_link="Court Calendar", on_settings=kept.append
+        )
+        assert queries == [
+            (date(2021, 3, 1), date(2021, 3, 4)),
+            (date(2021, 3, 1), date(2021, 3, 2)),
+            (date(2021, 3, 3), date(2021, 3, 4)),
+            (date(2021, 3, 3), date(2021, 3, 3)),
+            (date(2021, 3, 4), date(2021, 3, 4)),
+        ]
+        assert settings == [{"case_number": "2021-03-01"}, {"case_number": "2021-03-04"}]
+        assert kept == [[settings[0]], [], [settings[1]]]
+        assert "Court Calendar has too many settings on 2021-03-03" in caplog.text
+
+    def test_unique_settings(self):
+        setting = {"case_number": "J1-CV-20-1", "setting_date": "03/01/2021"}
+        other = dict(setting, setting_date="03/02/2021")
+        assert calendars.unique_settings([setting, other, dict(setting)]) == [setting, other]
+
+    def assert_every_setting_listed_once(self, scraper, days):
+        settings = scraper.make_setting_list(days)
+        assert len(settings) == sum(settings_per_day(day) for day in days)
+        assert len({setting["case_number"] for setting in settings}) == len(settings)
+        return scraper.queries
+
+    def test_days_queried_together(self):
+        days = [date(2021, 3, 1) + timedelta(days=offset) for offset in range(97)]
+        queries = self.assert_every_setting_listed_once(SimulatedCalendarScraper(), days)
+        assert len(queries) < len(days) / 10
+
+    def test_window_shrinks_on_busy_days(self, monkeypatch):
+        monkeypatch.setattr(
+            sys.modules[__name__],
+            "settings_per_day",
+            lambda day: 60 if day.weekday() < 5 else 0,
+        )
+        days = [date(2021, 3, 1) + timedelta(days=offset) for offset in range(97)]
+        queries = self.assert_every_setting_listed_once(SimulatedCalendarScraper(), days)
+        assert len(queries) < len(days)
+        assert max((beforedate - afterdate).days for afterdate, beforedate in queries) >= 30
+
+    def test_one_day_at_a_time(self, monkeypatch):
+        monkeypatch.setattr(config, "calendar_query_days", 1)
+        scraper = SimulatedCalendarScraper()
+        days = [date(2021, 3, 1), date(2021, 3, 2)]
+        assert len(scraper.make_setting_list(days)) == 10
+        assert scraper.queries == [(day, day) for day in days]
@@ -0,0 +1,160 @@
+import threading
+
+import pytest
+
+import case_pipeline
+from case_pipeline import CasePipeline
+import parse_filings
+import scrapers
+
+CASE_NUM = "J1-CV-20-001590"
+
+
+class CountingScraper(scrapers.FakeScraper):
+    """Counts the cases fetched by it and the sessions made from it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_cache = None
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def new_session(self):
+        session = super().new_session()
+        session.fetched = self.fetched
+        session.lock = self.lock
+        return session
+
+    def query_case_id(self, case_id):
+        with self.lock:
+            self.fetched.append(case_id)
+        if case_id == "missing":
+            return None
+        return super().query_case_id(CASE_NUM)
+
+
+class FilingsScraper(CountingScraper):
+    def get_all_case_nums(self, afterdate, beforedate):
+        return [CASE_NUM, CASE_NUM]
+
+
+class TestCasePipeline:
+    def test_batches(self):
+        items = case_pipeline.queue.Queue()
+        for item in list(range(5)) + [case_pipeline.DONE]:
+            items.put(item)
+        assert list(case_pipeline.batches(items, 2)) == [[0, 1], [2, 3], [4]]
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_saves_cases_in_batches(self, workers):
+        saved_batches = []
+        pipeline = CasePipeline(
+            CountingScraper(), save=saved_batches.append, workers=workers, batch_size=2
+        )
+        result = pipeline.run([CASE_NUM] * 5)
+        assert result.parsed == 5
+        assert [len(batch) for batch in saved_batches] == [2, 2, 1]
+        assert all(case.case_number == CASE_NUM for case in result.cases)
+        assert not result.failed_case_nums and not result.unsaved_case_nums
+
+    def test_failed_cases(self):
+        def save(batch):
+            raise ConnectionError("database is down")
+
+        pipeline = CasePipeline(CountingScraper(), save=save, batch_size=10)
+        result = pipeline.run([CASE_NUM, "missing", "J1-CV-20-000001"])
+        assert result.parsed == 2
+        assert result.failed_case_nums == ["missing"]
+        assert result.unsaved_case_nums == [CASE_NUM, CASE_NUM]
+
+    def test_save_returns_unsaved(self):
+        def save(batch):
+            return [case.case_number for case in batch[:1]]
+
+        pipeline = CasePipeline(CountingScraper(), save=save, batch_size=2)
+        result = pipeline.run([CASE_NUM] * 3)
+        assert result.parsed == 3
+        assert result.unsaved_case_nums == [CASE_NUM, CASE_NUM]
+
+    def test_cases_not_kept(self):
+        saved = []
+        pipeline = CasePipeline(
+            CountingScraper(), save=saved.extend, batch_size=2, keep_cases=False
+        )
+        result = pipeline.run([CASE_NUM] * 3)
+        assert result.cases == [] and result.parsed == 3
+        assert len(saved) == 3
+
+    def test_saving_overlaps_scraping(self):
+        """The first batch is saved before the last case is fetched, and slow saving holds fetching back."""
+        scraper = CountingScraper()
+        fetched_while_saving = []
+
+        def save(batch):
+            with scraper.lock:
+                fetched_while_saving.append(len(scraper.fetched))
+
+        pipeline = CasePipeline(scraper, save=save, batch_size=2, queue_size=2)
+        pipeline.run([CASE_NUM] * 20)
+        assert len(fetched_while_saving) == 10
+        # at most a batch, the two queues, the parser and the fetcher can be ahead of saving
+        assert fetched_while_saving[0] <= 2 + 2 + 2 + 1 + 1
+        assert fetched_while_saving[0] < 20
+
+    def test_stops_when_saving_is_interrupted(self):
+        def save(batch):
+            raise KeyboardInterrupt
+
+        scraper = CountingScraper()
+        pipeline = CasePipeline(scraper, save=save, batch_size=1, queue_size=1)
+        with pytest.raises(KeyboardInterrupt):
+            pipeline.run([CASE_NUM] * 50)
+        assert len(scraper.fetched) < 50
+
+
+class TestParseFilingsOnCloud:
+    def test_parse_filings(self):
+        cases = parse_filings.parse_filings_on_cloud(
+            afterdate=None,
+            beforedate=None,
+            get_old_active=False,
+            scraper=FilingsScraper(),
+        )
+        assert [case.case_number for case in cases] == [CASE_NUM]
+
+    def test_cases_not_kept(self):
+        cases = parse_filings.parse_filings_on_cloud(
+            afterdate=None,
+            beforedate=None,
+            get_old_active=False,
+            scraper=FilingsScraper(),
+            keep_cases=False,
+        )
+        assert cases == []
+
+    def test_fetchers_stop_when_parsing_stops(self, monkeypatch):
+        class ParserCrashed(BaseException):
+            pass
+
+        def parse_case_pages(case_num, pages, parser):
+            raise ParserCrashed
+
+        monkeypatch.setattr(case_pipeline.scrapers, "parse_case_pages", parse_case_pages)
+        scraper = CountingScraper()
+        pipeline = CasePipeline(scraper, workers=2, queue_size=1)
+        result = pipeline.run([CASE_NUM] * 50)
+        assert result.parsed == 0
+        assert len(scraper.fetched) < 50
+        assert sorted(result.failed_case_nums) == [CASE_NUM] * (50 - 1)
+
+    def test_fetchers_pass_on_pages_unparsed(self, monkeypatch):
+        fetched_pages = []
+        parse_case_pages = scrapers.parse_case_pages
+
+        def recording_parse_case_pages(case_num, pages, parser):
+            fetched_pages.append(pages)
+            return parse_case_pages(case_num, pages, parser)
+
+        monkeypatch.setattr(case_pipeline.scrapers, "parse_case_pages", recording_parse_case_pages)
+        CasePipeline(CountingScraper()).run([CASE_NUM])
+        assert [type(page) for page in fetched_pages[0]] == [str, str]
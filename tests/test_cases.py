@@ -0,0 +1,61 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from cases import CaseEvent, CaseRecord, EvictionCase
+import load_pages
+import persist
+
+
+def parsed_test_cases():
+    cases = []
+    for path in load_pages.get_test_register_paths():
+        parser = load_pages.get_test_parser_class(path)()
+        cases.append(
+            parser.make_parsed_case(
+                load_pages.load_soup_from_filepath(path),
+                status="Final Disposition",
+                type="Eviction",
+                register_url="https://example.com/CaseDetail.aspx?CaseID=1",
+            )
+        )
+    return cases
+
+
+TEST_CASES = parsed_test_cases()
+
+
+class TestCaseRecord:
+    def test_same_fields_as_model(self):
+        assert CaseRecord._fields == tuple(EvictionCase.__fields__)
+
+    @pytest.mark.parametrize("case", TEST_CASES)
+    def test_round_trip(self, case):
+        record = CaseRecord.from_model(case)
+        assert record.to_model() == case
+        assert CaseRecord.from_model(record.to_model()) == record
+
+    @pytest.mark.parametrize("case", TEST_CASES)
+    def test_same_json_as_model(self, case):
+        record = CaseRecord.from_model(case)
+        assert record.json() == case.json()
+        assert record.json(sort_keys=True) == case.json(sort_keys=True)
+
+    def test_json_of_events_and_amounts(self):
+        case = TEST_CASES[0].copy(
+            update={
+                "disposition_amount": Decimal("1234.50"),
+                "writ": CaseEvent(case_event_date=date(2021, 3, 1), served_subject="É"),
+                "register_url": None,
+            }
+        )
+        assert CaseRecord.from_model(case).json() == case.json()
+
+    @pytest.mark.parametrize("case", TEST_CASES)
+    def test_same_rows_as_model(self, case):
+        record = CaseRecord.from_model(case)
+        assert persist.case_detail_row(record) == persist.case_detail_row(case)
+        assert persist.disposition_row(record) == persist.disposition_row(case)
+        assert persist.event_rows(record) == persist.event_rows(case)
+
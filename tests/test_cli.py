@@ -1,7 +1,6 @@
 from datetime import date
 
 from scrapers import FakeScraper
-import parse_hearings
 import get_all_filings_settings_between_dates as filings_settings
 
 FAKE_SCRAPER = FakeScraper()
@@ -14,15 +13,11 @@ class TestCLI:
         assert cases[0].register_url.endswith("CaseID=2286743")
         assert cases[0].hearings[0].hearing_type == "Eviction Hearing"
 
-    def test_parse_cases_from_cli(self):
-        ids_to_parse = ["J1-CV-20-001590"]
-        cases = parse_hearings.parse_all_from_parse_filings(
-            case_nums=ids_to_parse,
-            showbrowser=False,
-            scraper=FAKE_SCRAPER,
-        )
-        assert cases[0].register_url.endswith("CaseID=2286743")
-        assert cases[0].hearings[0].hearing_type == "Eviction Hearing"
+    def test_make_case_list_with_workers(self):
+        ids_to_parse = ["J1-CV-20-001590"] * 3
+        cases = FAKE_SCRAPER.make_case_list(ids_to_parse, workers=2)
+        assert len(cases) == 3
+        assert all(case.case_number == "J1-CV-20-001590" for case in cases)
 
     def test_split_into_weeks(self):
         weeks = filings_settings.split_into_weeks(
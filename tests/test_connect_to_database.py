@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+import connect_to_database
+from connect_to_database import ConnectionPool
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def pool(opened, fake_connection):
+    def connect():
+        opened.append(fake_connection())
+        return opened[-1]
+
+    return ConnectionPool(connect, max_size=2, check_after=0)
+
+
+class TestConnectionPool:
+    def test_reuses_connection(self, pool, opened):
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert second is first
+        assert len(opened) == 1
+        assert first.commits == 2
+
+    def test_rolls_back_on_error(self, pool, opened):
+        with pytest.raises(ValueError):
+            with pool.connection():
+                raise ValueError("bad row")
+        assert opened[0].commits == 0
+        assert opened[0].rollbacks == 1
+        with pool.connection() as conn:
+            assert conn is opened[0]
+
+    def test_returned_on_keyboard_interrupt(self, pool, opened):
+        for _ in range(2):
+            with pytest.raises(KeyboardInterrupt):
+                with pool.connection():
+                    raise KeyboardInterrupt
+        assert all(conn.closed for conn in opened)
+        # every slot was given back, so the pool doesn't wait for connections that never return
+        borrowed = []
+        borrowing = threading.Thread(
+            target=lambda: borrowed.extend([pool.get(), pool.get()]), daemon=True
+        )
+        borrowing.start()
+        borrowing.join(timeout=1)
+        assert len(borrowed) == 2
+        assert not any(conn.closed for conn in borrowed)
+
+    def test_replaces_unhealthy_connection(self, pool, opened):
+        with pool.connection():
+            pass
+        opened[0].healthy = False
+        with pool.connection() as conn:
+            assert conn is not opened[0]
+        assert opened[0].closed
+
+    def test_waits_at_max_size(self, pool, opened):
+        first = pool.get()
+        pool.get()
+        borrowed = []
+        waiting = threading.Thread(target=lambda: borrowed.append(pool.get()))
+        waiting.start()
+        waiting.join(timeout=0.1)
+        assert not borrowed
+
+        pool.put(first)
+        waiting.join(timeout=1)
+        assert borrowed == [first]
+        assert len(opened) == 2
+
+    def test_close(self, pool, opened):
+        with pool.connection():
+            pass
+        pool.close()
+        assert opened[0].closed
+
+    def test_one_pool_per_database(self, monkeypatch):
+        monkeypatch.setattr(connect_to_database, "connection_pools", {})
+        pool = connect_to_database.get_connection_pool(local_dev=True)
+        assert connect_to_database.get_connection_pool(local_dev=True) is pool
+        assert connect_to_database.get_connection_pool(local_dev=False) is not pool
@@ -0,0 +1,153 @@
+import os
+import queue
+import threading
+
+import pytest
+
+import driver_pool
+from driver_pool import DriverPool
+import scrapers
+
+
+class FakeDriver:
+    """Stands in for a Chrome webdriver."""
+
+    def __init__(self) -> None:
+        self.urls = []
+        self.healthy = True
+        self.quit_called = False
+
+    def get(self, url: str) -> None:
+        self.urls.append(url)
+
+    def execute_script(self, script: str):
+        if not self.healthy:
+            raise ConnectionError("chrome not reachable")
+        return 1
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+@pytest.fixture
+def started():
+    return []
+
+
+@pytest.fixture
+def make_driver(started):
+    def make():
+        driver = FakeDriver()
+        started.append(driver)
+        return driver
+
+    return make
+
+
+class TestDriverPool:
+    def test_reuses_returned_driver(self, make_driver, started):
+        pool = DriverPool(size=2, make_driver=make_driver, max_memory_mb=0)
+        first = pool.borrow()
+        pool.give_back(first)
+        second = pool.borrow()
+        assert second is first
+        assert len(started) == 1
+
+    def test_warm_up(self, make_driver, started):
+        pool = DriverPool(size=2, make_driver=make_driver)
+        pool.warm_up()
+        assert len(started) == 2
+        pool.borrow()
+        pool.borrow()
+        assert len(started) == 2
+
+    def test_recycles_after_max_pages(self, make_driver, started):
+        pool = DriverPool(size=1, make_driver=make_driver, max_pages=2)
+        driver = pool.borrow()
+        driver.get("a")
+        driver.get("b")
+        pool.give_back(driver)
+        assert started[0].quit_called
+
+        replacement = pool.borrow()
+        assert replacement.driver is started[1]
+        assert replacement.pages_loaded == 0
+
+    def test_recycles_over_memory_ceiling(self, make_driver, started, monkeypatch):
+        monkeypatch.setattr(driver_pool.PooledDriver, "memory_mb", lambda self: 500)
+        pool = DriverPool(size=1, make_driver=make_driver, max_memory_mb=400)
+        pool.give_back(pool.borrow())
+        assert started[0].quit_called
+
+    def test_replaces_unhealthy_driver(self, make_driver, started):
+        pool = DriverPool(size=1, make_driver=make_driver, max_memory_mb=0)
+        pool.give_back(pool.borrow())
+        started[0].healthy = False
+        driver = pool.borrow()
+        assert started[0].quit_called
+        assert driver.driver is started[1]
+
+    def test_give_back_twice(self, make_driver, started):
+        pool = DriverPool(size=1, make_driver=make_driver, max_memory_mb=0)
+        driver = pool.borrow()
+        pool.give_back(driver)
+        pool.give_back(driver)
+        pool.borrow()
+        errors = []
+
+        def borrow_elsewhere():
+            try:
+                pool.borrow(timeout=0.01)
+            except queue.Empty as error:
+                errors.append(error)
+
+        # the driver was only put back once, so there's none left to lend
+        thread = threading.Thread(target=borrow_elsewhere)
+        thread.start()
+        thread.join()
+        assert len(errors) == 1
+
+    def test_borrowing_more_than_size_in_one_thread(self, make_driver, started):
+        pool = DriverPool(size=1, make_driver=make_driver, max_memory_mb=0)
+        first = pool.borrow()
+        with pytest.raises(RuntimeError):
+            pool.borrow()
+        pool.give_back(first)
+        assert pool.borrow() is first
+
+    def test_close(self, make_driver, started):
+        pool = DriverPool(size=2, make_driver=make_driver)
+        pool.borrow()
+        pool.give_back(pool.borrow())
+        pool.close()
+        assert all(driver.quit_called for driver in started)
+
+    @pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+    def test_process_tree_memory(self):
+        assert driver_pool.get_process_tree_memory_mb(os.getpid()) > 0
+
+
+class TestScraperWithDriverPool:
+    def test_scrapers_share_driver(self, make_driver, started):
+        pool = DriverPool(size=1, make_driver=make_driver, max_memory_mb=0)
+        for _ in range(3):
+            scraper = scrapers.TravisScraper(driver_pool=pool)
+            scraper.load_start_page()
+            scraper.close_driver()
+        assert len(started) == 1
+        assert len(started[0].urls) == 3
+
+    def test_more_sessions_than_drivers(self, make_driver, started):
+        """A scraper making a second session from a pool of one fails instead of hanging."""
+        pool = DriverPool(size=1, make_driver=make_driver, max_memory_mb=0)
+        scraper = scrapers.TravisScraper(driver_pool=pool)
+        with pytest.raises(RuntimeError):
+            scraper.new_session()
+        scraper.close_driver()
+
+        pool = DriverPool(size=2, make_driver=make_driver, max_memory_mb=0)
+        scraper = scrapers.TravisScraper(driver_pool=pool)
+        session = scraper.new_session()
+        assert session.driver is not scraper.driver
+        session.close_driver()
+        scraper.close_driver()
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+
+import pytest
+
+from calendars import Filing
+import filing_planner
+from filing_planner import FilingPlanner
+import scrapers
+
+PREFIX = "J1-CV-2021*"
+
+
+def filings_on(day: date, count: int):
+    return [Filing(f"J1-CV-21-{day.toordinal()}-{number}", day) for number in range(count)]
+
+
+def filed_per_day(day: date) -> int:
+    # busy weekdays, quiet weekends
+    return 40 if day.weekday() < 5 else 2
+
+
+class SimulatedScraper(scrapers.TravisScraper):
+    """Answers filing searches from `filed_per_day`, capping results like the court website."""
+
+    def start_driver(self, headless: bool = True) -> None:
+        self.driver = None
+
+    def close_driver(self):
+        pass
+
+    def calendar_queries(self, afterdate, beforedate):
+        return [scrapers.CalendarQuery(afterdate, beforedate, PREFIX)]
+
+    def query_filings(self, afterdate, beforedate, case_num_prefix):
+        rows = [
+            f"<tr><td>{filing.case_number}</td><td>A vs. B</td>"
+            f"<td>{filing.filed_date.strftime('%m/%d/%Y')} Precinct One</td><td>Eviction</td></tr>"
+            for day in filing_planner.days_between(afterdate, beforedate)
+            for filing in filings_on(day, filed_per_day(day))
+        ]
+        if len(rows) > filing_planner.FILING_SEARCH_CAP:
+            rows = ["<tr><td>The search returned too many matches to display.</td></tr>"]
+        return f"<table><tr><th>Case Number</th><th>Filed/Location</th></tr>{''.join(rows)}</table>"
+
+
+class TestFilingPlanner:
+    def test_split_prefix(self):
+        assert filing_planner.split_prefix("J1-CV-2021*") == ("J1-CV", 2021)
+        assert filing_planner.split_prefix("J1-CV-21") == ("J1-CV", 2021)
+        assert filing_planner.split_prefix("J1*") == ("J1", None)
+
+    def test_no_split_without_history(self):
+        planner = FilingPlanner()
+        assert planner.plan(PREFIX, date(2021, 3, 1), date(2021, 3, 31)) == [
+            (date(2021, 3, 1), date(2021, 3, 31))
+        ]
+
+    def test_windows_stay_under_target(self):
+        planner = FilingPlanner(target=100)
+        week = (date(2021, 3, 1), date(2021, 3, 7))
+        planner.record(PREFIX, *week, filings_on(date(2021, 3, 1), 30), capped=False)
+        windows = planner.plan(PREFIX, date(2021, 3, 1), date(2021, 3, 31))
+        # 30 filings on each Monday, so three Mondays to a window
+        assert windows[0] == (date(2021, 3, 1), date(2021, 3, 21))
+        assert windows[-1][1] == date(2021, 3, 31)
+        for (_, end), (next_start, _) in zip(windows, windows[1:]):
+            assert next_start == end + timedelta(days=1)
+        for start, end in windows:
+            predicted = planner.predicted_filings(PREFIX, start, end)
+            assert sum(predicted) <= 100 or start == end
+
+    def test_days_outside_prefix_year_ignored(self):
+        planner = FilingPlanner()
+        planner.record(
+            PREFIX, date(2020, 12, 30), date(2021, 1, 2), filings_on(date(2021, 1, 1), 5), capped=False
+        )
+        assert planner.counts["J1-CV"] == {
+            date(2021, 1, 1): 5,
+            date(2021, 1, 2): 0,
+        }
+        assert planner.predicted_filings(PREFIX, date(2020, 12, 31), date(2021, 1, 1)) == [0, 5]
+
+    def test_capped_searches_not_learned_from(self):
+        planner = FilingPlanner()
+        planner.record(PREFIX, date(2021, 3, 1), date(2021, 3, 31), [], capped=True)
+        assert planner.counts == {} and planner.capped_queries == 1
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / "density.json")
+        planner = FilingPlanner(path)
+        planner.record(PREFIX, date(2021, 3, 1), date(2021, 3, 1), filings_on(date(2021, 3, 1), 3), capped=False)
+        planner.save()
+        assert FilingPlanner(path).counts == {"J1-CV": {date(2021, 3, 1): 3}}
+
+
+class TestPlannedFilingSearches:
+    @pytest.fixture
+    def scraper(self):
+        scraper = SimulatedScraper()
+        scraper.filing_planner = FilingPlanner(target=150)
+        return scraper
+
+    def test_learning_avoids_capped_searches(self, scraper):
+        month = (date(2021, 3, 1), date(2021, 3, 31))
+        expected = sum(filed_per_day(day) for day in filing_planner.days_between(*month))
+
+        assert len(scraper.get_all_case_nums(*month)) == expected
+        capped_by_halving = scraper.filing_planner.capped_queries
+        assert capped_by_halving > 0
+
+        # the next month is planned from what was seen in this one
+        next_month = (date(2021, 4, 1), date(2021, 4, 30))
+        before = scraper.filing_planner.capped_queries
+        case_nums = scraper.get_all_case_nums(*next_month)
+        assert len(case_nums) == sum(
+            filed_per_day(day) for day in filing_planner.days_between(*next_month)
+        )
+        assert scraper.filing_planner.capped_queries == before
+        assert "planning avoided about" in scraper.filing_planner.summary()
+
+    def test_misprediction_falls_back_to_splitting(self, scraper):
+        week = (date(2021, 3, 6), date(2021, 3, 12))
+        # a quiet week seen before makes the next busy month look like one search's worth
+        scraper.filing_planner.record(
+            PREFIX, *week, filings_on(date(2021, 3, 8), 1), capped=False
+        )
+        month = (date(2021, 3, 13), date(2021, 4, 12))
+        assert scraper.filing_planner.plan(PREFIX, *month) == [month]
+        case_nums = scraper.get_all_case_nums(*month)
+        assert len(case_nums) == sum(filed_per_day(day) for day in filing_planner.days_between(*month))
+        assert scraper.filing_planner.capped_queries > 0
+
+    def test_capped_single_day(self, scraper, monkeypatch):
+        monkeypatch.setattr(filing_planner, "FILING_SEARCH_CAP", 10)
+        day = date(2021, 3, 1)
+        assert scraper.fetch_filings(day, day, PREFIX) == []
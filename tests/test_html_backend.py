@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+import config
+import html_backend
+
+readers = html_backend.fixture_readers()
+
+
+@pytest.mark.parametrize(
+    "path", list(readers), ids=[os.path.basename(path) for path in readers]
+)
+@pytest.mark.parametrize("html_parser", html_backend.HTML_PARSERS[1:])
+def test_parsers_read_fixtures_the_same(path, html_parser):
+    if html_parser not in html_backend.available_html_parsers():
+        pytest.skip(f"{html_parser} is not installed")
+    reader = readers[path]
+    assert html_backend.read_fixture(path, html_parser, reader) == (
+        html_backend.read_fixture(path, "html.parser", reader)
+    )
+
+
+@pytest.mark.parametrize("html_parser", html_backend.HTML_PARSERS)
+def test_make_soup_uses_configured_parser(monkeypatch, html_parser):
+    if html_parser not in html_backend.available_html_parsers():
+        pytest.skip(f"{html_parser} is not installed")
+    monkeypatch.setattr(config, "html_parser", html_parser)
+    assert html_backend.make_soup("<p>x</p>").builder.NAME == html_parser
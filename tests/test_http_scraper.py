@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+from html_backend import make_soup
+import scrapers
+
+
+@pytest.fixture
+def scraper(odyssey_server):
+    scraper = scrapers.TravisHTTPScraper()
+    scraper.homepage = odyssey_server.url + "/default.aspx"
+    return scraper
+
+
+class TestHTTPScraper:
+    def test_query_case_id(self, scraper):
+        search_page, register_page = scraper.query_case_id("J1-CV-20-001590")
+        assert "J1-CV-20-001590" in search_page
+        assert make_soup(register_page).div.text == "Register of Actions"
+
+    def test_query_unknown_case_id(self, scraper):
+        assert scraper.query_case_id("J1-CV-20-999999") is None
+
+    def test_make_case_list(self, scraper):
+        cases = scraper.make_case_list(["J1-CV-20-001590"])
+        assert cases[0].register_url.endswith("CaseID=2286743")
+        assert cases[0].hearings[0].hearing_type == "Eviction Hearing"
+
+    def test_make_case_list_with_workers(self, scraper):
+        ids_to_parse = ["J1-CV-20-001590", "J1-CV-20-999999", "J1-CV-20-001590"]
+        cases = scraper.make_case_list(ids_to_parse, workers=3)
+        assert [case.case_number for case in cases] == ["J1-CV-20-001590", "J1-CV-20-001590"]
+
+    def test_keeps_session_and_viewstate(self, scraper, odyssey_server):
+        for _ in range(3):
+            assert scraper.query_case_id("J1-CV-20-001590") is not None
+        session_cookie = scraper.session.cookies.get("ASP.NET_SessionId")
+        last_viewstate = odyssey_server.posts[-1]["__VIEWSTATE"]
+        assert odyssey_server.viewstates[session_cookie] == last_viewstate
+
+    def test_make_setting_list(self, scraper, odyssey_server):
+        settings = scraper.make_setting_list(days_to_pull=[date(2015, 10, 21)])
+        assert any(case["case_number"] == "J1-CV-20-002326" for case in settings)
+
+        form = odyssey_server.posts[-1]
+        assert form["DateSettingOnAfter"] == "10/21/2015"
+        assert "chkDtRangeCivil" in form
+        assert "chkDtRangeProbate" not in form
+
+    def test_fetch_filings(self, scraper, odyssey_server):
+        case_nums = scraper.fetch_filings(
+            afterdate=date(2020, 6, 1),
+            beforedate=date(2020, 6, 30),
+            case_num_prefix="J1-CV-20*",
+        )
+        assert "J1-CV-20-001773" in case_nums
+        assert odyssey_server.posts[-1]["CaseSearchValue"] == "J1-CV-20*"
+        assert odyssey_server.posts[-1]["DateFiledOnBefore"] == "6/30/2020"
+
+    def test_found_case_loaded_from_its_link(self, scraper, odyssey_server):
+        scraper.fetch_filings(date(2020, 6, 1), date(2020, 6, 30), "J1-CV-20*")
+        posts = len(odyssey_server.posts)
+        case = scraper.fetch_parsed_case("J1-CV-20-001772")
+        assert case.status == "Active"
+        assert case.register_url.endswith("CaseID=2288519")
+        assert len(odyssey_server.posts) == posts
+        assert ("GET", "/CaseDetail.aspx?CaseID=2288519") in odyssey_server.requests
+
+    def test_found_case_searched_for_if_link_fails(self, scraper, odyssey_server):
+        scraper.fetch_filings(date(2020, 6, 1), date(2020, 6, 30), "J1-CV-20*")
+        assert scraper.fetch_parsed_case("J1-CV-20-001773") is None
+        assert odyssey_server.posts[-1]["CaseSearchValue"] == "J1-CV-20-001773"
+        assert "J1-CV-20-001773" not in scraper.search_results
+
+    def test_skips_homepage_after_first_query(self, scraper, odyssey_server):
+        scraper.query_case_id("J1-CV-20-001590")
+        homepage_visits = odyssey_server.requests.count(("GET", "/default.aspx"))
+        assert scraper.query_case_id("J1-CV-20-001590") is not None
+        assert odyssey_server.requests.count(("GET", "/default.aspx")) == homepage_visits
+        assert scraper.navigations_saved == 1
+
+    def test_starts_over_when_session_expires(self, scraper, odyssey_server):
+        scraper.query_case_id("J1-CV-20-001590")
+        odyssey_server.viewstates.clear()
+        scraper.session.cookies.clear()
+        assert scraper.query_case_id("J1-CV-20-001590") is not None
+        assert scraper.navigations_saved == 0
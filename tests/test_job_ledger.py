@@ -0,0 +1,117 @@
+from datetime import date
+
+import pytest
+
+import get_all_filings_settings_between_dates as filings_settings
+from job_ledger import DONE, FAILED, RUNNING, JobLedger, JobUnit
+
+UNIT = JobUnit("travis", date(2021, 3, 1), date(2021, 3, 7), "filings")
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return JobLedger(str(tmp_path / "ledger.sqlite3"))
+
+
+class TestJobLedger:
+    def test_records_attempts(self, ledger):
+        assert ledger.get(UNIT) is None
+        ledger.start(UNIT)
+        assert ledger.get(UNIT).status == RUNNING
+        ledger.fail(UNIT, "TimeoutError()")
+        ledger.start(UNIT)
+        ledger.finish(UNIT)
+
+        record = ledger.get(UNIT)
+        assert record.status == DONE and record.attempts == 2 and record.error == ""
+        assert record.finished_at >= record.started_at
+        assert ledger.is_done(UNIT)
+
+    def test_unit_left_running_is_not_done(self, ledger):
+        ledger.start(UNIT)
+        assert not JobLedger(ledger.path).is_done(UNIT)
+
+    def test_summary(self, ledger):
+        ledger.start(UNIT)
+        ledger.finish(UNIT)
+        other = UNIT._replace(stage="settings")
+        ledger.start(other)
+        ledger.fail(other, "ValueError()")
+        assert ledger.summary("travis") == "1 done, 1 failed"
+        assert ledger.summary("williamson") == "nothing recorded"
+
+
+class TestResumableRun:
+    def test_rerun_only_retries_unfinished_units(self, ledger, monkeypatch):
+        calls = []
+        broken = {(date(2021, 3, 8), "settings")}
+
+        def parse_stage(stage, start, end, scraper):
+            calls.append((start, stage))
+            if (start, stage) in broken:
+                raise ValueError("calendar wouldn't load")
+            return []
+
+        monkeypatch.setattr(filings_settings, "parse_stage", parse_stage)
+        monkeypatch.setattr(filings_settings, "send_email", lambda *args: None)
+
+        failures = filings_settings.get_all_filings_settings_between_dates(
+            date(2021, 3, 1), date(2021, 3, 14), "test", ledger=ledger
+        )
+        assert failures == ["2021-03-08, 2021-03-14"]
+        assert len(calls) == 3 + 5
+        failed = ledger.get(JobUnit("test", date(2021, 3, 8), date(2021, 3, 14), "settings"))
+        assert failed.status == FAILED and failed.attempts == 5
+
+        calls.clear()
+        broken.clear()
+        failures = filings_settings.get_all_filings_settings_between_dates(
+            date(2021, 3, 1), date(2021, 3, 14), "test", ledger=ledger
+        )
+        assert failures == []
+        assert calls == [(date(2021, 3, 8), "settings")]
+        assert ledger.summary("test") == "4 done"
+
+    def test_week_with_failed_cases_is_not_done(self, ledger, monkeypatch):
+        def parse_stage(stage, start, end, scraper):
+            return ["J1-CV-21-000001"] if stage == "filings" else []
+
+        monkeypatch.setattr(filings_settings, "parse_stage", parse_stage)
+        monkeypatch.setattr(filings_settings, "send_email", lambda *args: None)
+
+        failures = filings_settings.get_all_filings_settings_between_dates(
+            date(2021, 3, 1), date(2021, 3, 7), "test", ledger=ledger
+        )
+        assert failures == ["2021-03-01, 2021-03-07"]
+        failed = ledger.get(JobUnit("test", date(2021, 3, 1), date(2021, 3, 7), "filings"))
+        assert failed.status == FAILED and failed.attempts == 1
+        assert "J1-CV-21-000001" in failed.error
+        assert ledger.summary("test") == "1 done, 1 failed"
+
+
+class TestParallelRun:
+    def test_weeks_parsed_in_worker_processes(self, ledger, monkeypatch):
+        monkeypatch.setattr(filings_settings, "send_email", lambda *args: None)
+        weeks = (date(2015, 10, 21), date(2015, 11, 3))
+        failures = filings_settings.get_all_filings_settings_between_dates(
+            *weeks, "test", ledger=ledger, parallel=2
+        )
+        assert failures == []
+        assert ledger.summary("test") == "4 done"
+        assert {record.unit.week_start for record in ledger.records()} == {
+            date(2015, 10, 21),
+            date(2015, 10, 28),
+        }
+
+    def test_workers_capped_per_county(self, ledger, monkeypatch):
+        monkeypatch.setattr(filings_settings.config, "max_sessions_per_host", 1)
+        monkeypatch.setattr(
+            filings_settings,
+            "ProcessPoolExecutor",
+            lambda *args, **kwargs: pytest.fail("should parse in this process"),
+        )
+        monkeypatch.setattr(filings_settings, "send_email", lambda *args: None)
+        failures = filings_settings.get_all_filings_settings_between_dates(
+            date(2015, 10, 21), date(2015, 10, 21), "test", ledger=ledger, parallel=4
+        )
+        assert failures == []
@@ -0,0 +1,94 @@
+from datetime import date
+import io
+import json
+
+from click.testing import CliRunner
+
+from json_lines import JSONLinesWriter
+import parse_hearings
+import parse_settings
+from scrapers import FakeScraper
+
+CASE_NUM = "J1-CV-20-001590"
+
+
+class CountingFile(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+class TestJSONLinesWriter:
+    def test_flushes_every_few_lines(self):
+        outfile = CountingFile()
+        writer = JSONLinesWriter(outfile, flush_lines=2, flush_seconds=60)
+        for number in range(5):
+            writer.write_setting({"case_number": str(number)})
+        assert outfile.flushes == 2
+        assert [json.loads(line) for line in outfile.getvalue().splitlines()] == [
+            {"case_number": str(number)} for number in range(5)
+        ]
+
+    def test_flushes_after_a_while(self):
+        outfile = CountingFile()
+        writer = JSONLinesWriter(outfile, flush_lines=100, flush_seconds=0)
+        writer.write_line("{}")
+        assert outfile.flushes == 1
+
+
+class TestStreamingOutfiles:
+    def test_parse_hearings(self, tmp_path):
+        infile = tmp_path / "case_nums.csv"
+        infile.write_text(f"{CASE_NUM}\n{CASE_NUM}\n")
+        outfile = tmp_path / "cases.jsonl"
+        result = CliRunner().invoke(
+            parse_hearings.parse_all,
+            ["--infile", str(infile), "--outfile", str(outfile), "--county", "test", "--no-db"],
+        )
+        assert result.exit_code == 0, result.output
+        lines = outfile.read_text().splitlines()
+        assert [json.loads(line)["case_number"] for line in lines] == [CASE_NUM, CASE_NUM]
+
+    def test_parse_settings(self):
+        outfile = io.StringIO()
+        parse_settings._parse_and_persist_settings(
+            date(2015, 10, 21),
+            date(2015, 10, 21),
+            outfile=outfile,
+            db=False,
+            gs=False,
+            county="test",
+        )
+        settings = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        assert settings and all("case_number" in setting for setting in settings)
+
+    def test_parse_settings_written_as_pulled(self, monkeypatch):
+        """Each calendar's settings are written before the next calendar is queried."""
+        outfile = io.StringIO()
+        lines_before_query = []
+        query_settings = FakeScraper.query_settings
+
+        def counting_query_settings(scraper, afterdate, beforedate, calendar_link):
+            lines_before_query.append(len(outfile.getvalue().splitlines()))
+            return query_settings(scraper, afterdate, beforedate, calendar_link)
+
+        scraper = FakeScraper()
+        scraper.page_cache = None
+        scraper.calendar_link_names = ["Court Calendar"] * 2
+        monkeypatch.setattr(FakeScraper, "query_settings", counting_query_settings)
+        monkeypatch.setattr(parse_settings.scrapers, "get_scraper", lambda *args, **kwargs: scraper)
+        settings = parse_settings._parse_and_persist_settings(
+            date(2015, 10, 21),
+            date(2015, 10, 21),
+            outfile=outfile,
+            db=False,
+            gs=False,
+            county="test",
+        )
+        assert lines_before_query == [0, len(settings)]
+        # the second calendar's repeats of the first one's settings aren't written again
+        assert len(outfile.getvalue().splitlines()) == len(settings)
@@ -0,0 +1,61 @@
+import itertools
+
+from click.testing import CliRunner
+from fuzzywuzzy import fuzz
+import pytest
+
+import name_matching
+from name_matching import NameMatcher
+
+NAMES = [
+    ("WREN A TER, ET AL", "PROPER TEA LLC", "TER, WREN A; TER, WREN B; TER, WREN C"),
+    ("LAND LORDE, DBA LORDE", "LAND LORDE, DBA LORDE", "ANT, TEN"),
+    ("LES SEE", "LESS SORE LLC", "SEE, LES"),
+    ("", "XYZ GROUP LLC", "DOE, JOHN G."),
+    ("O'OREGON , EVE", "FAKE NAME, UNLIKELY", "JONES, ALICE; O'OREGON, EVE"),
+]
+
+
+class TestNameMatcher:
+    @pytest.mark.parametrize("scorer", name_matching.SCORERS.values())
+    @pytest.mark.parametrize("names", NAMES)
+    def test_same_scores_as_pair_by_pair(self, scorer, names):
+        matcher = NameMatcher(scorer=scorer)
+        assert matcher.match_wordwise(*names) == (
+            name_matching.match_wordwise_pair_by_pair(*names)
+        )
+
+    def test_levenshtein_scorer_agrees_with_fuzzywuzzy(self):
+        words = ["", ",", "LES", "LESS", "SEE", "LORDE", "LANDLORDE", "O'OREGON", "TEA"]
+        pairs = list(itertools.product(words, words))
+        assert name_matching.levenshtein_scorer(pairs) == [
+            fuzz.partial_ratio(word, other_word) for word, other_word in pairs
+        ]
+
+    def test_only_unscored_pairs_sent_to_scorer(self):
+        batches = []
+
+        def scorer(pairs):
+            batches.append(sorted(pairs))
+            return name_matching.fuzzywuzzy_scorer(pairs)
+
+        matcher = NameMatcher(scorer=scorer)
+        matcher.match_wordwise("LES SEE", "LESS SORE", "SEE, LES")
+        matcher.match_wordwise("LES SEE", "LESS SORE", "SEE, LES")
+        matcher.match_wordwise("LES", "LESS", "TEN")
+        assert len(batches) == 2
+        assert len(batches[0]) == len(set(batches[0])) == 8
+        assert batches[1] == [("LES", "TEN")]
+
+    def test_cache_is_bounded(self):
+        matcher = NameMatcher(cache_size=2)
+        matcher.match_wordwise("A", "B C", "D")
+        assert len(matcher.scores) == 2
+        matcher.match_wordwise("A", "B", "B")
+        assert ("A", "B") in matcher.scores and len(matcher.scores) == 2
+
+
+def test_compare_name_matchers():
+    result = CliRunner().invoke(name_matching.compare_name_matchers, ["--repeat", "1"])
+    assert result.exit_code == 0, result.output
+    assert "differently" not in result.output
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+import os
+
+import pytest
+
+import page_cache
+from page_cache import PageCache
+import scrapers
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path))
+
+
+class TestPageCache:
+    def test_put_and_get(self, cache):
+        cache.put("travis/case/1", ["<p>result</p>", "<p>register</p>"], timedelta(hours=1))
+        assert cache.get("travis/case/1") == ["<p>result</p>", "<p>register</p>"]
+        assert cache.get("travis/case/2") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_identical_pages_stored_once(self, cache, tmp_path):
+        cache.put("travis/case/1", ["<p>same</p>"], timedelta(hours=1))
+        cache.put("hays/case/1", ["<p>same</p>"], timedelta(hours=1))
+        stored = [files for _, _, files in os.walk(tmp_path / "objects") if files]
+        assert len(stored) == 1 and len(stored[0]) == 1
+
+    def test_stale_entry(self, cache):
+        cache.put("travis/case/1", ["<p>old</p>"], timedelta(0))
+        assert cache.get("travis/case/1") is None
+        assert cache.get("travis/case/1", include_stale=True) == ["<p>old</p>"]
+
+    def test_case_ttl_depends_on_status(self):
+        assert page_cache.case_ttl("Final Disposition") > page_cache.case_ttl(
+            "Hearing Set"
+        )
+        assert page_cache.case_ttl("not a real status") == timedelta(0)
+
+    def test_calendar_ttl(self):
+        last_week = date.today() - timedelta(days=7)
+        next_week = date.today() + timedelta(days=7)
+        assert page_cache.calendar_ttl(last_week) > page_cache.calendar_ttl(next_week)
+
+
+class TestScraperWithPageCache:
+    @pytest.fixture
+    def scraper(self, odyssey_server, cache):
+        scraper = scrapers.TravisHTTPScraper()
+        scraper.homepage = odyssey_server.url + "/default.aspx"
+        scraper.page_cache = cache
+        return scraper
+
+    def test_case_pages_reused(self, scraper, odyssey_server):
+        first = scraper.fetch_parsed_case("J1-CV-20-001590")
+        register_requests = odyssey_server.requests.count(
+            ("GET", "/CaseDetail.aspx?CaseID=2286743")
+        )
+        second = scraper.fetch_parsed_case("J1-CV-20-001590")
+        assert second == first
+        assert (
+            odyssey_server.requests.count(("GET", "/CaseDetail.aspx?CaseID=2286743"))
+            == register_requests
+        )
+
+    def test_calendar_pages_reused(self, scraper, odyssey_server):
+        first = scraper.make_setting_list([date(2015, 10, 21)])
+        posts = len(odyssey_server.posts)
+        assert scraper.make_setting_list([date(2015, 10, 21)]) == first
+        assert len(odyssey_server.posts) == posts
@@ -0,0 +1,59 @@
+import json
+
+from click.testing import CliRunner
+
+import hearing
+import parser_benchmarks
+from parser_benchmarks import BenchmarkResult
+
+
+class TestParserBenchmarks:
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 21)]
+        assert parser_benchmarks.percentile(values, 0.5) == 10
+        assert parser_benchmarks.percentile(values, 0.95) == 19
+        assert parser_benchmarks.percentile([3.0], 0.95) == 3
+
+    def test_soup_getters(self):
+        getters = parser_benchmarks.soup_getters(hearing.HaysParser)
+        assert "get_defendant_race" in getters
+        assert "get_disposition_type" not in getters
+        assert "get_index" not in getters
+
+    def test_every_test_page_benchmarked(self):
+        benchmarks = parser_benchmarks.all_benchmarks()
+        assert len(benchmarks["WilliamsonParser.make_parsed_case"]) == 3
+        assert "calendars.get_setting_list" in benchmarks
+
+    def test_compare_to_baseline(self):
+        results = [
+            BenchmarkResult("fast", 1, 1.0, 1.0, 1.0, 1),
+            BenchmarkResult("slow", 1, 2.0, 2.0, 1.0, 1),
+            BenchmarkResult("new", 1, 2.0, 2.0, 1.0, 1),
+        ]
+        baseline = {"fast": {"p50_ms": 1.0}, "slow": {"p50_ms": 1.0}}
+        regressions = parser_benchmarks.compare_to_baseline(results, baseline, 1.25)
+        assert len(regressions) == 1 and regressions[0].startswith("slow is 2.0x")
+
+    def test_save_and_compare_baseline(self, tmp_path):
+        baseline_path = str(tmp_path / "benchmarks.json")
+        runner = CliRunner()
+        arguments = ["--repeat", "1", "--only", "get_case_number"]
+
+        saved = runner.invoke(
+            parser_benchmarks.benchmark_parsers, arguments + ["--save-baseline", baseline_path]
+        )
+        assert saved.exit_code == 0, saved.output
+        with open(baseline_path) as baseline_file:
+            assert set(json.load(baseline_file)) == {
+                "BaseParser.get_case_number",
+                "HaysParser.get_case_number",
+                "WilliamsonParser.get_case_number",
+            }
+
+        compared = runner.invoke(
+            parser_benchmarks.benchmark_parsers,
+            arguments + ["--baseline", baseline_path, "--tolerance", "1000"],
+        )
+        assert compared.exit_code == 0, compared.output
+        assert "vs base" in compared.output
@@ -770,3 +770,28 @@ class TestParseHTML:
         parsed_case = TravisParser.make_parsed_case(soup=soup)
         assert parsed_case.plaintiff == plaintiff
         assert parsed_case.disposition_date == disposition_date
+
+
+class TestRegisterIndex:
+    def test_indexes_page_once(self):
+        parser = BaseParser()
+        soup = load_pages.get_test_soup(0)
+        index = parser.get_index(soup)
+        assert parser.get_index(soup) is index
+        assert len(index.tables) == len(soup.find_all("table"))
+
+        other_soup = load_pages.get_test_soup(1)
+        assert parser.get_index(other_soup) is not index
+
+    def test_parts_of_page_not_kept(self):
+        parser = BaseParser()
+        soup = load_pages.get_test_soup(0)
+        index = parser.get_index(soup)
+        parser.get_disposition_date(parser.get_disposition_tr_element(soup))
+        assert parser.get_index(soup) is index
+
+    def test_elements_not_shared_with_caller(self):
+        parser = BaseParser()
+        soup = load_pages.get_test_soup(0)
+        parser.get_defendant_elements(soup).pop()
+        assert len(parser.get_defendant_elements(soup)) == 1
@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+import csv
+import datetime
+import io
+
+import pytest
+
+import calendars
+import load_pages
+import persist
+import scrapers
+
+
+@pytest.fixture
+def connections(monkeypatch, fake_connection):
+    opened = []
+
+    @contextmanager
+    def database_connection(local_dev=True):
+        opened.append(fake_connection())
+        yield opened[-1]
+        opened[-1].commit()
+
+    monkeypatch.setattr(persist, "database_connection", database_connection)
+    return opened
+
+
+@pytest.fixture
+def upserts(monkeypatch):
+    """Records the rows sent by execute_values, failing for any case numbered 'bad'."""
+    sent = []
+
+    def execute_values(curs, statement, rows):
+        if any(row[0] == "bad" for row in rows):
+            raise ValueError("bad row")
+        sent.append((statement.split()[2], rows))
+
+    monkeypatch.setattr(persist, "execute_values", execute_values)
+    return sent
+
+
+@pytest.fixture
+def case():
+    return scrapers.FakeScraper().fetch_parsed_case("J1-CV-20-001590")
+
+
+class TestRestCases:
+    def test_one_connection_for_all_cases(self, connections, upserts, case):
+        other_case = case.copy(update={"case_number": "J1-CV-20-000001"})
+        assert persist.rest_cases([case, other_case, case]) == []
+        assert len(connections) == 1
+        assert connections[0].commits == 1
+
+        tables = [table for table, _ in upserts]
+        assert tables == ["CASE_DETAIL", "DISPOSITION", "EVENT"]
+        case_detail_rows = upserts[0][1]
+        assert [row[0] for row in case_detail_rows] == [
+            "J1-CV-20-001590",
+            "J1-CV-20-000001",
+        ]
+        assert len(upserts[2][1]) == 2 * len(case.hearings)
+
+    def test_reports_failed_cases(self, connections, upserts, case):
+        bad_case = case.copy(update={"case_number": "bad"})
+        assert persist.rest_cases([case, bad_case]) == ["bad"]
+        assert "ROLLBACK TO SAVEPOINT rest_case" in connections[0].statements
+        saved = [rows[0][0] for table, rows in upserts if table == "CASE_DETAIL"]
+        assert saved == ["J1-CV-20-001590"]
+
+
+class TestRestSettings:
+    @pytest.fixture
+    def settings(self):
+        return calendars.get_setting_list(load_pages.get_test_calendar())
+
+    def test_copies_unique_settings_at_once(
+        self, connections, monkeypatch, settings, fake_connection
+    ):
+        copied = []
+
+        def copy_expert(self, statement, rows):
+            copied.append(rows.read())
+
+        monkeypatch.setattr(
+            fake_connection.cursor_class, "copy_expert", copy_expert, raising=False
+        )
+        monkeypatch.setattr(fake_connection.cursor_class, "rowcount", 2)
+
+        counts = persist.rest_settings(settings + settings[:3])
+        assert len(connections) == 1
+        assert counts == persist.SettingCounts(
+            inserted=2, skipped=len(settings) + 3 - 2
+        )
+
+        rows = list(csv.reader(io.StringIO(copied[0])))
+        assert len(rows) == len({persist.setting_key(setting) for setting in settings})
+        assert rows[0] == [settings[0][column] for column in persist.SETTING_COLUMNS]
+        assert any(
+            statement.strip().startswith("INSERT INTO SETTING")
+            for statement in connections[0].statements
+        )
+
+
+class TestGetOldActiveCaseNums:
+    def test_case_check_only_needed_for_incremental_runs(self, connections):
+        persist.get_old_active_case_nums()
+        assert "CASE_CHECK" not in connections[0].statements[0]
+
+        persist.get_old_active_case_nums(due_by=datetime.date(2021, 1, 1))
+        assert "CASE_CHECK.NEXT_CHECK" in connections[1].statements[0]
+
+
+class TestRecordCaseChecks:
+    def test_one_statement_for_all_checks(self, connections, upserts):
+        day = datetime.date(2021, 3, 1)
+        checks = [
+            ("J1-CV-20-000001", "hash1", day, day, day),
+            ("J1-CV-20-000002", "hash2", day, day, day),
+        ]
+        persist.record_case_checks(checks)
+        assert upserts == [("CASE_CHECK", checks)]
+        assert len(connections) == 1 and connections[0].commits == 1
+
+    def test_no_checks(self, connections, upserts):
+        persist.record_case_checks([])
+        assert connections == [] and upserts == []
@@ -0,0 +1,127 @@
+from datetime import timedelta
+import json
+import tarfile
+
+from click.testing import CliRunner
+import pytest
+
+import load_pages
+from page_cache import PageCache, case_key
+import reparse
+import scrapers
+
+
+def read_page(index: int, page_type: str, county: str = "example") -> str:
+    with open(load_pages.get_test_html_path(index, page_type, county)) as page_file:
+        return page_file.read()
+
+
+@pytest.fixture
+def cache_directory(tmp_path):
+    cache = PageCache(str(tmp_path / "page_cache"))
+    result_page = read_page(0, "test_search_pages")
+    cache.put(
+        case_key("travis", "J1-CV-20-001590"),
+        [result_page, read_page(0, "test_pages")],
+        ttl=timedelta(0),
+    )
+    cache.put(
+        case_key("williamson", "1JC-21-0008"),
+        [result_page, read_page(0, "test_pages", "williamson")],
+        ttl=timedelta(0),
+    )
+    cache.put(case_key("travis", "not-a-case"), [result_page, "<p></p>"], timedelta(0))
+    cache.put("travis/calendar/Court Calendar/a/b", ["<p></p>"], timedelta(0))
+    return cache.directory
+
+
+class TestReparse:
+    def test_reparse_stale_cases(self, cache_directory):
+        results = {
+            result.key: result for result in reparse.reparse_cases(cache_directory)
+        }
+        assert set(results) == {
+            "travis/case/J1-CV-20-001590",
+            "williamson/case/1JC-21-0008",
+            "travis/case/not-a-case",
+        }
+        assert results["travis/case/J1-CV-20-001590"].case.case_number == (
+            "J1-CV-20-001590"
+        )
+        assert results["williamson/case/1JC-21-0008"].case.case_number == (
+            "1JC-21-0008"
+        )
+        assert results["travis/case/not-a-case"].case is None
+
+    def test_only_some_counties(self, cache_directory):
+        keys = [
+            result.key
+            for result in reparse.reparse_cases(cache_directory, counties=["williamson"])
+        ]
+        assert keys == ["williamson/case/1JC-21-0008"]
+
+    def test_unknown_status_not_emailed(self, tmp_path, monkeypatch):
+        cache = PageCache(str(tmp_path / "page_cache"))
+        result_page = read_page(0, "test_search_pages").replace(
+            "Final Status", "Mystery Status"
+        )
+        cache.put(
+            case_key("travis", "J1-CV-20-001590"),
+            [result_page, read_page(0, "test_pages")],
+            ttl=timedelta(0),
+        )
+        emails = []
+        monkeypatch.delenv("LOCAL_DEV", raising=False)
+        monkeypatch.setattr(
+            scrapers, "log_and_email", lambda message, *args, **kwargs: emails.append(message)
+        )
+        results = list(reparse.reparse_cases(cache.directory))
+        assert results[0].case.status == "Mystery Status"
+        assert emails == []
+
+    def test_workers_give_same_cases(self, cache_directory):
+        in_process = list(reparse.reparse_cases(cache_directory, workers=1))
+        in_workers = list(reparse.reparse_cases(cache_directory, workers=2))
+        assert [result.case for result in in_workers] == [
+            result.case for result in in_process
+        ]
+
+    def test_cli_writes_jsonl_from_archive(self, cache_directory, tmp_path):
+        archive_path = str(tmp_path / "pages.tar.gz")
+        with tarfile.open(archive_path, "w:gz") as archive:
+            archive.add(cache_directory, arcname="page_cache")
+        outfile = str(tmp_path / "cases.jsonl")
+
+        result = CliRunner().invoke(
+            reparse.reparse,
+            [archive_path, "--outfile", outfile, "--workers", "2", "--county", "travis"],
+        )
+
+        assert result.exit_code == 0, result.output
+        with open(outfile) as cases_file:
+            cases = [json.loads(line) for line in cases_file]
+        assert [case["case_number"] for case in cases] == ["J1-CV-20-001590"]
+
+    def test_db_batches(self, cache_directory, monkeypatch):
+        import parse_hearings
+
+        batches = []
+        emails = []
+
+        def persist_parsed_cases(cases, email_failures=True):
+            batches.append([case.case_number for case in cases])
+            return batches[-1]
+
+        monkeypatch.setattr(parse_hearings, "persist_parsed_cases", persist_parsed_cases)
+        monkeypatch.setattr(
+            parse_hearings, "log_and_email", lambda message, *args, **kwargs: emails.append(message)
+        )
+        parsed, failed_keys = reparse.reparse_to(
+            reparse.reparse_cases(cache_directory), db=True, batch_size=1
+        )
+        assert parsed == 2
+        assert failed_keys == ["travis/case/not-a-case"]
+        assert sorted(batches) == [["1JC-21-0008"], ["J1-CV-20-001590"]]
+        # the failures of every batch are in one email
+        assert len(emails) == 1
+        assert "1JC-21-0008" in emails[0] and "J1-CV-20-001590" in emails[0]
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+from cases import CaseCheck
+import parse_hearings
+import persist
+import rescrape
+import scrapers
+
+
+class TestNextCheckDate:
+    today = date(2021, 3, 1)
+
+    def test_recently_changed_case_checked_soon(self):
+        assert rescrape.next_check_date(self.today, self.today) == date(2021, 3, 2)
+
+    def test_backs_off_while_unchanged(self):
+        assert rescrape.next_check_date(
+            self.today, self.today - timedelta(days=10)
+        ) == date(2021, 3, 6)
+
+    def test_waits_no_longer_than_max(self):
+        assert rescrape.next_check_date(
+            self.today, self.today - timedelta(days=365)
+        ) == date(2021, 3, 31)
+
+    def test_checks_day_after_next_setting(self):
+        next_check = rescrape.next_check_date(
+            self.today,
+            self.today - timedelta(days=365),
+            ["02/20/2021", "03/05/2021", "", "04/01/2021"],
+        )
+        assert next_check == date(2021, 3, 6)
+
+
+class TestCaseHash:
+    def test_changes_with_case(self):
+        case = scrapers.FakeScraper().fetch_parsed_case("J1-CV-20-001590")
+        same_case = case.copy()
+        changed_case = case.copy(update={"status": "Final Disposition"})
+        assert rescrape.case_hash(case) == rescrape.case_hash(same_case)
+        assert rescrape.case_hash(case) != rescrape.case_hash(changed_case)
+
+
+class TestPersistChangedCases:
+    def test_checks_recorded_together(self, monkeypatch):
+        case = scrapers.FakeScraper().fetch_parsed_case("J1-CV-20-001590")
+        unsaved = case.copy(update={"case_number": "J1-CV-20-000001"})
+        unchanged = case.copy(update={"case_number": "J1-CV-20-000002"})
+        today = date(2021, 3, 1)
+        recorded = []
+        monkeypatch.setattr(
+            persist,
+            "get_case_checks",
+            lambda case_nums: {
+                unchanged.case_number: CaseCheck(
+                    rescrape.case_hash(unchanged), date(2021, 1, 1)
+                )
+            },
+        )
+        monkeypatch.setattr(persist, "get_setting_dates", lambda case_nums: {})
+        monkeypatch.setattr(persist, "record_case_checks", recorded.append)
+        saved_cases = []
+        monkeypatch.setattr(
+            parse_hearings,
+            "persist_parsed_cases",
+            lambda cases, email_failures: saved_cases.extend(cases) or [unsaved.case_number],
+        )
+        failed = rescrape.persist_changed_cases([case, unsaved, unchanged], today=today)
+        assert failed == [unsaved.case_number]
+        # only the cases that changed are sent
+        assert [saved.case_number for saved in saved_cases] == [
+            case.case_number,
+            unsaved.case_number,
+        ]
+        assert len(recorded) == 1
+        assert [(row[0], row[3]) for row in recorded[0]] == [
+            (case.case_number, today),
+            (unchanged.case_number, date(2021, 1, 1)),
+        ]
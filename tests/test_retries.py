@@ -0,0 +1,343 @@
+import asyncio
+from datetime import date
+
+import aiohttp
+import pytest
+import requests
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+import retries
+from retries import CircuitBreaker, CircuitOpenError, RetryPolicy
+import scrapers
+
+CASE_NUM = "J1-CV-20-001590"
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Flaky:
+    """Raises each of `errors` in turn, then returns "done"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "done"
+
+
+@pytest.fixture(autouse=True)
+def fresh_circuit_breakers(monkeypatch):
+    monkeypatch.setattr(retries, "circuit_breakers", {})
+
+
+class TestIsRetryable:
+    @pytest.mark.parametrize(
+        "error",
+        [
+            requests.ConnectionError(),
+            requests.Timeout(),
+            http_error(503),
+            http_error(429),
+            aiohttp.ServerDisconnectedError(),
+            asyncio.TimeoutError(),
+            TimeoutException(),
+            ConnectionResetError(),
+            retries.UnexpectedPageError(),
+        ],
+    )
+    def test_retryable(self, error):
+        assert retries.is_retryable(error)
+
+    @pytest.mark.parametrize(
+        "error", [http_error(404), http_error(403), ValueError(), AttributeError()]
+    )
+    def test_not_retryable(self, error):
+        assert not retries.is_retryable(error)
+
+
+class TestRetryPolicy:
+    def test_delay_grows_with_jitter(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        delays = [policy.delay(attempt) for attempt in range(1, 5) for _ in range(100)]
+        assert all(0 <= delay <= 5 for delay in delays)
+        assert max(policy.delay(1) for _ in range(100)) <= 1
+        assert len(set(delays)) > 1
+
+    def test_retries_until_success(self):
+        flaky = Flaky(requests.ConnectionError(), http_error(502))
+        assert RetryPolicy(attempts=3, base_delay=0).call(flaky) == "done"
+        assert flaky.calls == 3
+
+    def test_gives_up_after_attempts(self):
+        flaky = Flaky(*[requests.Timeout()] * 5)
+        with pytest.raises(requests.Timeout):
+            RetryPolicy(attempts=3, base_delay=0).call(flaky)
+        assert flaky.calls == 3
+
+    def test_does_not_retry_other_errors(self):
+        flaky = Flaky(ValueError("not a results page"))
+        with pytest.raises(ValueError):
+            RetryPolicy(attempts=3, base_delay=0).call(flaky)
+        assert flaky.calls == 1
+
+    def test_call_async(self):
+        flaky = Flaky(asyncio.TimeoutError())
+
+        async def request():
+            return flaky()
+
+        result = asyncio.run(RetryPolicy(attempts=2, base_delay=0).call_async(request))
+        assert result == "done" and flaky.calls == 2
+
+
+class TestCircuitBreaker:
+    def test_pauses_after_failures_in_a_row(self):
+        clock = Clock()
+        breaker = CircuitBreaker("test", failure_threshold=3, pause_seconds=60, clock=clock)
+        for _ in range(2):
+            breaker.record_failure()
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        assert not breaker.is_open() and breaker.seconds_to_wait() == 0
+
+        breaker.record_failure()
+        assert breaker.is_open() and breaker.seconds_to_wait() == 60
+        clock.now += 60
+        assert breaker.seconds_to_wait() == 0
+        breaker.record_success()
+        assert not breaker.is_open()
+
+    def test_stops_waiting_after_giving_up(self):
+        clock = Clock()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, pause_seconds=60, give_up_seconds=100, clock=clock
+        )
+        breaker.record_failure()
+        clock.now += 61
+        assert breaker.seconds_to_wait() == 0
+        breaker.record_failure()
+        clock.now += 50
+        with pytest.raises(CircuitOpenError):
+            breaker.seconds_to_wait()
+        # a request is still let through once the pause is over
+        clock.now += 10
+        assert breaker.seconds_to_wait() == 0
+
+    def test_one_probe_after_pause(self):
+        clock = Clock()
+        breaker = CircuitBreaker("test", failure_threshold=1, pause_seconds=60, clock=clock)
+        breaker.record_failure()
+        clock.now += 60
+        assert breaker.seconds_to_wait() == 0
+        # the others wait for the probe, checking now and then whether it's done
+        assert breaker.seconds_to_wait() == retries.PROBE_CHECK_SECONDS
+        breaker.record_failure()
+        assert breaker.seconds_to_wait() == 60
+
+        clock.now += 60
+        assert breaker.seconds_to_wait() == 0
+        assert breaker.seconds_to_wait() > 0
+        breaker.end_probe()
+        assert breaker.seconds_to_wait() == 0
+        assert breaker.seconds_to_wait() > 0
+        breaker.record_success()
+        assert breaker.seconds_to_wait() == 0 and not breaker.probing
+
+    def test_probe_that_never_finishes(self):
+        clock = Clock()
+        breaker = CircuitBreaker("test", failure_threshold=1, pause_seconds=60, clock=clock)
+        breaker.record_failure()
+        clock.now += 60
+        assert breaker.seconds_to_wait() == 0
+        clock.now += 59
+        assert breaker.seconds_to_wait() == 1
+        clock.now += 1
+        assert breaker.seconds_to_wait() == 0
+
+    def test_policy_counts_only_retryable_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, pause_seconds=0)
+        policy = RetryPolicy(attempts=1, base_delay=0)
+        with pytest.raises(ValueError):
+            policy.call(Flaky(ValueError()), breaker=breaker)
+        assert breaker.failures == 0
+        with pytest.raises(requests.ConnectionError):
+            policy.call(Flaky(requests.ConnectionError()), breaker=breaker)
+        assert breaker.failures == 1
+
+    def test_portal_down_fails_fast(self):
+        clock = Clock()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, pause_seconds=60, give_up_seconds=0, clock=clock
+        )
+        policy = RetryPolicy(attempts=3, base_delay=0)
+        flaky = Flaky(*[requests.ConnectionError()] * 3)
+        with pytest.raises(CircuitOpenError):
+            policy.call(flaky, breaker=breaker)
+        assert flaky.calls == 1
+
+
+class FlakyScraper(scrapers.TravisScraper):
+    """Loses its connection on the first attempt at every query."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_cache = None
+        self.retry_policy = RetryPolicy(attempts=2, base_delay=0)
+        self.queries = []
+
+    def start_driver(self, headless: bool = True) -> None:
+        self.driver = None
+
+    def close_driver(self):
+        pass
+
+    def flaky(self, query):
+        self.queries.append(query)
+        if self.queries.count(query) == 1:
+            raise requests.ConnectionError("connection reset")
+
+    def query_case_id(self, case_id):
+        self.flaky(case_id)
+        return scrapers.FakeScraper.query_case_id(self, case_id)
+
+    def query_filings(self, afterdate, beforedate, case_num_prefix):
+        self.flaky(case_num_prefix)
+        with open(scrapers.load_pages.get_test_filing_search_path()) as page_file:
+            return page_file.read()
+
+    def query_settings(self, afterdate, beforedate, calendar_link):
+        self.flaky(calendar_link)
+        return scrapers.FakeScraper.query_settings(self, afterdate, beforedate, calendar_link)
+
+
+class TestScraperRetries:
+    def test_each_case_retried_on_its_own(self):
+        scraper = FlakyScraper()
+        cases = scraper.make_case_list([CASE_NUM, "J1-CV-20-000001"])
+        assert [case.case_number for case in cases] == [CASE_NUM]
+        # the unknown case fails for good without starting the list over
+        assert scraper.queries == [CASE_NUM, CASE_NUM, "J1-CV-20-000001", "J1-CV-20-000001"]
+
+    def test_fetch_filings(self):
+        scraper = FlakyScraper()
+        case_nums = scraper.fetch_filings(date(2020, 6, 1), date(2020, 6, 30), "J1-CV-20*")
+        assert case_nums and scraper.queries == ["J1-CV-20*"] * 2
+
+    def test_fetch_calendar_settings(self):
+        scraper = FlakyScraper()
+        settings, _ = scraper.fetch_calendar_settings(
+            date(2015, 10, 21), date(2015, 10, 21), "Court Calendar"
+        )
+        assert settings and len(scraper.queries) == 2
+
+
+class FakeElement:
+    def __init__(self, driver, value):
+        self.driver = driver
+        self.value = value
+
+    def click(self):
+        if self.value == "J1-CV-20-001590":
+            self.driver.page_source = "<div id='PIr11'>Register of Actions</div>"
+
+    def send_keys(self, keys):
+        pass
+
+
+class FakeDriver:
+    """Finds every element at once, except that the first register of actions never loads."""
+
+    def __init__(self):
+        self.page_source = "<table><tr><td><a>J1-CV-20-001590</a></td></tr></table>"
+        self.current_url = "https://example.com/Search.aspx"
+        self.register_loads = 0
+
+    def get(self, url):
+        pass
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def find_element(self, by, value):
+        if value == "PIr11":
+            self.register_loads += 1
+            if self.register_loads == 1:
+                raise NoSuchElementException()
+        return FakeElement(self, value)
+
+
+class FakeBrowserScraper(scrapers.TravisScraper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_cache = None
+        self.retry_policy = RetryPolicy(attempts=2, base_delay=0)
+
+    def start_driver(self, headless: bool = True) -> None:
+        self.driver = FakeDriver()
+
+    def close_driver(self):
+        pass
+
+
+class UnreadablePageScraper(FlakyScraper):
+    """Sends back a page that can't be read on the first attempt at every calendar query."""
+
+    def query_settings(self, afterdate, beforedate, calendar_link):
+        self.queries.append(calendar_link)
+        if len(self.queries) == 1:
+            return None
+        return scrapers.FakeScraper.query_settings(self, afterdate, beforedate, calendar_link)
+
+
+class TestUnreadablePages:
+    def test_read_page(self):
+        with pytest.raises(retries.UnexpectedPageError):
+            retries.read_page(lambda page: page.split()[5], "too short")
+
+    def test_unreadable_calendar_page_is_loaded_again(self):
+        scraper = UnreadablePageScraper()
+        settings, _ = scraper.fetch_calendar_settings(
+            date(2015, 10, 21), date(2015, 10, 21), "Court Calendar"
+        )
+        assert settings and len(scraper.queries) == 2
+
+    def test_dropped_range_is_logged(self, caplog):
+        scraper = UnreadablePageScraper()
+        scraper.retry_policy = RetryPolicy(attempts=1)
+        assert scraper.fetch_calendar_settings(
+            date(2015, 10, 21), date(2015, 10, 21), "Court Calendar"
+        ) == ([], False)
+        assert "Court Calendar between 2015-10-21 and 2015-10-21" in caplog.text
+
+
+class TestSeleniumCaseRetries:
+    def test_register_that_does_not_load_is_retried(self, monkeypatch):
+        monkeypatch.setattr(
+            scrapers, "WebDriverWait", lambda driver, timeout: WebDriverWait(driver, 0)
+        )
+        scraper = FakeBrowserScraper()
+        with pytest.raises(TimeoutException):
+            scraper.query_case_id(CASE_NUM)
+
+        scraper = FakeBrowserScraper()
+        search_page, register_page = scraper.fetch_case_pages(CASE_NUM)
+        assert scraper.driver.register_loads == 2
+        assert "PIr11" in register_page
@@ -5,6 +5,7 @@ import pytest
 import calendars
 import case_search
 import hearing
+from html_backend import make_soup
 import load_pages
 
 
@@ -15,6 +16,14 @@ class TestSearchFilingsPage:
         assert "J1-CV-20-001773" in filings
         assert need_splitting is False
 
+    def test_filings_link_to_registers(self):
+        filings, _ = calendars.get_filings(load_pages.get_test_filings_search_page())
+        filing = filings[0]
+        assert filing.register_link == "CaseDetail.aspx?CaseID=2288519"
+        result_soup = make_soup(filing.search_result)
+        assert case_search.get_status_and_type(result_soup) == ("Active", "Eviction")
+        assert case_search.get_register_url(result_soup).endswith("CaseID=2288519")
+
     def test_split_date_range(self):
         afterdate = datetime.date(2020, 1, 1)
         beforedate = datetime.date(2020, 1, 20)